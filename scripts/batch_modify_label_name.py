@@ -10,6 +10,8 @@ from pathlib import Path
 
 import pyutils
 
+from data_aug import json_io
+
 map_dict = {
     "C1210_15um_green": "CR_body",
     "C1206_15um_green": "CR_body",
@@ -35,11 +37,11 @@ def batch_modify_label_name(src_json_dir, output_dir, update_shapes_label_func):
     assert output_dir is not None
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     for src_json_path in pyutils.glob_dir(src_json_dir, include_patterns=["*.json"]):
-        json_data = pyutils.load_json(src_json_path)
+        json_data = json_io.load_json(src_json_path)
 
         for label_item in json_data["shapes"]:
             update_shapes_label_func(label_item)
-        pyutils.dump_json(json_data, Path(output_dir) / Path(src_json_path).name)
+        json_io.dump_json(json_data, Path(output_dir) / Path(src_json_path).name)
 
         # new_json_data = copy.deepcopy(json_data)
         # new_json_data["shapes"] = []
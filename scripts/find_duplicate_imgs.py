@@ -0,0 +1,38 @@
+# -*- coding:utf-8 -*-
+# @FileName :find_duplicate_imgs.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 21:50
+
+import shutil
+from pathlib import Path
+
+import pyutils
+from loguru import logger
+
+from data_aug.dedup import DedupIndex
+
+
+# 查找文件夹中的重复或近似重复图像（dHash汉明距离不超过max_distance），每组只保留一张，
+# 其余图像及其同名标注文件移动到dup_dir，dup_dir为None时只打印重复组
+def find_duplicate_imgs(src_dir, suffix_patterns, max_distance=0, dup_dir=None):
+    img_path_list = list(pyutils.glob_dir(src_dir, include_patterns=suffix_patterns))
+    index = DedupIndex.build(img_path_list, workers=8)
+    groups = index.find_duplicate_groups(max_distance)
+    for group in groups:
+        logger.info([Path(index.img_paths[idx]).name for idx in group])
+    logger.info(f"{len(groups)} duplicate groups in {len(index)} images")
+    if dup_dir is None:
+        return
+    Path(dup_dir).mkdir(parents=True, exist_ok=True)
+    for idx in index.duplicate_mask(max_distance).nonzero()[0]:
+        img_path = Path(index.img_paths[idx])
+        for path in [img_path, img_path.with_suffix(".json")]:
+            if path.exists():
+                shutil.move(str(path), str(Path(dup_dir) / path.name))
+
+
+if __name__ == "__main__":
+    src_dir = r""
+    find_duplicate_imgs(
+        src_dir, suffix_patterns=["*.bmp"], max_distance=2, dup_dir=None
+    )
@@ -62,6 +62,7 @@ crop_rectangle_items_for_folder(
     dst_dir=dst_dir_root + r"\rc_stb",
     filter_func=filter_func,
     margin_tblr=margin_tblr,
+    incremental=True,
 )
 
 # 标准测试板led元件，15u
@@ -72,6 +73,7 @@ crop_rectangle_items_for_folder(
     dst_dir=dst_dir_root + r"\led_stb",
     filter_func=filter_func,
     margin_tblr=margin_tblr,
+    incremental=True,
 )
 
 # 标准测试板8p4r元件，15u
@@ -82,6 +84,7 @@ crop_rectangle_items_for_folder(
     dst_dir=dst_dir_root + r"\8p4r_stb",
     filter_func=filter_func,
     margin_tblr=margin_tblr,
+    incremental=True,
 )
 
 # 标准测试板sot元件（不含sod），15u
@@ -92,6 +95,7 @@ crop_rectangle_items_for_folder(
     dst_dir=dst_dir_root + r"\sot_stb",
     filter_func=filter_func,
     margin_tblr=margin_tblr,
+    incremental=True,
 )
 
 # 标准测试板ic元件，15u
@@ -102,6 +106,7 @@ crop_rectangle_items_for_folder(
     dst_dir=dst_dir_root + r"\ic_stb",
     filter_func=filter_func,
     margin_tblr=margin_tblr,
+    incremental=True,
 )
 
 # 贝莱胜板子
@@ -112,5 +117,6 @@ crop_rectangle_items_for_folder(
     dst_dir=dst_dir_root + r"\all_bls",
     filter_func=filter_func,
     margin_tblr=margin_tblr,
+    incremental=True,
 )
 # =================================================元件检测业务===========================================================
@@ -2,7 +2,7 @@ from pathlib import Path
 
 from loguru import logger
 
-from data_aug.data_package import gen_data_package_list_from_label_file_for_folder
+from data_aug.data_package import iter_data_packages_from_label_folder
 
 src_dir = r"D:\data\obj_det\fg\all_bls"
 
@@ -18,7 +18,7 @@ senario = "bls"
 #     "LED": dst_root / f"led_{senario}",
 # }
 
-for dp in gen_data_package_list_from_label_file_for_folder(src_dir):
+for dp in iter_data_packages_from_label_folder(src_dir):
     # 正常来说都是 XX_body 和 XX_with_pad
     dst_root = Path(dst_root_)
     if dp.label_items[0]["label"].startswith("R"):
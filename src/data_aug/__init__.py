@@ -1,6 +1,21 @@
 """Top-level package for data_aug."""
 
-from . import data_package  # noqa: F401
+from . import (  # noqa: F401
+    cache,
+    crop_record,
+    data_package,
+    dedup,
+    fg_bank,
+    image_io,
+    json_io,
+    manifest,
+    placement,
+    shard,
+    sink,
+    spatial_index,
+    transform_chain,
+    writer,
+)
 from ._version import get_versions
 from .data_package import *  # noqa: F401, F403
 
@@ -0,0 +1,200 @@
+# -*- coding:utf-8 -*-
+# @FileName :cache.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 11:05
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pyutils
+
+__all__ = [
+    "ImageLRUCache",
+    "make_cached_cyclic_iterator",
+    "NpyImageCache",
+    "set_npy_cache_dir",
+    "get_npy_cache",
+]
+
+
+# 以字节数为预算的LRU图像缓存，超出预算时淘汰最久未被访问的图像
+# 缓存中的图像被设置为只读，防止使用方原地修改后污染缓存
+class ImageLRUCache:
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes: 缓存图像占用的最大字节数
+        """
+        assert max_bytes > 0
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, loader):
+        """
+        返回key对应的图像，未命中时调用loader解码并放入缓存
+        Args:
+            key: 缓存键，通常为图像路径
+            loader: 无参数的可调用对象，返回解码后的图像
+
+        Returns:
+
+        """
+        with self._lock:
+            img = self._data.get(key)
+            if img is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return img
+            self.misses += 1
+        img = loader()
+        img.flags.writeable = False
+        with self._lock:
+            if key not in self._data:
+                self._data[key] = img
+                self.num_bytes += img.nbytes
+                self._evict()
+        return img
+
+    def _evict(self):
+        # 至少保留最近放入的一张图像，即使其本身已超出预算
+        while self.num_bytes > self.max_bytes and len(self._data) > 1:
+            _, img = self._data.popitem(last=False)
+            self.num_bytes -= img.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.num_bytes = 0
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            num_items=len(self._data),
+            num_bytes=self.num_bytes,
+            max_bytes=self.max_bytes,
+        )
+
+
+def make_cached_cyclic_iterator(data_package_list, cache):
+    """
+    与pyutils.make_cyclic_iterator相同的循环顺序，但列表中的DataPackage对象只保留路径与标注等元信息（应以lazy模式创建），
+    每次迭代时从cache中取得解码后的图像，生成新的DataPackage对象返回，列表本身不会持有解码后的图像。
+    Args:
+        data_package_list: DataPackage对象列表
+        cache: ImageLRUCache对象
+
+    Returns:
+
+    """
+    for dp in pyutils.make_cyclic_iterator(data_package_list):
+        if dp.img_loaded or dp.img_path is None:
+            yield dp
+            continue
+        # 同一路径可能以不同分辨率载入（见max_side），以路径与shape共同作为键
+        img = cache.get((dp.img_path, tuple(dp.img_shape)), dp.read_img)
+        # 复制元信息（数组模式的标注条目直接共享），替换为缓存中的图像
+        ret = dp.copy()
+        ret.img = img
+        yield ret
+
+
+# 解码后图像的磁盘缓存，以.npy格式保存，键由源图像的绝对路径，修改时间与文件大小决定，源文件变化后自动失效。
+# 命中时通过np.load内存映射打开，多个进程读取同一缓存文件时共享操作系统的页缓存。
+class NpyImageCache:
+    def __init__(self, cache_dir, mmap_mode="c"):
+        """
+        Args:
+            cache_dir: 缓存文件夹
+            mmap_mode: np.load的mmap_mode，默认为"c"（写时复制，原地修改不会写回缓存文件），可选"r"（只读）
+        """
+        self.cache_dir = Path(cache_dir).absolute()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.mmap_mode = mmap_mode
+        self.hits = 0
+        self.misses = 0
+
+    def get_cache_path(self, img_path, variant=""):
+        img_path = os.path.abspath(str(img_path))
+        stat = os.stat(img_path)
+        key = hashlib.sha1(
+            f"{img_path}|{stat.st_mtime_ns}|{stat.st_size}|{variant}".encode("utf-8")
+        ).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.npy"
+
+    def get(self, img_path, loader, variant=""):
+        """
+        返回img_path对应的解码后图像，缓存不存在时调用loader解码并写入缓存
+        Args:
+            img_path: 源图像路径
+            loader: 无参数的可调用对象，返回解码后的图像
+            variant: 同一源图像的不同解码方式（如降采样解码）的区分标识
+
+        Returns:
+
+        """
+        cache_path = self.get_cache_path(img_path, variant)
+        if cache_path.exists():
+            try:
+                img = np.load(str(cache_path), mmap_mode=self.mmap_mode)
+                self.hits += 1
+                return img
+            except (OSError, ValueError):
+                # 缓存文件损坏时重新生成
+                pass
+        self.misses += 1
+        img = loader()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，避免多进程同时写入时读到不完整的文件
+        tmp_path = cache_path.with_name(
+            f"{cache_path.stem}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(img))
+        os.replace(tmp_path, cache_path)
+        return img
+
+    def clear(self):
+        shutil.rmtree(str(self.cache_dir), ignore_errors=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses)
+
+
+_npy_cache = None
+
+
+def set_npy_cache_dir(cache_dir, mmap_mode="c"):
+    """
+    开启（cache_dir不为None）或关闭（cache_dir为None）全局的解码图像磁盘缓存，
+    开启后DataPackage.create_from_img_path与create_from_label_path解码图像时会自动使用该缓存。
+    """
+    global _npy_cache
+    if cache_dir is None:
+        _npy_cache = None
+    else:
+        _npy_cache = NpyImageCache(cache_dir, mmap_mode=mmap_mode)
+    return _npy_cache
+
+
+def get_npy_cache():
+    return _npy_cache
@@ -0,0 +1,119 @@
+# -*- coding:utf-8 -*-
+# @FileName :crop_record.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 20:05
+
+import functools
+import hashlib
+import os
+from pathlib import Path
+
+from loguru import logger
+
+from . import json_io
+
+__all__ = [
+    "CROP_RECORD_NAME",
+    "get_filter_id",
+    "get_crop_source_key",
+    "CropRecord",
+]
+
+CROP_RECORD_NAME = ".data_aug_crop_record.json"
+_RECORD_VERSION = 1
+
+
+def get_filter_id(filter_func):
+    """
+    返回筛选函数的默认标识：模块名与限定名，functools.partial对象还包括其绑定的参数。
+    默认标识不反映函数实现的变化（以及其引用的全局变量与辅助函数），筛选逻辑变化时调用方需显式传入新的filter_id，
+    同名的lambda或闭包（限定名相同而行为不同）也需由调用方区分。
+    """
+    if filter_func is None:
+        return "None"
+    if isinstance(filter_func, functools.partial):
+        return (
+            f"{get_filter_id(filter_func.func)}"
+            f"({filter_func.args!r}, {sorted(filter_func.keywords.items())!r})"
+        )
+    return (
+        f"{getattr(filter_func, '__module__', None)}."
+        f"{getattr(filter_func, '__qualname__', type(filter_func).__qualname__)}"
+    )
+
+
+def get_crop_source_key(label_path, img_path, margin_tblr=None, filter_id="None"):
+    """
+    计算一个源标注文件的裁剪结果键：标注文件内容的sha1，源图像的大小与修改时间（避免每次读取整张大图计算摘要），
+    margin_tblr与筛选函数标识（见get_filter_id），任一项变化时键随之变化。
+    """
+    with open(str(label_path), "rb") as f:
+        label_digest = hashlib.sha1(f.read()).hexdigest()
+    try:
+        stat = os.stat(str(img_path))
+        img_stat = f"{stat.st_size}|{stat.st_mtime_ns}"
+    except OSError:
+        img_stat = "missing"
+    margin = None if margin_tblr is None else [int(v) for v in margin_tblr]
+    return hashlib.sha1(
+        f"{label_digest}|{img_stat}|{margin}|{filter_id}".encode("utf-8")
+    ).hexdigest()
+
+
+# 文件夹批量裁剪的增量记录，保存在裁剪结果文件夹中，记录每个源标注文件的键及其产生的所有输出文件，
+# 再次裁剪时键未变化且输出文件齐全的源标注文件直接跳过，源标注文件被删除或变化时清理其旧的输出文件。
+class CropRecord:
+    def __init__(self, record_path):
+        self.record_path = Path(record_path).absolute()
+        self.sources = {}
+        if self.record_path.exists():
+            try:
+                data = json_io.load_json(self.record_path)
+                if data.get("version") == _RECORD_VERSION:
+                    self.sources = data["sources"]
+            except (OSError, ValueError, KeyError):
+                logger.warning(f"{self.record_path} is broken, rebuild it")
+
+    def is_up_to_date(self, label_path, key):
+        entry = self.sources.get(str(label_path))
+        return (
+            entry is not None
+            and entry["key"] == key
+            and all(os.path.exists(path) for path in entry["outputs"])
+        )
+
+    def update(self, label_path, key, outputs):
+        """
+        记录源标注文件新的键与输出文件，并删除其旧输出中不再产生的文件
+        """
+        entry = self.sources.get(str(label_path))
+        outputs = [str(path) for path in outputs]
+        if entry is not None:
+            _remove_files(set(entry["outputs"]) - set(outputs))
+        self.sources[str(label_path)] = dict(key=key, outputs=outputs)
+
+    def remove_missing_sources(self, label_paths):
+        """
+        删除不在label_paths中的源标注文件的记录及其全部输出文件，返回删除的源数量
+        """
+        label_paths = {str(label_path) for label_path in label_paths}
+        missing = [path for path in self.sources if path not in label_paths]
+        for label_path in missing:
+            _remove_files(self.sources.pop(label_path)["outputs"])
+        return len(missing)
+
+    def save(self):
+        self.record_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.record_path.with_name(
+            self.record_path.name + f".{os.getpid()}.tmp"
+        )
+        json_io.dump_json(dict(version=_RECORD_VERSION, sources=self.sources), tmp_path)
+        os.replace(tmp_path, self.record_path)
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -4,11 +4,13 @@
 # @Time     :2022/11/29 17:15
 
 import copy
-import datetime
 import itertools
+import math
 
 # import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
 import cv2
@@ -18,12 +20,43 @@ import pyutils
 from loguru import logger
 from tqdm import tqdm
 
+from . import json_io
+from .cache import ImageLRUCache, get_npy_cache, make_cached_cyclic_iterator
+from .crop_record import (
+    CROP_RECORD_NAME,
+    CropRecord,
+    get_crop_source_key,
+    get_filter_id,
+)
+from .dedup import find_duplicate_mask
+from .fg_bank import ForegroundBank
+from .image_io import (
+    choose_reduce_factor,
+    get_codec,
+    get_reduced_img_shape,
+    imread_bgr,
+    imread_reduced,
+    imwrite,
+    read_bmp_region,
+    read_img_shape,
+)
+from .label_arrays import LabelArrays
+from .manifest import get_manifest
+from .placement import PLACEMENTS, MaxRectsPacker, sample_free_position
+from .spatial_index import GridIndex
+from .transform_chain import TransformChain, get_rotate_matrix_by_multi_90
+from .writer import AsyncDataPackageSaver, gen_sample_ids
+
 __all__ = [
     "DataPackage",
     "gen_data_package_list_from_img_file_for_folder",
     "gen_data_package_list_from_label_file_for_folder",
+    "iter_data_packages_from_img_folder",
+    "iter_data_packages_from_label_folder",
     "filter_with_size_for_folder",
+    "iter_filter_with_size_for_folder",
     "crop_rectangle_items_for_folder",
+    "iter_crop_rectangle_items_for_folder",
     "crop_point_items_for_folder",
     "paste_by_iter_for_folder",
 ]
@@ -32,7 +65,24 @@ __all__ = [
 # 面向labelme软件的标注数据的类
 # 重要的数据成员包括图像路径,图像,标注路径,标注内容
 # 提供常用的方法,包括生成默认,保存,裁剪
+# 图像为写时复制：copy与crop返回的对象与执行对象共享同一像素缓冲区，共享的双方通过img属性访问图像时各自先复制一份独占的可写图像，
+# 只读取像素的内部操作使用get_readonly_img，不产生复制
 class DataPackage:
+    # 大量对象常驻内存（如前景列表）时减少每个对象的内存开销
+    __slots__ = (
+        "_img",
+        "_img_loader",
+        "_img_shape",
+        "_img_region_reader",
+        "_img_shared",
+        "img_path",
+        "label_path",
+        "_label",
+        "_label_arrays",
+        "_spatial_index",
+        "cat_idx",
+    )
+
     @classmethod
     def gen_default_label(cls, img_path, img_shape, version="4.5.7"):
         """
@@ -64,57 +114,100 @@ class DataPackage:
         return DataPackage(img_path, img, None, label)
 
     @classmethod
-    def create_from_img_path(cls, img_path, cat_idx=-1):
+    def create_from_img_path(cls, img_path, cat_idx=-1, lazy=False, max_side=None):
         """
         类方法,通过图像路径(并生成绝对路径)创建DataPackage对象,通过默认同名方式获取标注路径,若标注文件存在,校验载入的标注内容中的imagePath,
         imageWidth与imageHeight(但不会修改本地标注文件),若标注文件不存在,创建默认标注内容.
         Args:
             img_path:
             cat_idx:
+            lazy: 是否延迟解码图像,为True时图像尺寸通过文件头获取,首次访问img属性时才解码像素,默认为False
+            max_side: 后续处理所需的最大边长,不为None时以不低于该边长的降采样分辨率解码(标注同步缩放),默认为None
 
         Returns:
 
         """
         assert img_path is not None
         img_path = str(Path(img_path).absolute())
-        img = cvutils.imread(img_path)
-        img = img[:, :, :3]
+        img, img_shape = None, None
+        if lazy or max_side is not None:
+            img_shape = read_img_shape(img_path)
+        if img_shape is None:
+            # 非延迟模式，或文件头无法识别时，直接解码图像
+            img = _imread(img_path)
+            img_shape = img.shape
         label_path = Path(img_path).with_suffix(".json")
         if Path(label_path).exists():
             # 若标注文件存在，载入标注，并校验标注文件中图像文件的正确性。
-            label = pyutils.load_json(label_path)
+            label = json_io.load_json(label_path)
             if str(Path(label["imagePath"]).name) != str(Path(img_path).name):
                 logger.warning(
                     f"{img_path} and {label_path} does not match in imagePath"
                 )
                 label["imagePath"] = str(Path(img_path).name)
-            if label["imageHeight"] != img.shape[0]:
+            if label["imageHeight"] != img_shape[0]:
                 logger.warning(
                     f"{img_path} and {label_path} does not match in imageHeight"
                 )
-                label["imageHeight"] = img.shape[0]
-            if label["imageWidth"] != img.shape[1]:
+                label["imageHeight"] = img_shape[0]
+            if label["imageWidth"] != img_shape[1]:
                 logger.warning(
                     f"{img_path} and {label_path} does not match in imageWidth"
                 )
-                label["imageWidth"] = img.shape[1]
+                label["imageWidth"] = img_shape[1]
         else:
             # 若标注文件不存在，构造默认标注内容，写入实际的图像路径与尺寸。
-            label = cls.gen_default_label(img_path, img.shape)
-        return cls(img_path, img, label_path, label, cat_idx)
+            label = cls.gen_default_label(img_path, img_shape)
+        dp = cls(img_path, img, label_path, label, cat_idx)
+        dp.use_label_arrays()
+        if img is None:
+            dp.bind_img_loader(
+                partial(_imread, img_path),
+                img_shape,
+                _make_img_region_reader(img_path),
+            )
+            dp._reduce_img_for_max_side(max_side)
+            if not lazy:
+                dp.load_img()
+        return dp
 
     @classmethod
-    def create_from_label_path(cls, label_path, cat_idx=-1):
+    def create_from_label_path(cls, label_path, cat_idx=-1, lazy=False, max_side=None):
         """
         类方法，通过标注路径生成对象，其中图像路径通过标注内容获取
+        Args:
+            label_path: 标注路径
+            cat_idx:
+            lazy: 是否延迟解码图像,为True时图像尺寸取自标注中的imageHeight与imageWidth(缺失时读取文件头),
+                首次访问img属性时才解码像素,默认为False
+            max_side: 后续处理所需的最大边长,不为None时以不低于该边长的降采样分辨率解码(标注同步缩放),默认为None
+
+        Returns:
+
         """
         assert label_path is not None
         label_path = str(Path(label_path).absolute())
-        label = pyutils.load_json(label_path)
+        label = json_io.load_json(label_path)
         img_path = Path(label_path).parent / label["imagePath"]
-        img = cvutils.imread(img_path)
-        img = img[:, :, :3]
-        return cls(img_path, img, label_path, label, cat_idx)
+        if lazy or max_side is not None:
+            if label.get("imageHeight") and label.get("imageWidth"):
+                img_shape = (label["imageHeight"], label["imageWidth"], 3)
+            else:
+                img_shape = read_img_shape(img_path)
+            if img_shape is not None:
+                dp = cls(img_path, None, label_path, label, cat_idx)
+                dp.use_label_arrays()
+                dp.bind_img_loader(
+                    partial(_imread, dp.img_path),
+                    img_shape,
+                    _make_img_region_reader(dp.img_path),
+                )
+                dp._reduce_img_for_max_side(max_side)
+                if not lazy:
+                    dp.load_img()
+                return dp
+        img = _imread(img_path)
+        return cls(img_path, img, label_path, label, cat_idx).use_label_arrays()
 
     def __init__(self, img_path, img, label_path, label, cat_idx=-1):
         """
@@ -137,14 +230,243 @@ class DataPackage:
         self.label = copy.deepcopy(label)
         self.cat_idx = cat_idx
 
+    @property
+    def label(self):
+        """
+        标注内容（labelme字典），数组模式下访问时先将标注条目转换回字典列表（并切换为字典模式），
+        只读取而不修改标注时应使用export_label或label_arrays，避免来回转换
+        """
+        if self._label_arrays is not None:
+            self._label["shapes"] = self._label_arrays.to_shapes()
+            self._label_arrays = None
+            # 字典模式下标注条目可被任意修改，空间索引只在数组模式下维护
+            self._spatial_index = None
+        return self._label
+
+    @label.setter
+    def label(self, label):
+        self._label = label
+        self._label_arrays = None
+        self._spatial_index = None
+
+    @property
+    def label_arrays(self):
+        """
+        标注条目的数组形式（见data_aug.label_arrays.LabelArrays），字典模式下访问时转换并切换为数组模式
+        """
+        if self._label_arrays is None:
+            self._label_arrays = LabelArrays.from_shapes(self._label["shapes"])
+            # 替换为新的字典而不原地修改，调用方此前通过label取得的字典保持不变
+            self._label = {**self._label, "shapes": None}
+        return self._label_arrays
+
+    def set_label_arrays(self, label_arrays):
+        """
+        以数组形式替换全部标注条目
+        """
+        self._label_arrays = label_arrays
+        self._label = {**self._label, "shapes": None}
+        self._spatial_index = None
+
+    def _append_label_arrays(self, label_arrays):
+        """
+        在已有标注条目之后追加条目，已建立的空间索引增量更新
+        """
+        old = self.label_arrays
+        spatial_index = self._spatial_index
+        self.set_label_arrays(LabelArrays.concatenate([old, label_arrays]))
+        if spatial_index is not None:
+            boxes, idxes = self._get_rectangle_boxes(label_arrays)
+            spatial_index.insert(boxes, idxes + len(old))
+            self._spatial_index = spatial_index
+
+    @staticmethod
+    def _get_rectangle_boxes(label_arrays):
+        idxes = np.flatnonzero(label_arrays.get_rectangle_mask())
+        pts = label_arrays.get_rectangle_points(idxes).astype(np.float64)
+        boxes = np.concatenate(
+            [
+                np.minimum(pts[:, :2], pts[:, 2:]),
+                np.maximum(pts[:, :2], pts[:, 2:]),
+            ],
+            axis=1,
+        )
+        return boxes, idxes
+
+    @property
+    def spatial_index(self):
+        """
+        rectangle标注条目外接框的网格索引（见data_aug.spatial_index.GridIndex），id为条目序号，
+        首次访问时建立，粘贴与合并时增量更新，其余修改标注的操作使其失效
+        """
+        if self._spatial_index is None:
+            boxes, idxes = self._get_rectangle_boxes(self.label_arrays)
+            self._spatial_index = GridIndex.build(boxes, idxes)
+        return self._spatial_index
+
+    def use_label_arrays(self):
+        """
+        切换为数组模式，返回执行对象本身
+        """
+        self.label_arrays
+        return self
+
+    def export_label(self):
+        """
+        返回新创建的labelme字典，不改变执行对象的存储模式，用于保存与序列化
+        """
+        label = dict(self._label)
+        if self._label_arrays is not None:
+            label["shapes"] = self._label_arrays.to_shapes()
+        return label
+
+    def bind_img_loader(self, img_loader, img_shape, img_region_reader=None):
+        """
+        绑定延迟解码图像的加载函数与图像shape，首次访问img属性时调用img_loader解码像素
+        Args:
+            img_loader: 无参数的可调用对象，返回解码后的图像
+            img_shape: 图像shape，在解码前供尺寸相关的判断使用
+            img_region_reader: 可选，参数为(tl_x, tl_y, width, height)的可调用对象，返回对应区域的像素（不支持时返回None），
+                图像未解码时crop优先使用它只读取裁剪区域
+
+        Returns:
+
+        """
+        self._img = None
+        self._img_loader = img_loader
+        self._img_shape = tuple(img_shape)
+        self._img_region_reader = img_region_reader
+        self._img_shared = False
+
+    def _reduce_img_for_max_side(self, max_side):
+        """
+        对尚未解码的对象，按max_side选择降采样解码倍数，替换加载函数并同步缩放标注
+        """
+        if max_side is None or self.img_loaded or self._img_loader is None:
+            return
+        factor = choose_reduce_factor(self._img_shape, max_side)
+        if factor == 1:
+            return
+        h, w = self._img_shape[:2]
+        dst_shape = get_reduced_img_shape(self._img_shape, factor)
+        fx, fy = dst_shape[1] / w, dst_shape[0] / h
+        self.set_label_arrays(self.label_arrays.scale(fx, fy))
+        self._label["imageHeight"], self._label["imageWidth"] = dst_shape[:2]
+        # 区域读取基于原图坐标，降采样后不再适用
+        self.bind_img_loader(
+            partial(_imread, self.img_path, factor, dst_shape), dst_shape
+        )
+
+    def _get_img(self):
+        if self._img is None and self._img_loader is not None:
+            img = self._img_loader()
+            if img.shape[:2] != self._img_shape[:2]:
+                logger.warning(
+                    f"{self.img_path}: decoded shape {img.shape} does not match {self._img_shape}"
+                )
+            self._img = img
+            self._img_loader = None
+        return self._img
+
+    @property
+    def img(self):
+        img = self._get_img()
+        if self._img_shared:
+            # 与其他对象共享像素缓冲区：先复制一份独占的图像，调用方可以原地写入而不影响其他对象
+            img = self._img = img.copy()
+            self._img_shared = False
+        return img
+
+    @img.setter
+    def img(self, img):
+        self._img = img
+        self._img_loader = None
+        self._img_shape = None
+        self._img_region_reader = None
+        self._img_shared = False
+
+    def load_img(self):
+        """
+        若图像尚未解码则立即解码并保存在对象中，返回图像
+        """
+        return self.img
+
+    def get_writable_img(self):
+        """
+        返回可原地写入的图像：图像与其他对象共享（或来自只读缓存）时先复制一份独占的图像
+        """
+        img = self.img
+        if img is not None and not img.flags.writeable:
+            self._img = img.copy()
+        return self._img
+
+    def get_readonly_img(self):
+        """
+        返回图像的只读视图，与其他对象共享像素缓冲区时不复制，用于只读取像素的操作（变换，粘贴的源，保存等）
+        """
+        img = self._get_img()
+        return None if img is None else _readonly_view(img)
+
+    def _share_img(self):
+        """
+        返回与执行对象共享像素缓冲区的只读视图，执行对象标记为共享，之后通过img属性访问时先复制；
+        接收该视图的对象须通过_mark_img_shared同样标记
+        """
+        img = self._get_img()
+        if img is None:
+            return None
+        self._img_shared = True
+        return _readonly_view(img)
+
+    def _mark_img_shared(self):
+        self._img_shared = self._img is not None
+        return self
+
+    def read_img(self):
+        """
+        返回图像像素，未解码时调用加载函数解码但不保存在对象中，供外部缓存使用
+        """
+        if self._img is None and self._img_loader is not None:
+            return self._img_loader()
+        return self._img
+
+    @property
+    def img_loaded(self):
+        """
+        图像像素是否已经解码
+        """
+        return self._img is not None
+
+    @property
+    def img_shape(self):
+        """
+        返回图像shape，延迟解码模式下未解码时返回预先获取的shape，不会触发解码
+        """
+        if self._img is not None:
+            return self._img.shape
+        if self._img_shape is not None:
+            return self._img_shape
+        return None
+
     def copy(self):
-        return DataPackage(
+        lazy = not self.img_loaded and self._img_loader is not None
+        # 数组模式下只需深拷贝除标注条目外的字段，数组本身不可变，可以共享
+        ret = DataPackage(
             img_path=self.img_path,
-            img=self.img.copy(),
+            img=None if lazy else self._share_img(),
             label_path=self.label_path,
-            label=copy.deepcopy(self.label),
+            label=self._label,
             cat_idx=self.cat_idx,
         )
+        ret._mark_img_shared()
+        if self._label_arrays is not None:
+            ret.set_label_arrays(self._label_arrays.copy())
+        if lazy:
+            # 尚未解码的对象，复制后依然保持延迟解码
+            ret.bind_img_loader(
+                self._img_loader, self._img_shape, self._img_region_reader
+            )
+        return ret
 
     @property
     def label_items(self):
@@ -154,18 +476,10 @@ class DataPackage:
         """
         返回标注类型为rectangle的元素列表，元素对象为cvutils.RectROI对象
         """
-        rectangle_items = []
-        for shapes_item in self.label_items:
-            if shapes_item["shape_type"] == "rectangle":
-                rectangle_items.append(
-                    cvutils.RectROI.create_from_xyxy(
-                        shapes_item["points"][0][0],
-                        shapes_item["points"][0][1],
-                        shapes_item["points"][1][0],
-                        shapes_item["points"][1][1],
-                    )
-                )
-        return rectangle_items
+        return [
+            cvutils.RectROI.create_from_xyxy(x1, y1, x2, y2)
+            for x1, y1, x2, y2 in self.label_arrays.get_rectangle_points().tolist()
+        ]
 
     @property
     def rectangle_items(self):
@@ -185,7 +499,7 @@ class DataPackage:
 
         """
         self.img_path = img_path
-        self.label["imagePath"] = str(Path(img_path).name)
+        self._label["imagePath"] = str(Path(img_path).name)
         if update_label_path_by_default:
             self.label_path = str(Path(img_path).with_suffix(".json"))
 
@@ -207,7 +521,7 @@ class DataPackage:
         Returns:
 
         """
-        h, w = self.img.shape[:2]
+        h, w = self.img_shape[:2]
         if min_mode == "and":
             fit_min = h >= min_size[1] and w >= min_size[0]
         else:
@@ -219,7 +533,7 @@ class DataPackage:
         return fit_min and fit_max
 
     def merge(self, other):
-        self.label_items.extend(other.label_items)
+        self._append_label_arrays(other.label_arrays)
         return self
 
     def resize_by_factor(self, fx, fy, interpolation=1):
@@ -234,20 +548,23 @@ class DataPackage:
 
         """
 
-        img = cv2.resize(self.img, None, fx=fx, fy=fy, interpolation=interpolation)
+        img = cv2.resize(
+            self.get_readonly_img(), None, fx=fx, fy=fy, interpolation=interpolation
+        )
         img_shape = img.shape
         img_path = pyutils.append_file_name(
             self.img_path, f"_resize-{img_shape[1]}-{img_shape[0]}"
         )
-        ret_dp = DataPackage.gen_default_data_package(img_path, img_shape)
-        ret_dp.img = img
-        for label_item in self.label_items:
-            ret_dp.label_items.append(self.resize_label_item(label_item, fx, fy))
+        ret_dp = DataPackage(
+            img_path, img, None, self.gen_default_label(img_path, img_shape[:2])
+        )
+        # 全部标注条目一次数组运算完成缩放
+        ret_dp.set_label_arrays(self.label_arrays.scale(fx, fy))
         return ret_dp
 
     def resize(self, dst_size, interpolation=1):
-        fx = dst_size[0] / self.img.shape[1]
-        fy = dst_size[1] / self.img.shape[0]
+        fx = dst_size[0] / self.img_shape[1]
+        fy = dst_size[1] / self.img_shape[0]
         return self.resize_by_factor(fx, fy, interpolation)
 
     def rotate_by_multi_90(self, rotate_degree):
@@ -270,39 +587,35 @@ class DataPackage:
             rotate_flag = cv2.ROTATE_90_CLOCKWISE
         else:
             rotate_flag = cv2.ROTATE_180
-        img = cv2.rotate(self.img, rotate_flag)
+        img = cv2.rotate(self.get_readonly_img(), rotate_flag)
         img_shape = img.shape
         img_path = pyutils.append_file_name(self.img_path, f"_rotate-{rotate_degree}")
-        ret_dp = DataPackage.gen_default_data_package(img_path, img_shape)
-        ret_dp.img = img
-        for label_item in self.label_items:
-            ret_dp.label_items.append(
-                self.rotate_label_item(label_item, self.img.shape, rotate_degree)
+        ret_dp = DataPackage(
+            img_path, img, None, self.gen_default_label(img_path, img_shape[:2])
+        )
+        ret_dp.set_label_arrays(
+            self.transform_labels(
+                self.get_rotate_matrix_by_multi_90(self.img_shape, rotate_degree)
             )
-            pass
+        )
         return ret_dp
 
     def pad_with_tblr(self, pad_tblr, img_path=None, auto_gen_img_path=True):
         t, b, l, r = pad_tblr
-        new_height = self.img.shape[0] + t + b
-        new_width = self.img.shape[1] + l + r
-        num_channels = len(self.img.shape)
+        new_height = self.img_shape[0] + t + b
+        new_width = self.img_shape[1] + l + r
+        num_channels = len(self.img_shape)
+        src_img = self.get_readonly_img()
         if num_channels == 1:
-            new_img = np.zeros(shape=(new_height, new_width), dtype=self.img.dtype)
-            new_img[
-                t : t + self.img.shape[0], l : l + self.img.shape[1]
-            ] = self.img.copy()
+            new_img = np.zeros(shape=(new_height, new_width), dtype=src_img.dtype)
+            new_img[t : t + self.img_shape[0], l : l + self.img_shape[1]] = src_img
         elif num_channels == 3:
-            new_img = np.zeros(shape=(new_height, new_width, 3), dtype=self.img.dtype)
-            new_img[
-                t : t + self.img.shape[0], l : l + self.img.shape[1], :
-            ] = self.img.copy()
-        new_label = copy.deepcopy(self.label)
+            new_img = np.zeros(shape=(new_height, new_width, 3), dtype=src_img.dtype)
+            new_img[t : t + self.img_shape[0], l : l + self.img_shape[1], :] = src_img
+        label_arrays = self.label_arrays.translate(l, t)
+        new_label = dict(self._label)
         new_label["imageHeight"] = new_height
         new_label["imageWidth"] = new_width
-        new_label["shapes"] = []
-        for label_item in self.label_items:
-            new_label["shapes"].append(self.translate_label_item(label_item, l, t))
         if img_path is None and auto_gen_img_path:
             dir_path = Path(Path(self.img_path).parent)
             img_path = str(
@@ -322,25 +635,27 @@ class DataPackage:
             new_label["imagePath"] = str(Path(img_path).name)
         elif img_path is None:
             new_label["imagePath"] = None
-        return DataPackage(
+        ret = DataPackage(
             img_path=img_path,
             img=new_img,
             label_path=None,
             label=new_label,
             cat_idx=self.cat_idx,
         )
+        ret.set_label_arrays(label_arrays)
+        return ret
 
     def pad_with_dst_size(
         self, dst_size, center=True, img_path=None, auto_gen_img_path=True
     ):
         dst_width, dst_height = dst_size
-        assert dst_height >= self.img.shape[0]
-        assert dst_width >= self.img.shape[1]
+        assert dst_height >= self.img_shape[0]
+        assert dst_width >= self.img_shape[1]
         if center:
-            t = (dst_height - self.img.shape[0]) // 2
-            b = dst_height - self.img.shape[0] - t
-            _l = (dst_width - self.img.shape[1]) // 2
-            r = dst_width - self.img.shape[1] - _l
+            t = (dst_height - self.img_shape[0]) // 2
+            b = dst_height - self.img_shape[0] - t
+            _l = (dst_width - self.img_shape[1]) // 2
+            r = dst_width - self.img_shape[1] - _l
             return self.pad_with_tblr(
                 pad_tblr=[t, b, _l, r],
                 img_path=img_path,
@@ -350,9 +665,9 @@ class DataPackage:
             raise NotImplementedError
 
     def pad_to_square(self):
-        if self.img.shape[0] == self.img.shape[1]:
+        if self.img_shape[0] == self.img_shape[1]:
             return self.copy()
-        dst_edge = max(self.img.shape[0], self.img.shape[1])
+        dst_edge = max(self.img_shape[0], self.img_shape[1])
         return self.pad_with_dst_size(dst_size=[dst_edge, dst_edge])
 
     def crop(
@@ -397,13 +712,21 @@ class DataPackage:
         """
         tl_x = max(0, tl_x)
         tl_y = max(0, tl_y)
-        br_x = min(self.img.shape[1], br_x)
-        br_y = min(self.img.shape[0], br_y)
+        br_x = min(self.img_shape[1], br_x)
+        br_y = min(self.img_shape[0], br_y)
 
         rect = cvutils.RectROI.create_from_xywh(
             tl_x, tl_y, br_x - tl_x + 1, br_y - tl_y + 1
         )
-        img = rect.crop(self.img)
+        img = None
+        shared = False
+        if not self.img_loaded and self._img_region_reader is not None:
+            # 图像尚未解码时只读取裁剪区域，不解码整张图像
+            img = self._img_region_reader(tl_x, tl_y, br_x - tl_x + 1, br_y - tl_y + 1)
+        if img is None:
+            # 裁剪结果为原图的切片，与执行对象共享像素缓冲区
+            img = _readonly_view(rect.crop(self._share_img()))
+            shared = True
 
         if img_path is not None and append_coords_to_file_name:
             img_path = str(Path(img_path).absolute())
@@ -424,44 +747,48 @@ class DataPackage:
         )
 
         label_ = self.gen_default_label(str(img_path), img.shape)
-
-        for shapes_item in self.label_items:
-            if shapes_item["shape_type"] == "rectangle":
-                tl_x_, tl_y_ = round(shapes_item["points"][0][0]), round(
-                    shapes_item["points"][0][1]
-                )
-                br_x_, br_y_ = round(shapes_item["points"][1][0]), round(
-                    shapes_item["points"][1][1]
-                )
-                # 原始标注条目中完整落入裁剪区域中的标注，其他标注信息保留，坐标点经平移调整后写入到新对象的标注中。
-                total_contain = rect.contain([tl_x_, tl_y_]) and rect.contain(
-                    [br_x_, br_y_]
-                )
-
-                if total_contain:
-                    tl = [tl_x_ - tl_x, tl_y_ - tl_y]
-                    br = [br_x_ - tl_x, br_y_ - tl_y]
-
-                    temp = copy.deepcopy(shapes_item)
-                    temp["points"] = [
-                        [round(tl[0]), round(tl[1])],
-                        [round(br[0]), round(br[1])],
-                    ]
-                    label_["shapes"].append(temp)
-            else:
-                continue
+        ret = DataPackage(img_path, img, label_path, label_, cat_idx)
+        if shared:
+            ret._mark_img_shared()
+
+        # 原始标注条目中完整落入裁剪区域中的rectangle标注，其他标注信息保留，坐标点取整并经平移调整后写入到新对象的标注中。
+        la = self.label_arrays
+        # 取整后落入裁剪区域的条目，原坐标必然落入向外扩展0.5的区域，由空间索引取得候选后再精确判断
+        idxes = self.spatial_index.contained(
+            tl_x - 0.5, tl_y - 0.5, br_x + 0.5, br_y + 0.5
+        )
+        pts = np.round(la.get_rectangle_points(idxes))
+        total_contain = (
+            (pts[:, [0, 2]] >= tl_x).all(axis=1)
+            & (pts[:, [0, 2]] <= br_x).all(axis=1)
+            & (pts[:, [1, 3]] >= tl_y).all(axis=1)
+            & (pts[:, [1, 3]] <= br_y).all(axis=1)
+        )
+        keep = idxes[total_contain]
+        ret.set_label_arrays(
+            LabelArrays(
+                (pts[total_contain] - [tl_x, tl_y, tl_x, tl_y]).reshape(-1, 2),
+                np.arange(0, 2 * len(keep) + 1, 2, dtype=np.int64),
+                la.shape_types[keep],
+                la.category_ids[keep],
+                la.vocabulary,
+                [la.extras[idx] for idx in keep],
+                np.ones((2 * len(keep), 2), dtype=bool),
+            )
+        )
         # todo:
         if label_itself:
             pass
 
-        return DataPackage(img_path, img, label_path, label_, cat_idx)
+        return ret
 
     def random_crop(self, dst_size):
-        if self.img.shape[0] == dst_size[0] and self.img.shape[1] == dst_size[1]:
+        img_shape = self.img_shape
+        if img_shape[0] == dst_size[0] and img_shape[1] == dst_size[1]:
             return self.copy()
-        assert self.img.shape[0] > dst_size[0] and self.img.shape[1] > dst_size[1]
-        tl_x = random.randint(0, self.img.shape[1] - dst_size[1] - 1)
-        tl_y = random.randint(0, self.img.shape[0] - dst_size[0] - 1)
+        assert img_shape[0] > dst_size[0] and img_shape[1] > dst_size[1]
+        tl_x = random.randint(0, img_shape[1] - dst_size[1] - 1)
+        tl_y = random.randint(0, img_shape[0] - dst_size[0] - 1)
         # todo: 若bg图的尺寸小于目标尺寸，执行pad操作
         ret = self.crop(
             tl_x,
@@ -529,6 +856,18 @@ class DataPackage:
 
         Returns:
 
+        """
+        return list(
+            self.iter_crop_rectangle_items(
+                dst_dir=dst_dir, margin_tblr=margin_tblr, filter_func=filter_func
+            )
+        )
+
+    def iter_crop_rectangle_items(
+        self, dst_dir=None, margin_tblr=None, filter_func=None
+    ):
+        """
+        crop_rectangle_items的生成器版本，逐个返回裁剪得到的DataPackage对象，参数含义相同.
         """
         if self.img_path is None or dst_dir is None:
             dst_img_path = self.img_path
@@ -536,19 +875,16 @@ class DataPackage:
             dst_img_path = str(
                 Path(Path(dst_dir) / Path(self.img_path).name).absolute()
             )
-        ret_list = []
-        for label_item in self.label_items:
-            if label_item["shape_type"] == "rectangle":
-                if (filter_func is not None) and (not filter_func(label_item)):
-                    continue
-                ret_list.append(
-                    self.crop_rectangle_item(
-                        rectangle_item=label_item,
-                        img_path=dst_img_path,
-                        margin_tblr=margin_tblr,
-                    )
-                )
-        return ret_list
+        la = self.label_arrays
+        for idx in np.flatnonzero(la.get_rectangle_mask()):
+            label_item = la.get_item(idx)
+            if (filter_func is not None) and (not filter_func(label_item)):
+                continue
+            yield self.crop_rectangle_item(
+                rectangle_item=label_item,
+                img_path=dst_img_path,
+                margin_tblr=margin_tblr,
+            )
 
     def crop_point_item(self, point_item, crop_size, img_path=None, cat_idx=-1):
         """
@@ -586,7 +922,7 @@ class DataPackage:
         raise NotImplementedError
 
     def visualize(self):
-        img = self.img.copy()
+        img = self.get_readonly_img().copy()
         for rectangle_item in self.rectangle_items:
             rectangle_item.draw(img, (0, 0, 255), 1)
 
@@ -596,22 +932,41 @@ class DataPackage:
 
         cvutils.imshow(img, win_name, 0)
 
-    def save_img(self):
+    def save_img(self, codec=None):
+        """
+        保存图像
+        Args:
+            codec: 编码方式（见data_aug.image_io.register_codec），为None时使用全局默认编码方式，
+                再否则按img_path的后缀选择。编码方式的后缀与img_path不一致时，img_path（及imagePath字段）的后缀随之更新
+
+        Returns:
+
+        """
         if self.img_path is not None:
-            cvutils.imwrite(self.img_path, self.img)
+            img_codec = get_codec(codec)
+            if (
+                img_codec is not None
+                and Path(self.img_path).suffix.lower() != img_codec.suffix
+            ):
+                self.update_img_path(
+                    str(Path(self.img_path).with_suffix(img_codec.suffix)),
+                    update_label_path_by_default=False,
+                )
+            imwrite(self.img_path, self.get_readonly_img(), codec=img_codec)
             return True
         logger.warning(r"self.img_path is None!")
         return False
 
     def save_label(self):
         if self.label_path is not None:
-            pyutils.dump_json(self.label, self.label_path)
+            json_io.dump_json(self.export_label(), self.label_path)
             return True
         logger.warning(r"self.label_path is None!")
         return False
 
-    def save(self):
-        save_img = self.save_img()
+    def save(self, codec=None):
+        # 先保存图像，编码方式可能更新imagePath字段
+        save_img = self.save_img(codec=codec)
         save_label = self.save_label()
         return save_img and save_label
 
@@ -627,10 +982,11 @@ class DataPackage:
         Returns:
 
         """
-        new_label_item = copy.deepcopy(label_item)
-        new_label_item["points"] = []
-        for pt in label_item["points"]:
-            new_label_item["points"].append([pt[0] + x, pt[1] + y])
+        # 只替换points，其余字段浅拷贝
+        new_label_item = dict(label_item)
+        new_label_item["points"] = (
+            np.asarray(label_item["points"], dtype=np.float64).reshape(-1, 2) + [x, y]
+        ).tolist()
         return new_label_item
 
     @staticmethod
@@ -645,10 +1001,10 @@ class DataPackage:
         Returns:
 
         """
-        new_label_item = copy.deepcopy(label_item)
-        new_label_item["points"] = []
-        for pt in label_item["points"]:
-            new_label_item["points"].append([pt[0] * fx, pt[1] * fy])
+        new_label_item = dict(label_item)
+        new_label_item["points"] = (
+            np.asarray(label_item["points"], dtype=np.float64).reshape(-1, 2) * [fx, fy]
+        ).tolist()
         return new_label_item
 
     @staticmethod
@@ -663,51 +1019,101 @@ class DataPackage:
         Returns:
 
         """
-        h, w = img_shape[:2]
-        if rotate_degree == 90:
-            M = np.array([[0, 1, 0], [-1, 0, w], [0, 0, 1]])
-        elif rotate_degree == 270:
-            M = np.array([[0, -1, h], [1, 0, 0], [0, 0, 1]])
-        else:
-            M = np.array([[-1, 0, w], [0, -1, h], [0, 0, 1]])
-        new_label_item = copy.deepcopy(label_item)
-        new_label_item["points"] = []
-
+        M = DataPackage.get_rotate_matrix_by_multi_90(img_shape, rotate_degree)
+        new_label_item = dict(label_item)
+        pts = np.asarray(label_item["points"], dtype=np.float64).reshape(-1, 2)
+        # 所有点一次矩阵乘法完成变换
+        new_pts = (pts @ M[:2, :2].T + M[:2, 2]).tolist()
+        # 与整数矩阵逐点运算的结果类型一致：两个坐标均为整数的点旋转后仍为整数
+        new_pts = [
+            [int(v) for v in new_pt]
+            if all(isinstance(v, (int, np.integer)) for v in pt)
+            else new_pt
+            for pt, new_pt in zip(label_item["points"], new_pts)
+        ]
         if label_item["shape_type"] == "rectangle":
-            pt = label_item["points"][0]
-            x1, y1 = np.matmul(M, np.array([pt[0], pt[1], 1])).tolist()[:2]
-            pt = label_item["points"][1]
-            x2, y2 = np.matmul(M, np.array([pt[0], pt[1], 1])).tolist()[:2]
-            new_label_item["points"].append([min(x1, x2), min(y1, y2)])
-            new_label_item["points"].append([max(x1, x2), max(y1, y2)])
-        else:
-            for pt in label_item["points"]:
-                new_pt = np.matmul(M, np.array([pt[0], pt[1], 1])).tolist()[:2]
-                new_label_item["points"].append([new_pt[0], new_pt[1]])
+            (x1, y1), (x2, y2) = new_pts[:2]
+            new_pts = [[min(x1, x2), min(y1, y2)], [max(x1, x2), max(y1, y2)]]
+        new_label_item["points"] = new_pts
         return new_label_item
 
+    @staticmethod
+    def get_rotate_matrix_by_multi_90(img_shape, rotate_degree):
+        """
+        返回将shape为img_shape的图像上的坐标旋转90，180或270度（逆时针为正）并平移到旋转后图像中的3x3仿射矩阵
+        """
+        return get_rotate_matrix_by_multi_90(img_shape, rotate_degree)
+
+    def transform_labels(self, M, normalize_rectangles=True):
+        """
+        对执行对象的全部标注条目施加同一个仿射变换，一次数组运算完成，返回新的LabelArrays对象，执行对象不变
+        Args:
+            M: 2x3或3x3的仿射矩阵
+            normalize_rectangles: 是否将变换后rectangle条目的两点整理为左上与右下
+
+        Returns:
+
+        """
+        return self.label_arrays.transform(M, normalize_rectangles)
+
+    def transform_chain(self):
+        """
+        返回以执行对象为源的几何变换链（见data_aug.transform_chain.TransformChain），
+        链式记录rotate_by_multi_90，resize，pad_with_tblr，random_crop等操作后由apply_transform_chain一次生成结果，
+        例如 dp.apply_transform_chain(dp.transform_chain().rotate_by_multi_90(90).resize_by_factor(0.5, 0.5))
+        """
+        return TransformChain(self.img_shape, self.img_path)
+
+    def apply_transform_chain(self, chain, interpolation=1, img_val=0):
+        """
+        按变换链一次生成图像（不产生中间图像）并一次变换全部标注条目，返回新创建的DataPackage对象
+        Args:
+            chain: 由transform_chain创建的变换链
+            interpolation: 插值方式，默认为1（linear）
+            img_val: 画布中源图像未覆盖区域（补边）的像素值，默认为0
+
+        Returns:
+
+        """
+        assert isinstance(chain, TransformChain)
+        if chain.is_identity:
+            return self.copy()
+        img = chain.warp_img(self.get_readonly_img(), interpolation, img_val)
+        ret = DataPackage(
+            chain.img_path,
+            img,
+            None,
+            self.gen_default_label(chain.img_path, img.shape[:2]),
+            self.cat_idx,
+        )
+        ret.set_label_arrays(chain.transform_label_arrays(self.label_arrays))
+        return ret
+
     def paste_to(self, dst_data_package, tl_x, tl_y):
         assert isinstance(dst_data_package, DataPackage)
-        num_channels = len(self.img.shape)
-        img = dst_data_package.img
-        label = dst_data_package.label
+        num_channels = len(self.img_shape)
+        img = dst_data_package.get_writable_img()
+        label_arrays = LabelArrays.concatenate(
+            [dst_data_package.label_arrays, self.label_arrays.translate(tl_x, tl_y)]
+        )
         x = tl_x
         y = tl_y
         if num_channels == 1:
-            img[y : y + self.img.shape[0], x : x + self.img.shape[1]] = self.img.copy()
+            img[
+                y : y + self.img_shape[0], x : x + self.img_shape[1]
+            ] = self.get_readonly_img()
         elif num_channels == 3:
             img[
-                y : y + self.img.shape[0], x : x + self.img.shape[1], :
-            ] = self.img.copy()
-        new_label = copy.deepcopy(label)
-        for label_item in self.label_items:
-            new_label["shapes"].append(self.translate_label_item(label_item, x, y))
-        return DataPackage(
+                y : y + self.img_shape[0], x : x + self.img_shape[1], :
+            ] = self.get_readonly_img()
+        ret = DataPackage(
             img_path=dst_data_package.img_path,
-            img=img,
+            img=dst_data_package._share_img(),
             label_path=dst_data_package.label_path,
-            label=new_label,
-        )
+            label=dst_data_package._label,
+        )._mark_img_shared()
+        ret.set_label_arrays(label_arrays)
+        return ret
 
     def paste(self, dst_data_package, tl_x, tl_y):
         self.paste_to(dst_data_package, tl_x, tl_y)
@@ -725,20 +1131,17 @@ class DataPackage:
 
         """
         assert isinstance(src_data_package, DataPackage)
-        paste_height, paste_width = src_data_package.img.shape[:2]
+        paste_height, paste_width = src_data_package.img_shape[:2]
 
         if in_place:
             ret = self
         else:
             ret = self.copy()
 
-        ret.img[
+        ret.get_writable_img()[
             tl_y : tl_y + paste_height, tl_x : tl_x + paste_width, :
-        ] = src_data_package.img.copy()
-        for label_item_to_append in src_data_package.label_items:
-            ret.label_items.append(
-                ret.translate_label_item(label_item_to_append, tl_x, tl_y)
-            )
+        ] = src_data_package.get_readonly_img()
+        ret._append_label_arrays(src_data_package.label_arrays.translate(tl_x, tl_y))
 
         return ret
 
@@ -753,6 +1156,10 @@ class DataPackage:
         first_size=None,
         max_size=None,
         min_size=None,
+        placement="random",
+        pack_jitter=0,
+        pack_rotate=False,
+        fg_bank=None,
     ):
         """
         给定源对象迭代器，粘贴次数，是否允许重叠，不允许重叠时单个源对象的最大尝试粘贴次数，判断是否重合时的余量，将源对象粘贴到执行对象，
@@ -764,12 +1171,21 @@ class DataPackage:
             num_max_try: 不允许发生重合时同一个源对象的最大尝试粘贴次数
             overlap_margin: 判断是否发生重合时的雨量，默认为0
             in_place: 是否原地操作，默认为False
+            placement: 不允许重合时粘贴位置的选取方式（见data_aug.placement.PLACEMENTS），默认为random，
+                即随机生成位置并最多尝试num_max_try次；为occupancy时在全部不重合的位置中一次均匀采样，忽略num_max_try；
+                为pack时先取得全部源对象，再按尺寸从大到小密集排布后一次粘贴，放不下的源对象跳过
+            pack_jitter: placement为pack时每个源对象占位在宽高上随机增加的最大像素数，源对象在占位内随机偏移，默认为0
+            pack_rotate: placement为pack时是否允许将源对象旋转90度以便放下，默认为False
+            fg_bank: 前景增强库（见data_aug.fg_bank.ForegroundBank），库中的源对象直接取用预先生成的旋转与缩放结果，默认为None
 
         Returns:
 
         """
-
+        assert placement in PLACEMENTS
         num_pasted = 0
+        num_skipped = 0
+        # placement为pack时收集的源对象
+        packing_list = []
         if in_place:
             ret = self
         else:
@@ -778,75 +1194,56 @@ class DataPackage:
             try:
                 src_data_package = next(src_data_package_iter)
             except StopIteration:
-                return ret
-
-            # 对源对象进行基本的增强操作
-            assert isinstance(src_data_package, DataPackage)
-
-            # 随机旋转90°整数倍
-            rotate_degree = random.randint(0, 3)
-            if rotate_degree != 0:
-                src_data_package = src_data_package.rotate_by_multi_90(
-                    rotate_degree * 90
-                )
+                break
+
+            src_data_package = self._augment_src_for_paste(
+                src_data_package,
+                first_size if not num_pasted else None,
+                max_size,
+                min_size,
+                fg_bank,
+            )
 
-            # 均匀分布方式在某个区间内生成缩放系数
-            if not num_pasted and first_size is not None:
-                first_scale = first_size / max(
-                    src_data_package.img.shape[0], src_data_package.img.shape[1]
-                )
-                scale_range = [0.95 * first_scale, 1.0 * first_scale]
-                r = random.random()
-                scale_x = r * (scale_range[1] - scale_range[0]) + scale_range[0]
-                scale_y = r * (scale_range[1] - scale_range[0]) + scale_range[0]
-            else:
-                if max_size is not None:
-                    max_scale = max_size / max(
-                        src_data_package.img.shape[0], src_data_package.img.shape[1]
-                    )
-                else:
-                    max_scale = 1.0
-                if min_size is not None:
-                    min_scale = min_size / max(
-                        src_data_package.img.shape[0], src_data_package.img.shape[1]
-                    )
-                else:
-                    min_scale = 0.9
-                assert max_scale > min_scale
-                scale_range = [min_scale, max_scale]
-                r = random.random()
-                rx = random.random() * 0.05
-                ry = random.random() * 0.05
-                scale_x = (r + rx) * (scale_range[1] - scale_range[0]) + scale_range[0]
-                scale_y = (r + ry) * (scale_range[1] - scale_range[0]) + scale_range[0]
-            # logger.debug(f"{scale_x}, {scale_y}")
-            src_data_package = src_data_package.resize_by_factor(fx=scale_x, fy=scale_y)
-
-            if allow_overlap:
+            if not allow_overlap and placement == "pack":
+                packing_list.append(src_data_package)
+            elif allow_overlap:
                 # 在合法区域内随机生成粘贴位置左上角坐标
                 tl_x = random.randint(
-                    0, ret.img.shape[1] - src_data_package.img.shape[1] - 1
+                    0, ret.img_shape[1] - src_data_package.img_shape[1] - 1
                 )
                 tl_y = random.randint(
-                    0, ret.img.shape[0] - src_data_package.img.shape[0] - 1
+                    0, ret.img_shape[0] - src_data_package.img_shape[0] - 1
                 )
-                # 调用paste_by方法执行当前源对象的粘贴操作。
-                ret = ret.paste_by(src_data_package, tl_x, tl_y)
+                # 调用paste_by方法执行当前源对象的粘贴操作，ret已是独立的对象（或in_place时的执行对象本身），原地粘贴即可。
+                ret = ret.paste_by(src_data_package, tl_x, tl_y, in_place=True)
+            elif placement == "occupancy":
+                # 由已有rectangle标注（经空间索引维护）计算全部可用位置，一次采样，没有可用位置时跳过当前源对象
+                pos = sample_free_position(
+                    ret.img_shape,
+                    ret.spatial_index.boxes,
+                    src_data_package.img_shape[1],
+                    src_data_package.img_shape[0],
+                    overlap_margin,
+                )
+                if pos is None:
+                    num_skipped += 1
+                else:
+                    ret = ret.paste_by(src_data_package, *pos, in_place=True)
             else:
                 num_try = 0
                 # 需要考虑重叠冲突处理的场合，循环操作直至生成有效位置，若到达最大尝试次数依然找不到有效位置，粘贴次数自增，跳过当前源对象的粘贴操作。
                 while num_try < num_max_try:
                     tl_x = random.randint(
-                        0, ret.img.shape[1] - src_data_package.img.shape[1] - 1
+                        0, ret.img_shape[1] - src_data_package.img_shape[1] - 1
                     )
                     tl_y = random.randint(
-                        0, ret.img.shape[0] - src_data_package.img.shape[0] - 1
+                        0, ret.img_shape[0] - src_data_package.img_shape[0] - 1
                     )
                     if ret.check_overlap(
                         tl_x - overlap_margin,
                         tl_y - overlap_margin,
-                        src_data_package.img.shape[1] + overlap_margin * 2,
-                        src_data_package.img.shape[0] + overlap_margin * 2,
+                        src_data_package.img_shape[1] + overlap_margin * 2,
+                        src_data_package.img_shape[0] + overlap_margin * 2,
                     ):
                         # logger.info("conflict")
                         num_try += 1
@@ -857,14 +1254,145 @@ class DataPackage:
                     else:
                         # logger.info("paste")
                         # 调用paste_by方法执行当前源对象的粘贴操作。
-                        ret = ret.paste_by(
-                            src_data_package, tl_x, tl_y, in_place=in_place
-                        )
+                        ret = ret.paste_by(src_data_package, tl_x, tl_y, in_place=True)
                         break
             # ret.visualize()
             num_pasted += 1
+        if packing_list:
+            num_skipped += ret._paste_packed(
+                packing_list, overlap_margin, pack_jitter, pack_rotate
+            )
+        if num_skipped:
+            logger.debug(
+                f"{num_skipped} of {num_pasted} objects skipped: no free position left"
+            )
         return ret
 
+    @staticmethod
+    def _augment_src_for_paste(
+        src_data_package, first_size, max_size, min_size, fg_bank=None
+    ):
+        """
+        对待粘贴的源对象进行基本的增强操作（随机旋转90°整数倍与随机缩放），返回新创建的DataPackage对象，
+        first_size不为None时缩放到最长边约为first_size，否则按max_size与min_size确定缩放范围。
+        源对象在前景增强库fg_bank中时直接从库中取得结果
+        """
+        assert isinstance(src_data_package, DataPackage)
+        # 随机旋转90°整数倍，旋转与下面的缩放记录在同一个变换链中，最后一次生成
+        rotate_degree = random.randint(0, 3) * 90
+        src_height, src_width = src_data_package.img_shape[:2]
+
+        # 均匀分布方式在某个区间内生成缩放系数
+        if first_size is not None:
+            first_scale = first_size / max(src_height, src_width)
+            scale_range = [0.95 * first_scale, 1.0 * first_scale]
+            r = random.random()
+            scale_x = r * (scale_range[1] - scale_range[0]) + scale_range[0]
+            scale_y = r * (scale_range[1] - scale_range[0]) + scale_range[0]
+        else:
+            if max_size is not None:
+                max_scale = max_size / max(src_height, src_width)
+            else:
+                max_scale = 1.0
+            if min_size is not None:
+                min_scale = min_size / max(src_height, src_width)
+            else:
+                min_scale = 0.9
+            assert max_scale > min_scale
+            scale_range = [min_scale, max_scale]
+            r = random.random()
+            rx = random.random() * 0.05
+            ry = random.random() * 0.05
+            scale_x = (r + rx) * (scale_range[1] - scale_range[0]) + scale_range[0]
+            scale_y = (r + ry) * (scale_range[1] - scale_range[0]) + scale_range[0]
+        # logger.debug(f"{scale_x}, {scale_y}")
+        bank_idx = (
+            fg_bank.find(src_data_package.img_path) if fg_bank is not None else None
+        )
+        if bank_idx is not None:
+            img, label_arrays = fg_bank.draw(bank_idx, rotate_degree, scale_x, scale_y)
+            ret = DataPackage(
+                src_data_package.img_path,
+                img,
+                None,
+                DataPackage.gen_default_label(src_data_package.img_path, img.shape[:2]),
+                src_data_package.cat_idx,
+            )
+            ret.set_label_arrays(label_arrays)
+            return ret
+        chain = src_data_package.transform_chain()
+        chain.rotate_by_multi_90(rotate_degree)
+        chain.resize_by_factor(fx=scale_x, fy=scale_y)
+        return src_data_package.apply_transform_chain(chain)
+
+    @staticmethod
+    def _get_paste_extent(data_package):
+        """
+        返回源对象粘贴时占据的整数范围(x0, y0, x1, y1)（相对其图像左上角），
+        缩放后的标注坐标可能略微超出取整后的图像范围，取图像与标注外接框的并集
+        """
+        height, width = data_package.img_shape[:2]
+        boxes = data_package.label_arrays.get_bounding_boxes()
+        if not len(boxes) or np.isnan(boxes).all():
+            return 0, 0, width, height
+        return (
+            min(0, math.floor(np.nanmin(boxes[:, 0]))),
+            min(0, math.floor(np.nanmin(boxes[:, 1]))),
+            max(width, math.ceil(np.nanmax(boxes[:, 2]))),
+            max(height, math.ceil(np.nanmax(boxes[:, 3]))),
+        )
+
+    def _paste_packed(self, src_data_package_list, margin=0, jitter=0, rotate=False):
+        """
+        将一批源对象按尺寸从大到小以MaxRects密集排布（避开已有的rectangle标注），像素逐个写入后标注一次追加，
+        返回放不下而跳过的源对象数量
+        """
+        height, width = self.img_shape[:2]
+        margin = int(math.ceil(margin))
+        # 与随机粘贴相同，左上角不超过W - w - 1；每个占位包含源对象及其右下方的margin
+        packer = MaxRectsPacker(width - 1, height - 1)
+        for x0, y0, x1, y1 in self.spatial_index.boxes.tolist():
+            packer.occupy(
+                math.floor(x0) - margin,
+                math.floor(y0) - margin,
+                math.ceil(x1) + margin,
+                math.ceil(y1) + margin,
+            )
+        src_data_package_list = sorted(
+            src_data_package_list,
+            key=lambda dp: (max(dp.img_shape[:2]), dp.img_shape[0] * dp.img_shape[1]),
+            reverse=True,
+        )
+        img = None
+        label_arrays_list = []
+        num_skipped = 0
+        for src in src_data_package_list:
+            x0, y0, x1, y1 = self._get_paste_extent(src)
+            slot = packer.insert(
+                x1 - x0 + margin + random.randint(0, jitter),
+                y1 - y0 + margin + random.randint(0, jitter),
+                allow_rotate=rotate,
+            )
+            if slot is None:
+                num_skipped += 1
+                continue
+            x, y, slot_width, slot_height, rotated = slot
+            if rotated:
+                src = src.rotate_by_multi_90(90)
+                x0, y0, x1, y1 = self._get_paste_extent(src)
+            # 在占位内随机偏移，再换算为源对象图像左上角的位置
+            x += random.randint(0, slot_width - (x1 - x0) - margin) - x0
+            y += random.randint(0, slot_height - (y1 - y0) - margin) - y0
+            if img is None:
+                img = self.get_writable_img()
+            img[
+                y : y + src.img_shape[0], x : x + src.img_shape[1]
+            ] = src.get_readonly_img()
+            label_arrays_list.append(src.label_arrays.translate(x, y))
+        if label_arrays_list:
+            self._append_label_arrays(LabelArrays.concatenate(label_arrays_list))
+        return num_skipped
+
     def check_overlap(self, tl_x, tl_y, width, height):
         """
         检查某个矩形区域是否与任意标注条目出现重合
@@ -877,17 +1405,41 @@ class DataPackage:
         Returns:
 
         """
-        pts = tl_x, tl_y, tl_x + width, tl_y + height
-        polygon_roi = cvutils.PolygonROI.create_from_rect_xyxy(*pts)
+        # 与任一rectangle标注的交集面积大于0即视为重合，只判断空间索引给出的候选
+        overlap = self.spatial_index.intersects(tl_x, tl_y, tl_x + width, tl_y + height)
+        return len(overlap) > 0
 
-        for label_item in self.label_items:
-            if label_item["shape_type"] == "rectangle":
-                pt1, pt2 = label_item["points"]
-                pts_ = [*pt1, *pt2]
-                polygon_roi_ = cvutils.PolygonROI.create_from_rect_xyxy(*pts_)
-                if polygon_roi.overlap(polygon_roi_):
-                    return True
-        return False
+    @classmethod
+    def composite(
+        cls, data_package_list, tl_coord_list, dst_size, img_path=None, img_val=0
+    ):
+        """
+        一次分配目标尺寸的画布，将各对象的图像直接写入其左上角位置，标注条目平移后一次拼接，返回新创建的DataPackage对象
+        Args:
+            data_package_list: 待拼接的DataPackage对象序列
+            tl_coord_list: 各对象在画布上的左上角坐标(x, y)序列，各对象须完整落入画布
+            dst_size: 画布尺寸(宽, 高)
+            img_path: 返回对象的img_path
+            img_val: 画布的预设像素值
+
+        Returns:
+
+        """
+        width, height = dst_size
+        img = np.full((height, width, 3), min(max(int(img_val), 0), 255), np.uint8)
+        label_arrays_list = []
+        for dp, (x, y) in zip(data_package_list, tl_coord_list):
+            assert isinstance(dp, DataPackage)
+            tile = dp.get_readonly_img()
+            assert x >= 0 and y >= 0
+            assert x + tile.shape[1] <= width and y + tile.shape[0] <= height
+            if tile.ndim == 2:
+                tile = tile[:, :, None]
+            img[y : y + tile.shape[0], x : x + tile.shape[1]] = tile
+            label_arrays_list.append(dp.label_arrays.translate(x, y))
+        ret = cls(img_path, img, None, cls.gen_default_label(img_path, img.shape[:2]))
+        ret.set_label_arrays(LabelArrays.concatenate(label_arrays_list))
+        return ret
 
     @classmethod
     def mosaic_mxn(
@@ -918,11 +1470,7 @@ class DataPackage:
         if jitter is None:
             jitter = [0, 0]
         assert len(data_package_list) <= m * n
-        # 创建目标尺寸的dp
         width, height = dst_size
-        ret_dp = DataPackage.gen_default_data_package(
-            img_path=img_path, img_shape=[dst_size[1], dst_size[0], 3], img_val=img_val
-        )
         # 计算每个拼接区域的左上角坐标
         y_block_idx_list = list(range(m))
         x_block_idx_list = list(range(n))
@@ -932,98 +1480,248 @@ class DataPackage:
         xs = [round(x_block_idx * x_offset) for x_block_idx in x_block_idx_list]
         tl_coord_list = list(itertools.product(xs, ys))
 
-        # 将序列中的对象依次以列优先原则粘贴到待返回对象上。
-        for idx, dp in enumerate(data_package_list):
-            assert isinstance(dp, DataPackage)
-            x, y = tl_coord_list[idx]
-            x += random.randint(0, jitter[0])
-            y += random.randint(0, jitter[1])
-            ret_dp = ret_dp.paste_by(dp, x, y)
-        return ret_dp
+        # 将序列中的对象依次以列优先原则写入一次分配的目标画布
+        tl_coord_list = [
+            (x + random.randint(0, jitter[0]), y + random.randint(0, jitter[1]))
+            for x, y in tl_coord_list[: len(data_package_list)]
+        ]
+        return cls.composite(
+            data_package_list, tl_coord_list, dst_size, img_path, img_val
+        )
 
     @classmethod
     def mosaic_1p5(cls, data_package_list, dst_size, img_path=None, loc=0):
-        ret_dp = DataPackage.gen_default_data_package(
-            img_path=img_path, img_shape=[dst_size[1], dst_size[0], 3]
-        )
         # loc = random.randint(0, 3)
-        for idx, dp in enumerate(data_package_list):
-            assert isinstance(dp, DataPackage)
-            if loc == 0:
-                xs = [
-                    0,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3,
-                    0,
-                ]
-                ys = [
-                    0,
-                    0,
-                    dst_size[0] // 3,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                ]
-            elif loc == 1:
-                xs = [dst_size[0] // 3, 0, 0, 0, dst_size[0] // 3, dst_size[0] // 3 * 2]
-                ys = [
-                    0,
-                    0,
-                    dst_size[0] // 3,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                ]
-            elif loc == 2:
-                xs = [
-                    0,
-                    0,
-                    dst_size[0] // 3,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                    dst_size[0] // 3 * 2,
-                ]
-                ys = [dst_size[0] // 3, 0, 0, 0, dst_size[0] // 3, dst_size[0] // 3 * 2]
-            elif loc == 3:
-                xs = [dst_size[0] // 3, dst_size[0] // 3 * 2, dst_size[0] // 3, 0, 0, 0]
-                ys = [dst_size[0] // 3, 0, 0, 0, dst_size[0] // 3, dst_size[0] // 3 * 2]
-
-            ret_dp = dp.paste(ret_dp, xs[idx], ys[idx])
-        return ret_dp
-
-
-def gen_data_package_list_from_img_file_for_folder(dir_path, suffix_patterns):
+        if loc == 0:
+            xs = [
+                0,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3,
+                0,
+            ]
+            ys = [
+                0,
+                0,
+                dst_size[0] // 3,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+            ]
+        elif loc == 1:
+            xs = [dst_size[0] // 3, 0, 0, 0, dst_size[0] // 3, dst_size[0] // 3 * 2]
+            ys = [
+                0,
+                0,
+                dst_size[0] // 3,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+            ]
+        elif loc == 2:
+            xs = [
+                0,
+                0,
+                dst_size[0] // 3,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+                dst_size[0] // 3 * 2,
+            ]
+            ys = [dst_size[0] // 3, 0, 0, 0, dst_size[0] // 3, dst_size[0] // 3 * 2]
+        elif loc == 3:
+            xs = [dst_size[0] // 3, dst_size[0] // 3 * 2, dst_size[0] // 3, 0, 0, 0]
+            ys = [dst_size[0] // 3, 0, 0, 0, dst_size[0] // 3, dst_size[0] // 3 * 2]
+
+        tl_coord_list = list(zip(xs, ys))[: len(data_package_list)]
+        return cls.composite(data_package_list, tl_coord_list, dst_size, img_path)
+
+
+def _readonly_view(img):
+    view = img.view()
+    view.flags.writeable = False
+    return view
+
+
+def _glob_paths_for_folder(dir_path, include_patterns):
     if not isinstance(dir_path, list):
         dir_path = [dir_path]
-    img_path_list = []
+    path_list = []
     for dir_path_ in dir_path:
-        img_path_list.extend(
+        path_list.extend(
             list(
                 pyutils.glob_dir(
-                    str(Path(dir_path_).absolute()), include_patterns=suffix_patterns
+                    str(Path(dir_path_).absolute()), include_patterns=include_patterns
                 )
             )
         )
-    return [DataPackage.create_from_img_path(img_path) for img_path in img_path_list]
+    return path_list
 
 
-def gen_data_package_list_from_label_file_for_folder(dir_path):
+def _label_paths_for_folder(dir_path, use_manifest=False):
+    # use_manifest为True时从各文件夹的清单（见manifest.get_manifest）中获取标注路径，不再遍历文件夹
+    if not use_manifest:
+        return _glob_paths_for_folder(dir_path, ["*.json"])
     if not isinstance(dir_path, list):
         dir_path = [dir_path]
     label_path_list = []
     for dir_path_ in dir_path:
-        label_path_list.extend(
-            list(
-                pyutils.glob_dir(
-                    str(Path(dir_path_).absolute()), include_patterns=["*.json"]
-                )
-            )
+        label_path_list.extend(get_manifest(dir_path_).label_paths.tolist())
+    return label_path_list
+
+
+def _make_saver(num_save_workers, codec=None, sink=None):
+    """
+    创建后台保存器，以指定的编码方式在写线程中并行编码，逐个保存为文件，或写入sink（见data_aug.sink.ShardSink）
+    """
+    if sink is not None:
+        save_func = partial(sink.write, codec=codec)
+    else:
+        save_func = partial(DataPackage.save, codec=codec)
+    return AsyncDataPackageSaver(num_workers=num_save_workers, save_func=save_func)
+
+
+def _gen_output_sample_ids(sink=None):
+    # 写入分片时样本的键为"sample-00000000"等，与运行时刻无关，同一次运行按提交顺序确定
+    return gen_sample_ids(prefix="sample" if sink is not None else None)
+
+
+def _get_output_suffix(codec=None, default=".bmp"):
+    img_codec = get_codec(codec)
+    return img_codec.suffix if img_codec is not None else default
+
+
+def _ordered_map(func, items, workers=None):
+    """
+    对items逐个调用func，返回结果列表，顺序与items一致。workers大于1时使用线程池并行执行
+    （cv2解码与文件读取期间会释放GIL）。
+    """
+    if workers is None or workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def _imread(img_path, reduce_factor=1, dst_shape=None):
+    # 开启了全局磁盘缓存（见cache.set_npy_cache_dir）时优先从缓存读取
+    npy_cache = get_npy_cache()
+    if reduce_factor == 1:
+        loader = partial(imread_bgr, img_path)
+    else:
+        loader = partial(imread_reduced, img_path, reduce_factor, dst_shape)
+    if npy_cache is not None:
+        variant = f"reduced-{reduce_factor}" if reduce_factor != 1 else ""
+        return npy_cache.get(img_path, loader, variant)
+    return loader()
+
+
+def _make_img_region_reader(img_path):
+    # 目前只有未压缩的bmp支持按区域读取像素
+    if Path(img_path).suffix.lower() == ".bmp":
+        return partial(read_bmp_region, str(img_path))
+    return None
+
+
+def _make_dp_cyclic_iterator(data_package_list, cache=None):
+    if cache is None:
+        return pyutils.make_cyclic_iterator(data_package_list)
+    return make_cached_cyclic_iterator(data_package_list, cache)
+
+
+def gen_data_package_list_from_img_file_for_folder(
+    dir_path,
+    suffix_patterns,
+    lazy=False,
+    workers=None,
+    max_side=None,
+    dedup_distance=None,
+):
+    """
+    遍历文件夹（或文件夹列表）中匹配后缀的图像，创建DataPackage对象列表
+    Args:
+        dir_path: 文件夹路径或文件夹路径列表
+        suffix_patterns: 图像文件匹配模式，如["*.bmp"]
+        lazy: 是否延迟解码图像，默认为False
+        workers: 并行载入的线程数，默认为None（串行），返回列表的顺序与串行时一致
+        max_side: 后续处理所需的最大边长，不为None时以降采样分辨率解码，见DataPackage.create_from_img_path
+        dedup_distance: 默认为None，不去重；为0至3的整数时跳过与列表中前面某张图像dHash汉明距离不超过该值的图像（见data_aug.dedup）
+
+    Returns:
+
+    """
+    img_path_list = _glob_paths_for_folder(dir_path, suffix_patterns)
+    if dedup_distance is not None:
+        mask = find_duplicate_mask(img_path_list, dedup_distance, workers)
+        img_path_list = [p for p, dup in zip(img_path_list, mask) if not dup]
+    return _ordered_map(
+        partial(DataPackage.create_from_img_path, lazy=lazy, max_side=max_side),
+        img_path_list,
+        workers,
+    )
+
+
+def gen_data_package_list_from_label_file_for_folder(
+    dir_path,
+    lazy=False,
+    workers=None,
+    max_side=None,
+    use_manifest=False,
+    dedup_distance=None,
+):
+    """
+    遍历文件夹（或文件夹列表）中的标注文件，创建DataPackage对象列表
+    Args:
+        dir_path: 文件夹路径或文件夹路径列表
+        lazy: 是否延迟解码图像，默认为False
+        workers: 并行载入的线程数，默认为None（串行），返回列表的顺序与串行时一致
+        max_side: 后续处理所需的最大边长，不为None时以降采样分辨率解码，见DataPackage.create_from_label_path
+        use_manifest: 是否从文件夹清单中获取标注路径（不存在时生成），不再遍历文件夹，默认为False
+        dedup_distance: 默认为None，不去重；为0至3的整数时跳过图像重复的标注数据，见gen_data_package_list_from_img_file_for_folder
+
+    Returns:
+
+    """
+    label_path_list = _label_paths_for_folder(dir_path, use_manifest)
+    if dedup_distance is None:
+        return _ordered_map(
+            partial(DataPackage.create_from_label_path, lazy=lazy, max_side=max_side),
+            label_path_list,
+            workers,
+        )
+    # 图像路径取自标注内容，先延迟载入，去重后再解码
+    dp_list = _ordered_map(
+        partial(DataPackage.create_from_label_path, lazy=True, max_side=max_side),
+        label_path_list,
+        workers,
+    )
+    mask = find_duplicate_mask([dp.img_path for dp in dp_list], dedup_distance, workers)
+    dp_list = [dp for dp, dup in zip(dp_list, mask) if not dup]
+    if not lazy:
+        _ordered_map(DataPackage.load_img, dp_list, workers)
+    return dp_list
+
+
+def iter_data_packages_from_img_folder(
+    dir_path, suffix_patterns, lazy=False, max_side=None
+):
+    """
+    gen_data_package_list_from_img_file_for_folder的生成器版本，逐个创建并返回DataPackage对象，
+    调用方处理完一个对象后即可释放，内存占用与文件夹大小无关。
+    """
+    for img_path in _glob_paths_for_folder(dir_path, suffix_patterns):
+        yield DataPackage.create_from_img_path(img_path, lazy=lazy, max_side=max_side)
+
+
+def iter_data_packages_from_label_folder(
+    dir_path, lazy=False, max_side=None, use_manifest=False
+):
+    """
+    gen_data_package_list_from_label_file_for_folder的生成器版本，逐个创建并返回DataPackage对象。
+    """
+    for label_path in _label_paths_for_folder(dir_path, use_manifest):
+        yield DataPackage.create_from_label_path(
+            label_path, lazy=lazy, max_side=max_side
         )
-    return [
-        DataPackage.create_from_label_path(label_path) for label_path in label_path_list
-    ]
 
 
 def filter_with_size_for_folder(
@@ -1032,31 +1730,190 @@ def filter_with_size_for_folder(
     max_size=[float("inf"), float("inf")],
     min_mode="and",
     max_mode="and",
+    workers=None,
+    lazy=False,
+    use_manifest=False,
 ):
-    dp_list = gen_data_package_list_from_label_file_for_folder(src_dir)
-    ret = [
-        dp
-        for dp in dp_list
-        if dp.filter_with_size(min_size, max_size, min_mode, max_mode)
-    ]
+    """
+    按图像尺寸筛选文件夹中的标注数据，尺寸取自标注中的imageHeight与imageWidth（缺失时读取图像文件头），
+    只有满足尺寸范围的图像才会被解码。
+    Args:
+        src_dir: 标注文件夹路径或路径列表
+        min_size: 最小尺寸[w, h]
+        max_size: 最大尺寸[w, h]
+        min_mode: and或or
+        max_mode: and或or
+        workers: 并行载入与解码的线程数，默认为None（串行）
+        lazy: 为True时返回的对象也不解码，首次访问img属性时才解码，默认为False
+        use_manifest: 是否直接使用文件夹清单中记录的尺寸筛选，只有满足尺寸范围的标注文件才会被解析，默认为False
+
+    Returns:
+
+    """
+    if use_manifest:
+        src_dir_list = src_dir if isinstance(src_dir, list) else [src_dir]
+        label_path_list = []
+        for src_dir_ in src_dir_list:
+            manifest = get_manifest(src_dir_)
+            idxes = manifest.filter_with_size(min_size, max_size, min_mode, max_mode)
+            label_path_list.extend(manifest.label_paths[idxes].tolist())
+        ret = _ordered_map(
+            partial(DataPackage.create_from_label_path, lazy=True),
+            label_path_list,
+            workers,
+        )
+    else:
+        dp_list = gen_data_package_list_from_label_file_for_folder(
+            src_dir, lazy=True, workers=workers
+        )
+        ret = [
+            dp
+            for dp in dp_list
+            if dp.filter_with_size(min_size, max_size, min_mode, max_mode)
+        ]
+    if not lazy:
+        _ordered_map(DataPackage.load_img, ret, workers)
     return ret
 
 
-def crop_rectangle_items_for_folder(
+def iter_filter_with_size_for_folder(
+    src_dir,
+    min_size=[0, 0],
+    max_size=[float("inf"), float("inf")],
+    min_mode="and",
+    max_mode="and",
+    lazy=False,
+):
+    """
+    filter_with_size_for_folder的生成器版本，逐个返回满足尺寸范围的DataPackage对象，不满足的图像不会被解码。
+    """
+    for dp in iter_data_packages_from_label_folder(src_dir, lazy=True):
+        if dp.filter_with_size(min_size, max_size, min_mode, max_mode):
+            if not lazy:
+                dp.load_img()
+            yield dp
+
+
+def iter_crop_rectangle_items_for_folder(
     src_dir, dst_dir, filter_func=None, margin_tblr=None
 ):
+    """
+    逐个标注文件载入并裁剪其rectangle标注，逐个返回裁剪得到的DataPackage对象（不保存），
+    同一时刻只持有一张源图像。
+    Args:
+        src_dir: 源标注文件夹
+        dst_dir: 裁剪结果img_path所在的文件夹
+        filter_func: 作用于待裁剪标注的筛选条件
+        margin_tblr: 裁剪区域的四边扩展量
+
+    Returns:
+
+    """
     src_dir = str(Path(src_dir).absolute())
     dst_dir = str(Path(dst_dir).absolute())
-    Path(dst_dir).absolute().mkdir(parents=True, exist_ok=True)
     label_path_list = list(pyutils.glob_dir(src_dir, include_patterns=["*.json"]))
     for label_path in tqdm(label_path_list, desc="..."):
-        dp = DataPackage.create_from_label_path(label_path)
-        cropped_dp_list = dp.crop_rectangle_items(
+        # 延迟解码，对未压缩的bmp只读取各裁剪区域的像素
+        dp = DataPackage.create_from_label_path(label_path, lazy=True)
+        yield from dp.iter_crop_rectangle_items(
             dst_dir=dst_dir, filter_func=filter_func, margin_tblr=margin_tblr
         )
 
-        for cropped_dp in cropped_dp_list:
-            cropped_dp.save()
+
+def crop_rectangle_items_for_folder(
+    src_dir,
+    dst_dir,
+    filter_func=None,
+    margin_tblr=None,
+    shard_path=None,
+    incremental=False,
+    filter_id=None,
+):
+    """
+    裁剪文件夹中所有标注文件的rectangle标注并保存
+    Args:
+        src_dir: 源标注文件夹
+        dst_dir: 裁剪结果保存的文件夹
+        filter_func: 作用于待裁剪标注的筛选条件
+        margin_tblr: 裁剪区域的四边扩展量
+        shard_path: 若不为None，裁剪结果不再逐个保存为图像与标注文件，而是打包写入该分片文件（见data_aug.shard）
+        incremental: 是否增量裁剪，默认为False。为True时在dst_dir中维护裁剪记录（见data_aug.crop_record），
+            源标注文件，源图像，margin_tblr与filter_id均未变化且输出齐全的源跳过，
+            源已删除或发生变化时删除其旧的裁剪结果。不能与shard_path同时使用
+        filter_id: 增量裁剪时filter_func的标识（如名称加版本号），记录在裁剪记录中，默认为filter_func的模块名与限定名
+            （functools.partial对象还包括其绑定的参数）。默认标识不随函数实现变化，
+            修改筛选逻辑（包括其引用的全局变量与辅助函数）后调用方需传入新的filter_id，否则旧的裁剪结果会被复用
+
+    Returns:
+
+    """
+    if incremental:
+        assert shard_path is None, "incremental cropping does not support shard output"
+        _crop_rectangle_items_for_folder_incremental(
+            src_dir,
+            dst_dir,
+            filter_func=filter_func,
+            margin_tblr=margin_tblr,
+            filter_id=filter_id,
+        )
+        return
+    if shard_path is not None:
+        from .shard import DataPackageShardWriter
+
+        with DataPackageShardWriter(shard_path) as writer:
+            for cropped_dp in iter_crop_rectangle_items_for_folder(
+                src_dir, dst_dir, filter_func=filter_func, margin_tblr=margin_tblr
+            ):
+                writer.write(cropped_dp)
+        return
+    Path(dst_dir).absolute().mkdir(parents=True, exist_ok=True)
+    for cropped_dp in iter_crop_rectangle_items_for_folder(
+        src_dir, dst_dir, filter_func=filter_func, margin_tblr=margin_tblr
+    ):
+        cropped_dp.save()
+
+
+def _crop_rectangle_items_for_folder_incremental(
+    src_dir, dst_dir, filter_func=None, margin_tblr=None, filter_id=None
+):
+    if filter_id is None:
+        filter_id = get_filter_id(filter_func)
+    src_dir = str(Path(src_dir).absolute())
+    dst_dir = str(Path(dst_dir).absolute())
+    Path(dst_dir).mkdir(parents=True, exist_ok=True)
+    record = CropRecord(Path(dst_dir) / CROP_RECORD_NAME)
+    label_path_list = [
+        str(label_path)
+        for label_path in pyutils.glob_dir(src_dir, include_patterns=["*.json"])
+    ]
+    num_removed = record.remove_missing_sources(label_path_list)
+    num_skipped = 0
+    try:
+        for label_path in tqdm(label_path_list, desc="..."):
+            dp = DataPackage.create_from_label_path(label_path, lazy=True)
+            key = get_crop_source_key(
+                label_path,
+                dp.img_path,
+                margin_tblr=margin_tblr,
+                filter_id=filter_id,
+            )
+            if record.is_up_to_date(label_path, key):
+                num_skipped += 1
+                continue
+            outputs = []
+            for cropped_dp in dp.iter_crop_rectangle_items(
+                dst_dir=dst_dir, filter_func=filter_func, margin_tblr=margin_tblr
+            ):
+                cropped_dp.save()
+                outputs += [cropped_dp.img_path, cropped_dp.label_path]
+            record.update(label_path, key, outputs)
+    finally:
+        # 中途出错时保留已完成部分的记录，下次从断点继续
+        record.save()
+    logger.info(
+        f"{len(label_path_list)} sources, {num_skipped} up to date, "
+        f"{num_removed} removed"
+    )
 
 
 def crop_point_items_for_folder(src_dir, dst_dir, filter_func=None, crop_size=None):
@@ -1077,6 +1934,14 @@ def paste_by_iter_for_folder(
     first_size=None,
     max_size=None,
     min_size=None,
+    placement="random",
+    workers=None,
+    cache_bytes=None,
+    num_save_workers=4,
+    codec=None,
+    sink=None,
+    dedup_distance=None,
+    fg_bank_sizes=None,
 ):
     """
     用户给定前景文件夹，背景文件夹，图像后缀，输出目标文件夹，生成图像的尺寸，以及DataPackage类的paste_by_iter方法所需的其他参数，
@@ -1092,69 +1957,102 @@ def paste_by_iter_for_folder(
         allow_overlap:
         num_max_try:
         overlap_margin:
+        placement: 不允许重合时粘贴位置的选取方式，random，occupancy或pack，见DataPackage.paste_by_iter
+        workers: 载入前景与背景文件夹时的并行线程数
+        cache_bytes: 解码图像LRU缓存的字节数上限，默认为None（解码后的图像常驻内存）
+        num_save_workers: 后台保存生成结果的线程数，图像编码在这些线程中并行执行
+        codec: 生成结果的图像编码方式（见data_aug.image_io.register_codec），默认为None（与背景图像的后缀相同）
+        sink: 默认为None，逐个保存为图像与标注文件；为data_aug.sink.ShardSink对象时写入其tar或zip分片，由调用方负责关闭
+        dedup_distance: 载入前景与背景文件夹时跳过重复图像的dHash汉明距离阈值，默认为None（不去重）
+        fg_bank_sizes: 前景增强库的量化最长边尺寸列表（见data_aug.fg_bank.ForegroundBank），
+            给定时预先生成全部前景的旋转与缩放结果，默认为None（每次粘贴时变换）
 
     Returns:
 
     """
     pyutils.mkdir(dst_dir)
 
+    # 延迟解码，图像在首次被粘贴时才解码。给定max_size时前景只会被缩小到不超过max_size与first_size，
+    # 以不低于该边长的降采样分辨率解码即可（max_size为None时缩放系数相对原图，不能降采样）
+    fg_max_side = None
+    if max_size is not None:
+        fg_max_side = max(max_size, first_size) if first_size is not None else max_size
     fg_data_package_list = gen_data_package_list_from_img_file_for_folder(
-        fg_dir, suffix_patterns
+        fg_dir,
+        suffix_patterns,
+        lazy=True,
+        workers=workers,
+        max_side=fg_max_side,
+        dedup_distance=dedup_distance,
     )
     for dp in fg_data_package_list:
         logger.debug(dp.img_path)
     bg_data_package_list = gen_data_package_list_from_img_file_for_folder(
-        bg_dir, suffix_patterns
+        bg_dir,
+        suffix_patterns,
+        lazy=True,
+        workers=workers,
+        dedup_distance=dedup_distance,
     )
     assert len(fg_data_package_list)
     assert len(bg_data_package_list)
     logger.info(f"fg imgs num: {len(fg_data_package_list)}")
-    fg_dp_cyclic_iter = pyutils.make_cyclic_iterator(fg_data_package_list)
-    bg_dp_cyclic_iter = pyutils.make_cyclic_iterator(bg_data_package_list)
-
-    for _ in tqdm(
-        range(num_to_gen),
-        desc=f"synthesizing images (num to generate = {num_to_gen}, num_to_paste = {num_to_paste}): ",
-    ):
-        # 获取一个背景dp
-        bg_dp = next(bg_dp_cyclic_iter)
-        assert isinstance(bg_dp, DataPackage)
-        # todo: 裁剪背景dp到指定尺寸
-        tl_x = random.randint(0, bg_dp.img.shape[1] - dst_size[1] - 1)
-        tl_y = random.randint(0, bg_dp.img.shape[0] - dst_size[0] - 1)
-        # todo: 若bg图的尺寸小于目标尺寸，执行pad操作
-        assert bg_dp.img.shape[0] > dst_size[0] and bg_dp.img.shape[1] > dst_size[1]
-        ret = bg_dp.crop(
-            tl_x,
-            tl_y,
-            tl_x + dst_size[1] - 1,
-            tl_y + dst_size[0] - 1,
-            img_path=bg_dp.img_path,
-            append_coords_to_file_name=True,
-        )
+    cache = ImageLRUCache(cache_bytes) if cache_bytes is not None else None
+    fg_bank = None
+    if fg_bank_sizes is not None:
+        fg_bank = ForegroundBank.build(fg_data_package_list, fg_bank_sizes, workers)
+        # 库中的前景直接取用预先生成的结果，不再解码，无需经过解码缓存
+        fg_dp_cyclic_iter = pyutils.make_cyclic_iterator(fg_data_package_list)
+    else:
+        fg_dp_cyclic_iter = _make_dp_cyclic_iterator(fg_data_package_list, cache)
+    bg_dp_cyclic_iter = _make_dp_cyclic_iterator(bg_data_package_list, cache)
+
+    sample_ids = _gen_output_sample_ids(sink)
+    with _make_saver(num_save_workers, codec, sink) as saver:
+        for _ in tqdm(
+            range(num_to_gen),
+            desc=f"synthesizing images (num to generate = {num_to_gen}, num_to_paste = {num_to_paste}): ",
+        ):
+            # 获取一个背景dp
+            bg_dp = next(bg_dp_cyclic_iter)
+            assert isinstance(bg_dp, DataPackage)
+            # todo: 裁剪背景dp到指定尺寸
+            tl_x = random.randint(0, bg_dp.img_shape[1] - dst_size[1] - 1)
+            tl_y = random.randint(0, bg_dp.img_shape[0] - dst_size[0] - 1)
+            # todo: 若bg图的尺寸小于目标尺寸，执行pad操作
+            assert bg_dp.img_shape[0] > dst_size[0] and bg_dp.img_shape[1] > dst_size[1]
+            ret = bg_dp.crop(
+                tl_x,
+                tl_y,
+                tl_x + dst_size[1] - 1,
+                tl_y + dst_size[0] - 1,
+                img_path=bg_dp.img_path,
+                append_coords_to_file_name=True,
+            )
 
-        # 调用paste_by_iter方法获取粘贴后的dp对象
-        ret = ret.paste_by_iter(
-            src_data_package_iter=fg_dp_cyclic_iter,
-            num_to_paste=num_to_paste,
-            allow_overlap=allow_overlap,
-            num_max_try=num_max_try,
-            overlap_margin=overlap_margin,
-            in_place=False,
-            first_size=first_size,
-            max_size=max_size,
-            min_size=min_size,
-        )
-        # 更新生成的dp对象的路径信息,保存生成的dp对象
-        ret_img_path = pyutils.replace_parent(
-            pyutils.append_file_name(
-                ret.img_path,
-                "_paste-" + datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
-            ),
-            dst_dir,
-        )
-        ret.update_img_path(ret_img_path)
-        ret.save()
+            # 调用paste_by_iter方法获取粘贴后的dp对象
+            ret = ret.paste_by_iter(
+                src_data_package_iter=fg_dp_cyclic_iter,
+                num_to_paste=num_to_paste,
+                allow_overlap=allow_overlap,
+                num_max_try=num_max_try,
+                overlap_margin=overlap_margin,
+                in_place=False,
+                first_size=first_size,
+                max_size=max_size,
+                min_size=min_size,
+                placement=placement,
+                fg_bank=fg_bank,
+            )
+            # 更新生成的dp对象的路径信息,保存生成的dp对象
+            ret_img_path = pyutils.replace_parent(
+                pyutils.append_file_name(ret.img_path, "_paste-" + next(sample_ids)),
+                dst_dir,
+            )
+            ret.update_img_path(ret_img_path)
+            saver.submit(ret)
+    if cache is not None:
+        logger.info(f"image cache: {cache.stats()}")
 
 
 def synthesize_e2e_mxn_online(
@@ -1172,6 +2070,15 @@ def synthesize_e2e_mxn_online(
     max_size_list=None,
     min_size_list=None,
     num_bg_for_mosaic=1,
+    workers=None,
+    cache_bytes=None,
+    num_save_workers=4,
+    use_manifest=False,
+    codec=None,
+    sink=None,
+    dedup_distance=None,
+    placement="random",
+    fg_bank_sizes=None,
 ):
     if min_size_list is not None:
         assert len(fg_img_dir_ll) == len(min_size_list)
@@ -1182,123 +2089,174 @@ def synthesize_e2e_mxn_online(
     else:
         max_size_list = [None] * len(fg_img_dir_ll)
     bg_data_package_list = gen_data_package_list_from_img_file_for_folder(
-        bg_img_dirs_for_paste, suffix_patterns
+        bg_img_dirs_for_paste,
+        suffix_patterns,
+        lazy=True,
+        workers=workers,
+        dedup_distance=dedup_distance,
     )
 
     bg_data_package_list2 = gen_data_package_list_from_img_file_for_folder(
-        bg_img_dirs_for_mosaic, suffix_patterns
+        bg_img_dirs_for_mosaic,
+        suffix_patterns,
+        lazy=True,
+        workers=workers,
+        dedup_distance=dedup_distance,
     )
     # for bg_dp in bg_data_package_list:
     #     logger.debug(bg_dp.img_path)
     # bg_dp_cyclic_iter用于给出bg图片，并贴上fg
-    bg_dp_cyclic_iter = pyutils.make_cyclic_iterator(bg_data_package_list)
+    cache = ImageLRUCache(cache_bytes) if cache_bytes is not None else None
+    bg_dp_cyclic_iter = _make_dp_cyclic_iterator(bg_data_package_list, cache)
     # bg_dp_cyclic_iter2用于给出bg图片，直接用于mosaic
-    bg_dp_cyclic_iter2 = pyutils.make_cyclic_iterator(bg_data_package_list2)
+    bg_dp_cyclic_iter2 = _make_dp_cyclic_iterator(bg_data_package_list2, cache)
+    # 前景在下方paste_by_iter中只会被缩小到first_size（不超过256）或max_size（192）以内，以降采样分辨率解码即可
+    fg_max_side = 256
     fg_dp_ll = [
-        gen_data_package_list_from_label_file_for_folder(fg_img_dirs)
+        gen_data_package_list_from_label_file_for_folder(
+            fg_img_dirs,
+            lazy=True,
+            workers=workers,
+            max_side=fg_max_side,
+            use_manifest=use_manifest,
+            dedup_distance=dedup_distance,
+        )
         for fg_img_dirs in fg_img_dir_ll
     ]
     num_fg_cls = len(fg_dp_ll)
-    fg_cyclic_iter_list = [
-        pyutils.make_cyclic_iterator(fg_dp_l) for fg_dp_l in fg_dp_ll
-    ]
+    # 给定fg_bank_sizes时，为全部类别的前景预先生成旋转与缩放结果，
+    # 库中的前景不再解码，直接循环延迟解码的对象，无需经过解码缓存
+    fg_bank = None
+    if fg_bank_sizes is not None:
+        fg_bank = ForegroundBank.build(
+            [dp for fg_dp_l in fg_dp_ll for dp in fg_dp_l], fg_bank_sizes, workers
+        )
+        fg_cyclic_iter_list = [
+            pyutils.make_cyclic_iterator(fg_dp_l) for fg_dp_l in fg_dp_ll
+        ]
+    else:
+        fg_cyclic_iter_list = [
+            _make_dp_cyclic_iterator(fg_dp_l, cache) for fg_dp_l in fg_dp_ll
+        ]
 
     # +num_bg_for_mosaic给纯bg图片
     fg_iter_idx_generator = pyutils.make_cyclic_iterator(
         range(num_fg_cls + num_bg_for_mosaic)
     )
-    for _ in tqdm(
-        range(num_to_gen), desc=f"mosaic images (num to gen = {num_to_gen}): "
-    ):
-        ingredient_dp_list = []
-        for _ in range(m * n):
-            fg_iter_idx = next(fg_iter_idx_generator)
-            # 纯bg作为mosaic场合
-            if fg_iter_idx >= num_fg_cls:
-                bg_dp = next(bg_dp_cyclic_iter2)
-                assert isinstance(bg_dp, DataPackage)
-                # 先补全为正方形图像
-                bg_dp = bg_dp.pad_to_square()
-                src_size = bg_dp.img.shape[0]
-                # 若源尺寸小于目标尺寸，直接居中补齐到目标尺寸
-                if src_size < block_size[0]:
-                    bg_dp = bg_dp.pad_with_dst_size(dst_size=block_size)
-                # 否则取目标尺寸/2到源尺寸中的随机尺寸，缩放到随机尺寸，若随机尺寸小于目标尺寸，再次居中补齐
-                else:
-                    dst_size_ = random.randint(block_size[0] // 2, src_size)
-                    bg_dp = bg_dp.resize(dst_size=[dst_size_, dst_size_])
-                    if dst_size_ < block_size[0]:
-                        bg_dp = bg_dp.pad_with_dst_size(dst_size=block_size)
-                # 实际上仅对上述else分支中的dst_size_>=block_size[0]起到crop作用
-                ret = bg_dp.random_crop(block_size)
-                ingredient_dp_list.append(ret)
-            # 从bg图中粘贴fg后作为mosaic
-            else:
-                bg_dp = next(bg_dp_cyclic_iter).random_crop(block_size)
-                assert isinstance(bg_dp, DataPackage)
-                choice = random.randint(0, 2)
-                # logger.info(f"choice: {choice}")
-                if choice == 0:
-                    ret = bg_dp.paste_by_iter(
-                        fg_cyclic_iter_list[fg_iter_idx],
-                        1,
-                        allow_overlap=False,
-                        first_size=random.randint(192, 256),
-                        max_size=None,
-                        min_size=None,
-                        num_max_try=1,
-                    )
+    sample_ids = _gen_output_sample_ids(sink)
+    with _make_saver(num_save_workers, codec, sink) as saver:
+        for _ in tqdm(
+            range(num_to_gen), desc=f"mosaic images (num to gen = {num_to_gen}): "
+        ):
+            ingredient_dp_list = []
+            for _ in range(m * n):
+                fg_iter_idx = next(fg_iter_idx_generator)
+                # 纯bg作为mosaic场合
+                if fg_iter_idx >= num_fg_cls:
+                    bg_dp = next(bg_dp_cyclic_iter2)
+                    assert isinstance(bg_dp, DataPackage)
+                    # 以下各步记录在同一个变换链中，最后一次生成，不产生中间图像
+                    # 先补全为正方形图像
+                    chain = bg_dp.transform_chain().pad_to_square()
+                    src_size = chain.img_shape[0]
+                    # 若源尺寸小于目标尺寸，直接居中补齐到目标尺寸
+                    if src_size < block_size[0]:
+                        chain.pad_with_dst_size(dst_size=block_size)
+                    # 否则取目标尺寸/2到源尺寸中的随机尺寸，缩放到随机尺寸，若随机尺寸小于目标尺寸，再次居中补齐
+                    else:
+                        dst_size_ = random.randint(block_size[0] // 2, src_size)
+                        chain.resize(dst_size=[dst_size_, dst_size_])
+                        if dst_size_ < block_size[0]:
+                            chain.pad_with_dst_size(dst_size=block_size)
+                    # 实际上仅对上述else分支中的dst_size_>=block_size[0]起到crop作用
+                    ret = bg_dp.apply_transform_chain(chain.random_crop(block_size))
+                    ingredient_dp_list.append(ret)
+                # 从bg图中粘贴fg后作为mosaic
                 else:
-                    min_size = min_size_list[fg_iter_idx]
-                    ret = bg_dp.paste_by_iter(
-                        fg_cyclic_iter_list[fg_iter_idx],
-                        num_to_paste_for_block,
-                        allow_overlap=False,
-                        first_size=None,
-                        max_size=192,
-                        min_size=min_size,
-                        num_max_try=20,
-                    )
-
-                ingredient_dp_list.append(ret)
-        dp_height, dp_width = ingredient_dp_list[0].img.shape[:2]
-        jitter_x = (dst_size[0] - (dp_width * n)) // n
-        jitter_y = (dst_size[1] - (dp_height * m)) // m
-
-        ret = DataPackage.mosaic_mxn(
-            ingredient_dp_list,
-            dst_size,
-            jitter=[jitter_x, jitter_y],
-            m=m,
-            n=n,
-            img_val=np.random.randint(0, 256),
-        )
+                    bg_dp = next(bg_dp_cyclic_iter).random_crop(block_size)
+                    assert isinstance(bg_dp, DataPackage)
+                    choice = random.randint(0, 2)
+                    # logger.info(f"choice: {choice}")
+                    if choice == 0:
+                        ret = bg_dp.paste_by_iter(
+                            fg_cyclic_iter_list[fg_iter_idx],
+                            1,
+                            allow_overlap=False,
+                            first_size=random.randint(192, 256),
+                            max_size=None,
+                            min_size=None,
+                            num_max_try=1,
+                            placement=placement,
+                            fg_bank=fg_bank,
+                        )
+                    else:
+                        min_size = min_size_list[fg_iter_idx]
+                        ret = bg_dp.paste_by_iter(
+                            fg_cyclic_iter_list[fg_iter_idx],
+                            num_to_paste_for_block,
+                            allow_overlap=False,
+                            first_size=None,
+                            max_size=192,
+                            min_size=min_size,
+                            num_max_try=20,
+                            placement=placement,
+                            fg_bank=fg_bank,
+                        )
 
-        ret.update_img_path(
-            Path(dst_dir)
-            / (datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f") + ".bmp")
-        )
-        # ret.visualize()
-        save_success = ret.save()
-        import time
+                    ingredient_dp_list.append(ret)
+            dp_height, dp_width = ingredient_dp_list[0].img_shape[:2]
+            jitter_x = (dst_size[0] - (dp_width * n)) // n
+            jitter_y = (dst_size[1] - (dp_height * m)) // m
+
+            ret = DataPackage.mosaic_mxn(
+                ingredient_dp_list,
+                dst_size,
+                jitter=[jitter_x, jitter_y],
+                m=m,
+                n=n,
+                img_val=np.random.randint(0, 256),
+            )
 
-        time.sleep(0.1)
-        if not save_success:
-            logger.info(f"{ret.img_path}, {ret.label_path}")
+            ret.update_img_path(
+                Path(dst_dir) / (next(sample_ids) + _get_output_suffix(codec))
+            )
+            # ret.visualize()
+            saver.submit(ret)
+    if cache is not None:
+        logger.info(f"image cache: {cache.stats()}")
 
 
 def mosaic_mxn_for_folder(
-    mosaic_dir_list, suffix_patterns, dst_dir, dst_size, m, n, num_to_gen, img_val=0
+    mosaic_dir_list,
+    suffix_patterns,
+    dst_dir,
+    dst_size,
+    m,
+    n,
+    num_to_gen,
+    img_val=0,
+    workers=None,
+    cache_bytes=None,
+    num_save_workers=4,
+    codec=None,
+    sink=None,
+    dedup_distance=None,
 ):
     pyutils.mkdir(dst_dir)
 
+    cache = ImageLRUCache(cache_bytes) if cache_bytes is not None else None
     ingredient_iter_list = []
     for mosaic_dir in mosaic_dir_list:
         ingredient_iter_list.append(
-            pyutils.make_cyclic_iterator(
+            _make_dp_cyclic_iterator(
                 gen_data_package_list_from_img_file_for_folder(
-                    mosaic_dir, suffix_patterns
-                )
+                    mosaic_dir,
+                    suffix_patterns,
+                    lazy=True,
+                    workers=workers,
+                    dedup_distance=dedup_distance,
+                ),
+                cache,
             )
         )
 
@@ -1306,30 +2264,28 @@ def mosaic_mxn_for_folder(
         range(len(ingredient_iter_list))
     )
 
-    for _ in tqdm(
-        range(num_to_gen), desc=f"mosaic images (num to gen = {num_to_gen}): "
-    ):
-        ingredient_dp_list = []
-        for _ in range(m * n):
-            ingredient_dp_list.append(
-                next(ingredient_iter_list[next(ingredient_iter_idx_iter)])
+    sample_ids = _gen_output_sample_ids(sink)
+    with _make_saver(num_save_workers, codec, sink) as saver:
+        for _ in tqdm(
+            range(num_to_gen), desc=f"mosaic images (num to gen = {num_to_gen}): "
+        ):
+            ingredient_dp_list = []
+            for _ in range(m * n):
+                ingredient_dp_list.append(
+                    next(ingredient_iter_list[next(ingredient_iter_idx_iter)])
+                )
+            dp_height, dp_width = ingredient_dp_list[0].img_shape[:2]
+            jitter_x = (dst_size[0] - (dp_width * n)) // n
+            jitter_y = (dst_size[1] - (dp_height * m)) // m
+            # logger.info(f"{jitter_x} {jitter_y}")
+            ret = DataPackage.mosaic_mxn(
+                ingredient_dp_list, dst_size, jitter=[jitter_x, jitter_y], m=m, n=n
             )
-        dp_height, dp_width = ingredient_dp_list[0].img.shape[:2]
-        jitter_x = (dst_size[0] - (dp_width * n)) // n
-        jitter_y = (dst_size[1] - (dp_height * m)) // m
-        # logger.info(f"{jitter_x} {jitter_y}")
-        ret = DataPackage.mosaic_mxn(
-            ingredient_dp_list, dst_size, jitter=[jitter_x, jitter_y], m=m, n=n
-        )
-
-        ret.update_img_path(
-            Path(dst_dir)
-            / (datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f") + ".bmp")
-        )
-        # ret.visualize()
-        save_success = ret.save()
-        import time
 
-        time.sleep(0.1)
-        if not save_success:
-            logger.info(f"{ret.img_path}, {ret.label_path}")
+            ret.update_img_path(
+                Path(dst_dir) / (next(sample_ids) + _get_output_suffix(codec))
+            )
+            # ret.visualize()
+            saver.submit(ret)
+    if cache is not None:
+        logger.info(f"image cache: {cache.stats()}")
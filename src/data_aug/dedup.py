@@ -0,0 +1,319 @@
+# -*- coding:utf-8 -*-
+# @FileName :dedup.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 21:50
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .image_io import choose_reduce_factor, imread_bgr, read_img_shape
+
+__all__ = [
+    "DEDUP_INDEX_NAME",
+    "read_gray_thumbnail",
+    "compute_dhash",
+    "hamming_distance",
+    "DedupIndex",
+    "find_duplicate_mask",
+]
+
+DEDUP_INDEX_NAME = ".data_aug_dedup.npz"
+
+# dHash：缩小为9x8的灰度图，比较每行相邻像素的大小得到64位，打包为一个uint64
+_THUMBNAIL_SIZE = (9, 8)
+_REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+# 多索引查找：64位哈希分为4段16位，汉明距离不超过3的两个哈希至少有一段完全相同
+_NUM_CHUNKS = 4
+_CHUNK_BITS = 16
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def read_gray_thumbnail(img_path):
+    """
+    以降采样分辨率解码灰度图，并缩小为dHash所需的9x8缩略图
+    """
+    img_path = str(img_path)
+    if img_path.lower().endswith(".npy"):
+        img = cv2.cvtColor(
+            np.ascontiguousarray(imread_bgr(img_path)), cv2.COLOR_BGR2GRAY
+        )
+    else:
+        img_shape = read_img_shape(img_path)
+        factor = 1
+        if img_shape is not None:
+            # 缩略图只有9x8，保留不低于64的边长已足够
+            factor = choose_reduce_factor(img_shape, 64)
+        buf = np.fromfile(img_path, dtype=np.uint8)
+        img = cv2.imdecode(buf, _REDUCED_GRAYSCALE_FLAGS[factor])
+    assert img is not None, f"failed to read {img_path}"
+    return cv2.resize(img, _THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def compute_dhash(thumbnails):
+    """
+    批量计算dHash
+    Args:
+        thumbnails: N x 8 x 9的灰度缩略图数组（或其列表）
+
+    Returns:
+        长度为N的uint64数组
+    """
+    thumbnails = np.asarray(thumbnails, dtype=np.int16).reshape(-1, 8, 9)
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(thumbnails), 64), axis=1)
+    return np.ascontiguousarray(packed).view(">u8").ravel().astype(np.uint64)
+
+
+def _popcount64(x):
+    x = np.ascontiguousarray(x, dtype=np.uint64).ravel()
+    return _POPCOUNT_TABLE[x.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def hamming_distance(a, b):
+    """
+    逐元素计算两组uint64哈希的汉明距离
+    """
+    return _popcount64(
+        np.bitwise_xor(np.asarray(a, np.uint64), np.asarray(b, np.uint64))
+    )
+
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return -1, -1
+
+
+def _load_dir_cache(cache_path):
+    if not cache_path.exists():
+        return {}
+    try:
+        with np.load(str(cache_path), allow_pickle=False) as data:
+            return {
+                str(path): (int(mtime), int(size), np.uint64(h))
+                for path, mtime, size, h in zip(
+                    data["img_paths"], data["mtimes"], data["sizes"], data["hashes"]
+                )
+            }
+    except (OSError, ValueError, KeyError):
+        logger.warning(f"{cache_path} is broken, rebuild it")
+        return {}
+
+
+def _save_dir_cache(cache_path, entries):
+    paths = sorted(entries)
+    tmp_path = cache_path.with_name(cache_path.name + f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            img_paths=np.array(paths, dtype=np.str_),
+            mtimes=np.array([entries[p][0] for p in paths], dtype=np.int64),
+            sizes=np.array([entries[p][1] for p in paths], dtype=np.int64),
+            hashes=np.array([entries[p][2] for p in paths], dtype=np.uint64),
+        )
+    os.replace(tmp_path, cache_path)
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+# 图像集合的感知哈希索引，哈希按图像所在文件夹缓存为npz文件（DEDUP_INDEX_NAME），按修改时间与大小增量更新。
+# 查找时先以np.unique合并哈希完全相同的图像，再对不同的哈希做分段多索引，只比较至少有一段相同的候选哈希；
+# 分组与去重不展开图像对，同一段的候选中已并入代表元素的哈希不再参与比较，大量（近似）重复的图像也只需近似线性的时间。
+class DedupIndex:
+    def __init__(self, img_paths, hashes):
+        self.img_paths = list(img_paths)
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.img_paths)
+
+    @classmethod
+    def build(cls, img_paths, workers=None, use_cache=True):
+        """
+        计算一组图像的哈希
+        Args:
+            img_paths: 图像路径列表
+            workers: 解码缩略图的并行线程数，默认为None（串行）
+            use_cache: 是否读取并更新各文件夹下的哈希缓存文件，默认为True
+
+        Returns:
+            DedupIndex对象
+        """
+        img_paths = [os.path.abspath(str(img_path)) for img_path in img_paths]
+        caches = {}
+        if use_cache:
+            for dir_path in {os.path.dirname(img_path) for img_path in img_paths}:
+                caches[dir_path] = _load_dir_cache(Path(dir_path) / DEDUP_INDEX_NAME)
+        hashes = np.zeros(len(img_paths), dtype=np.uint64)
+        stat_keys = [_stat_key(img_path) for img_path in img_paths]
+        todo = []
+        for idx, (img_path, stat_key) in enumerate(zip(img_paths, stat_keys)):
+            entry = caches.get(os.path.dirname(img_path), {}).get(img_path)
+            if entry is not None and entry[:2] == stat_key:
+                hashes[idx] = entry[2]
+            else:
+                todo.append(idx)
+        if todo:
+            todo_paths = [img_paths[idx] for idx in todo]
+            if workers is not None and workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    thumbnails = list(executor.map(read_gray_thumbnail, todo_paths))
+            else:
+                thumbnails = [read_gray_thumbnail(path) for path in todo_paths]
+            hashes[todo] = compute_dhash(thumbnails)
+            if use_cache:
+                changed_dirs = set()
+                for idx in todo:
+                    dir_path = os.path.dirname(img_paths[idx])
+                    caches[dir_path][img_paths[idx]] = (*stat_keys[idx], hashes[idx])
+                    changed_dirs.add(dir_path)
+                for dir_path in changed_dirs:
+                    _save_dir_cache(Path(dir_path) / DEDUP_INDEX_NAME, caches[dir_path])
+        return cls(img_paths, hashes)
+
+    def find_duplicate_pairs(self, max_distance=0):
+        """
+        返回汉明距离不超过max_distance（0至3）的所有图像对，M x 2的序号数组，每行前一个序号较小。
+        结果的数量随每组重复图像的数量平方增长，只需分组或去重时使用find_duplicate_groups或duplicate_mask
+        """
+        assert 0 <= max_distance < _NUM_CHUNKS
+        uniq, inverse = np.unique(self.hashes, return_inverse=True)
+        inverse = inverse.ravel()
+        # 哈希完全相同的图像对
+        order = np.argsort(inverse, kind="stable")
+        groups = np.split(order, np.flatnonzero(np.diff(inverse[order])) + 1)
+        pairs = [_group_pairs(group) for group in groups if len(group) > 1]
+        if max_distance > 0 and len(uniq) > 1:
+            near = _find_near_hash_pairs(uniq, max_distance)
+            # 由不同哈希之间的近似对展开为图像对，groups[k]即哈希uniq[k]对应的图像
+            for i, j in near:
+                a, b = np.meshgrid(groups[i], groups[j], indexing="ij")
+                pair = np.stack([a.ravel(), b.ravel()], axis=1)
+                pairs.append(np.sort(pair, axis=1))
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64)
+        return np.unique(np.concatenate(pairs).astype(np.int64), axis=0)
+
+    def find_duplicate_groups(self, max_distance=0):
+        """
+        按重复关系（传递闭包）将图像分组，返回包含两个及以上图像的组，组内序号升序
+        """
+        labels = self._get_group_labels(max_distance)
+        order = np.argsort(labels, kind="stable")
+        groups = np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
+        return [group.tolist() for group in groups if len(group) > 1]
+
+    def duplicate_mask(self, max_distance=0):
+        """
+        返回bool数组，每组重复图像中只保留序号最小的一张，其余为True
+        """
+        labels = self._get_group_labels(max_distance)
+        return labels != np.arange(len(self))
+
+    def _get_group_labels(self, max_distance):
+        # 每张图像的组标签为组内最小的序号
+        assert 0 <= max_distance < _NUM_CHUNKS
+        uniq, first_idxes, inverse = np.unique(
+            self.hashes, return_index=True, return_inverse=True
+        )
+        inverse = inverse.ravel()
+        if max_distance == 0 or len(uniq) < 2:
+            # 哈希完全相同的图像直接以各哈希首次出现的序号为组标签
+            return first_idxes[inverse].astype(np.int64)
+        roots = _get_near_hash_roots(uniq, max_distance)
+        group_first = np.full(len(uniq), len(self), dtype=np.int64)
+        np.minimum.at(group_first, roots, first_idxes)
+        return group_first[roots][inverse]
+
+
+def _group_pairs(group):
+    i, j = np.triu_indices(len(group), 1)
+    return np.stack([group[i], group[j]], axis=1)
+
+
+def _find_near_hash_pairs(uniq, max_distance):
+    """
+    在互不相同的哈希中，找到汉明距离不超过max_distance的哈希对（序号）
+    """
+    candidates = []
+    for chunk_idx in range(_NUM_CHUNKS):
+        chunk = (uniq >> np.uint64(chunk_idx * _CHUNK_BITS)) & np.uint64(0xFFFF)
+        order = np.argsort(chunk, kind="stable")
+        buckets = np.split(order, np.flatnonzero(np.diff(chunk[order])) + 1)
+        candidates += [_group_pairs(np.sort(b)) for b in buckets if len(b) > 1]
+    if not candidates:
+        return np.zeros((0, 2), dtype=np.int64)
+    candidates = np.unique(np.concatenate(candidates), axis=0)
+    distances = hamming_distance(uniq[candidates[:, 0]], uniq[candidates[:, 1]])
+    return candidates[distances <= max_distance]
+
+
+def _get_near_hash_roots(uniq, max_distance):
+    """
+    将互不相同的哈希按汉明距离不超过max_distance的关系（传递闭包）合并，返回各哈希所在组的代表序号
+    """
+    union_find = _UnionFind(len(uniq))
+    for chunk_idx in range(_NUM_CHUNKS):
+        chunk = (uniq >> np.uint64(chunk_idx * _CHUNK_BITS)) & np.uint64(0xFFFF)
+        order = np.argsort(chunk, kind="stable")
+        buckets = np.split(order, np.flatnonzero(np.diff(chunk[order])) + 1)
+        for bucket in buckets:
+            if len(bucket) > 1:
+                _union_bucket(uniq, np.sort(bucket), max_distance, union_find)
+    return np.array([union_find.find(i) for i in range(len(uniq))], dtype=np.int64)
+
+
+def _union_bucket(uniq, bucket, max_distance, union_find):
+    # 桶内广度优先搜索：每次只与尚未访问的成员批量比较，命中的成员并入代表元素后不再参与比较
+    unvisited = bucket
+    while len(unvisited):
+        rep = int(unvisited[0])
+        unvisited = unvisited[1:]
+        queue = [rep]
+        while queue and len(unvisited):
+            i = queue.pop()
+            hit = hamming_distance(uniq[i], uniq[unvisited]) <= max_distance
+            matched = unvisited[hit].tolist()
+            for j in matched:
+                union_find.union(rep, j)
+            queue += matched
+            unvisited = unvisited[~hit]
+
+
+def find_duplicate_mask(img_paths, max_distance=0, workers=None):
+    """
+    返回bool数组，标记img_paths中与前面某张图像重复（dHash汉明距离不超过max_distance）的图像
+    """
+    index = DedupIndex.build(img_paths, workers=workers)
+    mask = index.duplicate_mask(max_distance)
+    if mask.any():
+        logger.info(f"{int(mask.sum())} of {len(mask)} images are duplicates")
+    return mask
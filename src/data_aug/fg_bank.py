@@ -0,0 +1,164 @@
+# -*- coding:utf-8 -*-
+# @FileName :fg_bank.py
+# @Author   :Deyu He
+# @Time     :2026/10/19 01:40
+
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .label_arrays import LabelArrays
+from .transform_chain import TransformChain
+
+__all__ = [
+    "ForegroundBank",
+]
+
+_ROTATE_DEGREES = (0, 90, 180, 270)
+
+
+# 前景增强库：对一组前景预先生成4个旋转角度与若干量化尺寸（最长边）下的图像与标注，全部图像依次存放在一块连续内存中。
+# 粘贴时按随机旋转角度与缩放系数取不小于目标尺寸的最近一级，再对小图做残余缩放（可关闭），不再每次变换原始前景。
+class ForegroundBank:
+    def __init__(
+        self, img_paths, src_max_sides, sizes, buffer, offsets, shapes, label_arrays
+    ):
+        """
+        一般通过build创建
+        Args:
+            img_paths: 各前景的图像路径
+            src_max_sides: 各前景原始图像的最长边
+            sizes: 量化的最长边尺寸（升序）
+            buffer: 存放全部图像的一维uint8数组
+            offsets: 各条目图像在buffer中的起始位置，条目序号为(前景序号 * 4 + 旋转序号) * 尺寸数量 + 尺寸序号
+            shapes: 各条目图像的shape列表
+            label_arrays: 各条目的标注（LabelArrays）
+        """
+        self.img_paths = list(img_paths)
+        self.src_max_sides = np.asarray(src_max_sides, dtype=np.float64)
+        self.sizes = list(sizes)
+        self.buffer = buffer
+        self.offsets = offsets
+        self.shapes = shapes
+        self.label_arrays = label_arrays
+        self._path_to_idx = {path: idx for idx, path in enumerate(self.img_paths)}
+
+    def __len__(self):
+        return len(self.img_paths)
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    @classmethod
+    def build(cls, data_package_list, sizes, workers=None, interpolation=1):
+        """
+        为一组前景生成增强库
+        Args:
+            data_package_list: 前景DataPackage对象列表（延迟解码的对象在此解码一次，但不保存在对象中）
+            sizes: 量化的最长边尺寸列表，如[48, 64, 96, 128, 192, 256]
+            workers: 生成各前景条目时的并行线程数，默认为None（串行）
+            interpolation: 插值方式，默认为1（linear）
+
+        Returns:
+            ForegroundBank对象
+        """
+        sizes = sorted(set(int(size) for size in sizes))
+        assert len(sizes) and sizes[0] > 0
+
+        def gen_entries(dp):
+            # 解码到局部变量，不保存在调用方的对象中，生成条目后即可释放原始图像
+            img = dp.read_img()
+            max_side = max(img.shape[:2])
+            # 由导出的标注转换，不切换调用方对象的标注模式
+            label_arrays = LabelArrays.from_shapes(dp.export_label()["shapes"])
+            entries = []
+            for rotate_degree in _ROTATE_DEGREES:
+                for size in sizes:
+                    scale = size / max_side
+                    chain = TransformChain(img.shape).rotate_by_multi_90(rotate_degree)
+                    chain.resize_by_factor(scale, scale)
+                    entries.append(
+                        (
+                            chain.warp_img(img, interpolation),
+                            chain.transform_label_arrays(label_arrays),
+                        )
+                    )
+            return max_side, entries
+
+        if workers is not None and workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(gen_entries, data_package_list))
+        else:
+            results = [gen_entries(dp) for dp in data_package_list]
+        shapes = [img.shape for _, entries in results for img, _ in entries]
+        nbytes = [int(np.prod(shape)) for shape in shapes]
+        offsets = np.concatenate([[0], np.cumsum(nbytes)]).astype(np.int64)
+        # 一次分配全部条目的连续内存
+        buffer = np.empty(int(offsets[-1]), dtype=np.uint8)
+        label_arrays = []
+        idx = 0
+        for _, entries in results:
+            for img, la in entries:
+                buffer[offsets[idx] : offsets[idx + 1]] = np.asarray(img).reshape(-1)
+                label_arrays.append(la)
+                idx += 1
+        bank = cls(
+            [dp.img_path for dp in data_package_list],
+            [max_side for max_side, _ in results],
+            sizes,
+            buffer,
+            offsets[:-1],
+            shapes,
+            label_arrays,
+        )
+        logger.info(
+            f"foreground bank: {len(bank)} foregrounds x {len(_ROTATE_DEGREES)} rotations "
+            f"x {len(sizes)} sizes, {bank.nbytes / (1 << 20):.1f} MiB"
+        )
+        return bank
+
+    def find(self, img_path):
+        """
+        返回img_path对应的前景序号，不在库中时返回None
+        """
+        return self._path_to_idx.get(img_path)
+
+    def get(self, idx, rotate_degree, size_idx):
+        """
+        返回第idx个前景旋转rotate_degree度，最长边为sizes[size_idx]的条目的图像（buffer的只读视图）与标注
+        """
+        entry_idx = (
+            idx * len(_ROTATE_DEGREES) + _ROTATE_DEGREES.index(rotate_degree % 360)
+        ) * len(self.sizes) + size_idx
+        shape = self.shapes[entry_idx]
+        start = int(self.offsets[entry_idx])
+        img = self.buffer[start : start + int(np.prod(shape))].reshape(shape)
+        img.flags.writeable = False
+        return img, self.label_arrays[entry_idx]
+
+    def draw(
+        self, idx, rotate_degree, scale_x, scale_y, residual=True, interpolation=1
+    ):
+        """
+        按相对原始前景的缩放系数取得增强结果：选取不小于目标尺寸的最近一级（均超过时取最大一级），
+        residual为True时再对该级图像做残余缩放使尺寸与缩放系数一致，否则直接返回该级图像
+        Returns:
+            (图像, 标注LabelArrays)
+        """
+        src_max_side = self.src_max_sides[idx]
+        size_idx = int(
+            np.searchsorted(self.sizes, max(scale_x, scale_y) * src_max_side - 1e-6)
+        )
+        size_idx = min(size_idx, len(self.sizes) - 1)
+        img, la = self.get(idx, rotate_degree, size_idx)
+        if not residual:
+            return img, la
+        level_scale = self.sizes[size_idx] / src_max_side
+        fx, fy = scale_x / level_scale, scale_y / level_scale
+        if abs(fx - 1) < 1e-3 and abs(fy - 1) < 1e-3:
+            return img, la
+        img = cv2.resize(img, None, fx=fx, fy=fy, interpolation=interpolation)
+        return img, la.scale(fx, fy)
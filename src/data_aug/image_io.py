@@ -0,0 +1,411 @@
+# -*- coding:utf-8 -*-
+# @FileName :image_io.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 10:12
+
+import io
+import math
+import struct
+import threading
+from pathlib import Path
+
+import cv2
+import cvutils
+import numpy as np
+
+__all__ = [
+    "ImageCodec",
+    "register_codec",
+    "get_codec",
+    "available_codecs",
+    "set_default_codec",
+    "get_default_codec",
+    "encode_img",
+    "imwrite",
+    "imread_bgr",
+    "imread_reduced",
+    "choose_reduce_factor",
+    "get_reduced_img_shape",
+    "read_img_shape",
+    "read_bmp_layout",
+    "read_bmp_region",
+]
+
+
+# 图像编码方式：文件后缀，cv2.imencode的编码参数，或自定义的编码函数（输入图像，返回字节串）
+class ImageCodec:
+    def __init__(self, name, suffix, params=None, encode_func=None):
+        """
+        Args:
+            name: 编码方式名称
+            suffix: 输出文件后缀，如".png"
+            params: cv2.imencode的编码参数列表，如[cv2.IMWRITE_PNG_COMPRESSION, 1]
+            encode_func: 自定义的编码函数，不为None时忽略params
+        """
+        self.name = name
+        self.suffix = suffix.lower()
+        self.params = list(params) if params is not None else []
+        self.encode_func = encode_func
+
+    def __repr__(self):
+        return f"ImageCodec({self.name!r}, {self.suffix!r}, {self.params!r})"
+
+    def encode(self, img):
+        if self.encode_func is not None:
+            return self.encode_func(img)
+        success, buf = cv2.imencode(self.suffix, img, self.params)
+        assert success, f"failed to encode image with {self}"
+        return buf.tobytes()
+
+
+def _encode_npy(img):
+    f = io.BytesIO()
+    np.save(f, np.ascontiguousarray(img))
+    return f.getvalue()
+
+
+# 已注册的编码方式，以及各后缀默认使用的编码方式（未指定编码方式时按输出路径的后缀选择）
+_codecs = {}
+_suffix_codecs = {}
+_codec_lock = threading.Lock()
+_default_codec = None
+
+
+def register_codec(
+    name, suffix, params=None, encode_func=None, as_suffix_default=False
+):
+    """
+    注册编码方式，同名时覆盖
+    Args:
+        name: 编码方式名称，如"png-fast"
+        suffix: 输出文件后缀
+        params: cv2.imencode的编码参数列表
+        encode_func: 自定义的编码函数
+        as_suffix_default: 是否作为该后缀的默认编码方式
+
+    Returns:
+        ImageCodec对象
+    """
+    codec = ImageCodec(name, suffix, params=params, encode_func=encode_func)
+    with _codec_lock:
+        _codecs[name] = codec
+        if as_suffix_default or codec.suffix not in _suffix_codecs:
+            _suffix_codecs[codec.suffix] = codec
+    return codec
+
+
+register_codec("bmp", ".bmp")
+register_codec("png", ".png", [cv2.IMWRITE_PNG_COMPRESSION, 3])
+# 压缩率略低但编码速度快数倍，适合大批量合成数据的输出
+register_codec("png-fast", ".png", [cv2.IMWRITE_PNG_COMPRESSION, 1])
+register_codec("jpg", ".jpg", [cv2.IMWRITE_JPEG_QUALITY, 95])
+register_codec("jpeg", ".jpeg", [cv2.IMWRITE_JPEG_QUALITY, 95])
+register_codec("webp", ".webp", [cv2.IMWRITE_WEBP_QUALITY, 90])
+register_codec("npy", ".npy", encode_func=_encode_npy)
+
+
+def available_codecs():
+    return sorted(_codecs)
+
+
+def get_codec(codec=None, img_path=None):
+    """
+    返回ImageCodec对象
+    Args:
+        codec: ImageCodec对象或已注册的编码方式名称，为None时使用全局默认编码方式（见set_default_codec）
+        img_path: codec与全局默认编码方式均为None时，按该路径的后缀选择编码方式
+
+    Returns:
+        ImageCodec对象，无法确定时返回None
+    """
+    if codec is None:
+        codec = _default_codec
+    if isinstance(codec, ImageCodec):
+        return codec
+    if codec is not None:
+        assert codec in _codecs, f"image codec {codec} is not registered"
+        return _codecs[codec]
+    if img_path is not None:
+        suffix = Path(img_path).suffix.lower()
+        if suffix in _suffix_codecs:
+            return _suffix_codecs[suffix]
+        return ImageCodec(suffix, suffix)
+    return None
+
+
+def set_default_codec(codec=None):
+    """
+    指定全局默认编码方式（名称或ImageCodec对象），为None时恢复为按输出路径的后缀选择
+    """
+    global _default_codec
+    if codec is not None and not isinstance(codec, ImageCodec):
+        assert codec in _codecs, f"image codec {codec} is not registered"
+    _default_codec = codec
+
+
+def get_default_codec():
+    return _default_codec
+
+
+def encode_img(img, codec=None, img_path=None):
+    """
+    以指定编码方式编码图像，返回(字节串, ImageCodec对象)
+    """
+    codec = get_codec(codec, img_path)
+    assert codec is not None, "cannot determine image codec"
+    return codec.encode(img), codec
+
+
+def imwrite(img_path, img, codec=None):
+    """
+    编码并保存图像。cv2.imencode执行期间释放GIL，可在多个线程中并行调用（见writer.AsyncDataPackageSaver）。
+    Args:
+        img_path: 保存路径，后缀应与编码方式一致
+        img: 图像
+        codec: 编码方式，为None时使用全局默认编码方式，再否则按img_path的后缀选择
+
+    Returns:
+
+    """
+    data, _ = encode_img(img, codec, img_path)
+    # 先编码再以二进制写出，支持含非ascii字符的路径
+    with open(str(img_path), "wb") as f:
+        f.write(data)
+    return True
+
+
+def imread_bgr(img_path):
+    """
+    读取图像并只保留前三个通道，.npy文件直接载入
+    """
+    if str(img_path).lower().endswith(".npy"):
+        img = np.load(str(img_path))
+    else:
+        img = cvutils.imread(str(img_path))
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img[:, :, :3]
+
+
+# 缩小倍数与对应的cv2降采样解码标志，jpeg在解码时直接按DCT缩放，其他格式解码后以INTER_AREA缩小
+_REDUCED_COLOR_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def choose_reduce_factor(img_shape, max_side):
+    """
+    给定原图shape与后续处理所需的最大边长，返回不会使最大边低于max_side的最大缩小倍数（1，2，4或8）
+    """
+    if max_side is None:
+        return 1
+    src_side = max(img_shape[0], img_shape[1])
+    for factor in (8, 4, 2):
+        if src_side / factor >= max_side:
+            return factor
+    return 1
+
+
+def get_reduced_img_shape(img_shape, factor):
+    return (
+        math.ceil(img_shape[0] / factor),
+        math.ceil(img_shape[1] / factor),
+        3,
+    )
+
+
+def imread_reduced(img_path, factor, dst_shape=None):
+    """
+    以1/factor的分辨率解码图像，factor为1时等同于imread_bgr。
+    Args:
+        img_path: 图像路径
+        factor: 缩小倍数，1，2，4或8
+        dst_shape: 期望的输出shape，不同格式降采样解码的取整方式不同，与之不一致时再缩放到该shape
+
+    Returns:
+
+    """
+    if factor == 1 or str(img_path).lower().endswith(".npy"):
+        img = imread_bgr(img_path)
+        if factor != 1 and dst_shape is None:
+            dst_shape = get_reduced_img_shape(img.shape, factor)
+    else:
+        buf = np.fromfile(str(img_path), dtype=np.uint8)
+        img = cv2.imdecode(buf, _REDUCED_COLOR_FLAGS[factor])
+    if dst_shape is not None and img.shape[:2] != tuple(dst_shape[:2]):
+        img = cv2.resize(
+            img, (dst_shape[1], dst_shape[0]), interpolation=cv2.INTER_AREA
+        )
+    return img
+
+
+def _read_bmp_size(f):
+    f.seek(14)
+    dib_size = struct.unpack("<I", f.read(4))[0]
+    if dib_size == 12:
+        # BITMAPCOREHEADER，宽高为16位无符号整数
+        w, h = struct.unpack("<HH", f.read(4))
+    else:
+        # BITMAPINFOHEADER及其扩展，高度为负数时表示自上而下存储
+        w, h = struct.unpack("<ii", f.read(8))
+    return abs(h), abs(w)
+
+
+def _read_png_size(f):
+    f.seek(16)
+    w, h = struct.unpack(">II", f.read(8))
+    return h, w
+
+
+def _read_jpeg_size(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # 跳过填充字节
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        seg_len = struct.unpack(">H", f.read(2))[0]
+        # SOF0~SOF15，排除DHT(C4)，JPG(C8)，DAC(CC)
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            f.read(1)
+            h, w = struct.unpack(">HH", f.read(4))
+            return h, w
+        f.seek(seg_len - 2, 1)
+
+
+def read_img_shape(img_path):
+    """
+    仅读取文件头获取图像的高与宽，不解码像素，支持bmp，png，jpeg与npy格式。
+    Args:
+        img_path: 图像路径
+
+    Returns:
+        (h, w, 3)形式的shape，与imread_bgr解码后的shape一致，无法识别的格式返回None
+    """
+    try:
+        with open(str(img_path), "rb") as f:
+            magic = f.read(8)
+            if magic[:2] == b"BM":
+                hw = _read_bmp_size(f)
+            elif magic == b"\x89PNG\r\n\x1a\n":
+                hw = _read_png_size(f)
+            elif magic[:2] == b"\xff\xd8":
+                hw = _read_jpeg_size(f)
+            elif magic[:6] == b"\x93NUMPY":
+                f.seek(0)
+                if np.lib.format.read_magic(f) == (1, 0):
+                    hw = np.lib.format.read_array_header_1_0(f)[0][:2]
+                else:
+                    hw = np.lib.format.read_array_header_2_0(f)[0][:2]
+            else:
+                hw = None
+    except (OSError, ValueError, struct.error):
+        return None
+    if hw is None:
+        return None
+    return hw[0], hw[1], 3
+
+
+def read_bmp_layout(img_path):
+    """
+    解析未压缩bmp文件的像素布局，用于直接按偏移读取像素。
+    Args:
+        img_path: bmp图像路径
+
+    Returns:
+        包含offset，width，height，bit_count，top_down，stride，palette的dict，
+        压缩格式或不支持的位深返回None
+    """
+    try:
+        with open(str(img_path), "rb") as f:
+            header = f.read(54)
+            if len(header) < 54 or header[:2] != b"BM":
+                return None
+            offset = struct.unpack_from("<I", header, 10)[0]
+            dib_size = struct.unpack_from("<I", header, 14)[0]
+            if dib_size < 40:
+                return None
+            width, height = struct.unpack_from("<ii", header, 18)
+            bit_count, compression = struct.unpack_from("<HI", header, 28)
+            num_colors = struct.unpack_from("<I", header, 46)[0]
+            if bit_count not in (8, 24, 32):
+                return None
+            # 只支持未压缩的像素数据：BI_RGB，或通道掩码为标准BGRA排列的32位BI_BITFIELDS
+            if compression == 3 and bit_count == 32:
+                f.seek(54)
+                masks = struct.unpack("<III", f.read(12))
+                if masks != (0x00FF0000, 0x0000FF00, 0x000000FF):
+                    return None
+            elif compression != 0:
+                return None
+            palette = None
+            if bit_count == 8:
+                num_colors = num_colors or 256
+                f.seek(14 + dib_size)
+                palette = np.frombuffer(f.read(num_colors * 4), dtype=np.uint8)
+                palette = palette.reshape(-1, 4)[:, :3]
+    except (OSError, struct.error):
+        return None
+    return dict(
+        offset=offset,
+        width=width,
+        height=abs(height),
+        bit_count=bit_count,
+        top_down=height < 0,
+        stride=((bit_count * width + 31) // 32) * 4,
+        palette=palette,
+    )
+
+
+def read_bmp_region(img_path, tl_x, tl_y, width, height, layout=None):
+    """
+    通过内存映射从未压缩bmp文件中只读取指定矩形区域的像素，不解码整张图像。
+    区域超出图像范围的部分会被截断。
+    Args:
+        img_path: bmp图像路径
+        tl_x: 区域左上角x坐标
+        tl_y: 区域左上角y坐标
+        width: 区域宽度
+        height: 区域高度
+        layout: read_bmp_layout的返回值，为None时读取文件头获取
+
+    Returns:
+        BGR三通道图像，与imread_bgr解码后再裁剪的结果一致，不支持的bmp格式返回None
+    """
+    if layout is None:
+        layout = read_bmp_layout(img_path)
+    if layout is None:
+        return None
+    img_w, img_h = layout["width"], layout["height"]
+    x1, y1 = max(0, int(tl_x)), max(0, int(tl_y))
+    x2, y2 = min(img_w, int(tl_x) + int(width)), min(img_h, int(tl_y) + int(height))
+    x2, y2 = max(x1, x2), max(y1, y2)
+
+    bytes_per_pixel = layout["bit_count"] // 8
+    data = np.memmap(
+        str(img_path),
+        dtype=np.uint8,
+        mode="r",
+        offset=layout["offset"],
+        shape=(img_h, layout["stride"]),
+    )
+    if layout["top_down"]:
+        rows = data[y1:y2]
+    else:
+        # 自下而上存储，文件中第一行为图像最后一行
+        rows = data[img_h - y2 : img_h - y1][::-1]
+    region = rows[:, x1 * bytes_per_pixel : x2 * bytes_per_pixel]
+    if bytes_per_pixel == 1:
+        img = layout["palette"][region]
+    else:
+        img = region.reshape(y2 - y1, x2 - x1, bytes_per_pixel)[:, :, :3]
+    img = np.ascontiguousarray(img)
+    del data
+    return img
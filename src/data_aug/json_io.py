@@ -0,0 +1,127 @@
+# -*- coding:utf-8 -*-
+# @FileName :json_io.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 16:10
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+__all__ = [
+    "available_json_backends",
+    "set_json_backend",
+    "get_json_backend",
+    "loads",
+    "dumps",
+    "load_json",
+    "dump_json",
+]
+
+# 标注文件的读写后端，优先使用已安装的orjson或msgspec，否则退回标准库json。
+# 各后端的输出格式相同：utf-8编码，不转义非ascii字符，indent=2（与labelme相同），numpy类型转换为python类型。
+# 各后端输出解析后的值相同，但字节不保证一致：浮点数的文本表示因后端而异（如标准库为1e-05，orjson为0.00001），
+# 需要逐字节一致的输出时以set_json_backend("json")指定标准库。
+_BOM = b"\xef\xbb\xbf"
+
+
+def available_json_backends():
+    backends = []
+    if orjson is not None:
+        backends.append("orjson")
+    if msgspec is not None:
+        backends.append("msgspec")
+    backends.append("json")
+    return backends
+
+
+_backend = available_json_backends()[0]
+
+
+def set_json_backend(name):
+    """
+    指定json读写后端，可选orjson，msgspec或json
+    """
+    global _backend
+    assert name in available_json_backends(), f"json backend {name} is not available"
+    _backend = name
+
+
+def get_json_backend():
+    return _backend
+
+
+def _to_builtin(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def loads(data):
+    """
+    解析json字符串或utf-8字节串
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if data.startswith(_BOM):
+        data = data[len(_BOM) :]
+    if _backend == "orjson":
+        return orjson.loads(data)
+    if _backend == "msgspec":
+        return msgspec.json.decode(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def dumps(obj, indent=None):
+    """
+    将对象序列化为utf-8字节串，indent为None时输出紧凑格式，否则只支持indent=2。
+    不同后端的输出解析后的值相同，浮点数的文本表示可能不同
+    """
+    assert indent in (None, 2)
+    if _backend == "orjson":
+        option = orjson.OPT_INDENT_2 if indent == 2 else 0
+        try:
+            return orjson.dumps(obj, default=_to_builtin, option=option)
+        except TypeError:
+            # orjson不支持非字符串的键等情形，退回标准库
+            pass
+    elif _backend == "msgspec":
+        try:
+            data = msgspec.json.encode(obj, enc_hook=_to_builtin)
+        except TypeError:
+            pass
+        else:
+            return msgspec.json.format(data, indent=2) if indent == 2 else data
+    separators = (",", ": ") if indent == 2 else (",", ":")
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        indent=indent,
+        separators=separators,
+        default=_to_builtin,
+    ).encode("utf-8")
+
+
+def load_json(json_path):
+    with open(str(json_path), "rb") as f:
+        return loads(f.read())
+
+
+def dump_json(obj, json_path):
+    data = dumps(obj, indent=2)
+    with open(str(json_path), "wb") as f:
+        f.write(data)
@@ -0,0 +1,344 @@
+# -*- coding:utf-8 -*-
+# @FileName :label_arrays.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 22:30
+
+import copy
+import threading
+
+import numpy as np
+
+__all__ = [
+    "SHAPE_TYPES",
+    "get_shape_type_code",
+    "LabelArrays",
+]
+
+# labelme的标注类型，以其在列表中的序号作为类型编码，遇到未知类型时追加（加锁，多线程载入时编码保持唯一）
+SHAPE_TYPES = ["polygon", "rectangle", "circle", "line", "point", "linestrip"]
+RECTANGLE = SHAPE_TYPES.index("rectangle")
+_SHAPE_TYPES_LOCK = threading.Lock()
+
+
+def get_shape_type_code(shape_type):
+    try:
+        return SHAPE_TYPES.index(shape_type)
+    except ValueError:
+        pass
+    with _SHAPE_TYPES_LOCK:
+        if shape_type not in SHAPE_TYPES:
+            SHAPE_TYPES.append(shape_type)
+        return SHAPE_TYPES.index(shape_type)
+
+
+def _is_int(value):
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def _copy_value(value):
+    # extras中的字典在copy，take与各几何变换的结果之间共享，转换为字典时复制可变的值
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return copy.deepcopy(value)
+
+
+def _is_int_matrix(M):
+    return np.array_equal(M, np.round(M))
+
+
+# labelme标注条目（label["shapes"]）的数组形式：所有条目的点依次拼接为float64的P x 2数组，
+# 第i个条目的点为points[offsets[i]:offsets[i+1]]，标注名称以类别id与词表表示，标注类型以编码表示，
+# 其余字段（group_id，flags等）以浅层字典保存。几何变换对全部条目一次完成，返回新对象，
+# 除extras外的各数组视为不可变，多个对象之间可以共享。
+# 坐标以float64保存且写回时不做舍入，int_coords记录每个坐标值是否为整数（与python中逐点运算的结果类型一致），
+# 只载入再保存的标注与原文件相同。
+class LabelArrays:
+    def __init__(
+        self,
+        points,
+        offsets,
+        shape_types,
+        category_ids,
+        vocabulary,
+        extras,
+        int_coords=None,
+    ):
+        """
+        Args:
+            points: P x 2的float64数组
+            offsets: 长度为N+1的int64数组
+            shape_types: 长度为N的int8数组，标注类型编码（见SHAPE_TYPES）
+            category_ids: 长度为N的int32数组，标注名称在vocabulary中的序号
+            vocabulary: 标注名称列表
+            extras: 长度为N的字典列表，条目的其余字段
+            int_coords: P x 2的bool数组，各坐标值是否以整数写回，默认为全部False
+        """
+        self.points = points
+        self.offsets = offsets
+        self.shape_types = shape_types
+        self.category_ids = category_ids
+        self.vocabulary = vocabulary
+        self.extras = extras
+        if int_coords is None:
+            int_coords = np.zeros(points.shape, dtype=bool)
+        self.int_coords = int_coords
+
+    def __len__(self):
+        return len(self.shape_types)
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.zeros((0, 2), dtype=np.float64),
+            np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int8),
+            np.zeros(0, dtype=np.int32),
+            [],
+            [],
+        )
+
+    @classmethod
+    def from_shapes(cls, shapes):
+        """
+        由labelme的标注条目列表创建
+        """
+        vocabulary = []
+        name_to_id = {}
+        category_ids = []
+        shape_types = []
+        num_points = []
+        points = []
+        extras = []
+        for item in shapes:
+            name = item["label"]
+            if name not in name_to_id:
+                name_to_id[name] = len(vocabulary)
+                vocabulary.append(name)
+            category_ids.append(name_to_id[name])
+            shape_types.append(get_shape_type_code(item["shape_type"]))
+            num_points.append(len(item["points"]))
+            points.extend(item["points"])
+            extras.append(
+                {
+                    key: value
+                    for key, value in item.items()
+                    if key not in ("label", "points", "shape_type")
+                }
+            )
+        int_coords = [[_is_int(v) for v in pt] for pt in points]
+        return cls(
+            np.array(points, dtype=np.float64).reshape(-1, 2),
+            np.concatenate([[0], np.cumsum(num_points, dtype=np.int64)]).astype(
+                np.int64
+            ),
+            np.array(shape_types, dtype=np.int8),
+            np.array(category_ids, dtype=np.int32),
+            vocabulary,
+            extras,
+            np.array(int_coords, dtype=bool).reshape(-1, 2),
+        )
+
+    def get_item(self, idx):
+        """
+        返回第idx个条目的labelme字典形式（新创建，flags等可变的字段为深拷贝，不与其他对象共享）
+        """
+        point_slice = slice(self.offsets[idx], self.offsets[idx + 1])
+        pts = self.points[point_slice]
+        int_coords = self.int_coords[point_slice]
+        if int_coords.all():
+            points = pts.astype(np.int64).tolist()
+        elif not int_coords.any():
+            points = pts.tolist()
+        else:
+            points = [
+                [int(v) if is_int else v for v, is_int in zip(pt, pt_is_int)]
+                for pt, pt_is_int in zip(pts.tolist(), int_coords.tolist())
+            ]
+        item = dict(
+            label=self.vocabulary[self.category_ids[idx]],
+            points=points,
+        )
+        # 与labelme的字段顺序一致：shape_type位于flags之前
+        for key, value in self.extras[idx].items():
+            if key == "flags":
+                item["shape_type"] = SHAPE_TYPES[self.shape_types[idx]]
+            item[key] = _copy_value(value)
+        item.setdefault("shape_type", SHAPE_TYPES[self.shape_types[idx]])
+        return item
+
+    def to_shapes(self):
+        """
+        转换为labelme的标注条目列表
+        """
+        return [self.get_item(idx) for idx in range(len(self))]
+
+    @property
+    def labels(self):
+        return [self.vocabulary[category_id] for category_id in self.category_ids]
+
+    def get_points(self, idx):
+        return self.points[self.offsets[idx] : self.offsets[idx + 1]]
+
+    def copy(self):
+        # 数组不可变，只需复制extras列表
+        return LabelArrays(
+            self.points,
+            self.offsets,
+            self.shape_types,
+            self.category_ids,
+            self.vocabulary,
+            list(self.extras),
+            self.int_coords,
+        )
+
+    def with_points(self, points, int_coords=False):
+        """
+        返回条目结构不变，点坐标替换为points的新对象
+        Args:
+            points: P x 2的数组
+            int_coords: 各坐标值是否以整数写回，bool或可广播为P x 2的bool数组，默认为False
+        """
+        assert points.shape == self.points.shape
+        return LabelArrays(
+            np.ascontiguousarray(points, dtype=np.float64),
+            self.offsets,
+            self.shape_types,
+            self.category_ids,
+            self.vocabulary,
+            list(self.extras),
+            np.broadcast_to(np.asarray(int_coords, dtype=bool), points.shape).copy(),
+        )
+
+    def take(self, idxes):
+        """
+        返回由序号idxes对应的条目组成的新对象
+        """
+        idxes = np.asarray(idxes, dtype=np.int64).ravel()
+        starts = self.offsets[idxes]
+        lengths = self.offsets[idxes + 1] - starts
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        # 各条目的点序号：条目起点加上条目内的相对序号
+        point_idxes = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return LabelArrays(
+            self.points[point_idxes],
+            offsets,
+            self.shape_types[idxes],
+            self.category_ids[idxes],
+            self.vocabulary,
+            [self.extras[idx] for idx in idxes],
+            self.int_coords[point_idxes],
+        )
+
+    @classmethod
+    def concatenate(cls, label_arrays_list):
+        """
+        依次拼接多个对象的条目，合并词表
+        """
+        label_arrays_list = [la for la in label_arrays_list if len(la)]
+        if not label_arrays_list:
+            return cls.empty()
+        if len(label_arrays_list) == 1:
+            return label_arrays_list[0].copy()
+        vocabulary = list(label_arrays_list[0].vocabulary)
+        name_to_id = {name: idx for idx, name in enumerate(vocabulary)}
+        category_ids = []
+        for la in label_arrays_list:
+            if la.vocabulary is label_arrays_list[0].vocabulary:
+                category_ids.append(la.category_ids)
+                continue
+            for name in la.vocabulary:
+                if name not in name_to_id:
+                    name_to_id[name] = len(vocabulary)
+                    vocabulary.append(name)
+            id_map = np.array(
+                [name_to_id[name] for name in la.vocabulary], dtype=np.int32
+            )
+            category_ids.append(id_map[la.category_ids])
+        num_points = np.cumsum([0] + [len(la.points) for la in label_arrays_list])
+        offsets = [label_arrays_list[0].offsets[:-1]]
+        for la, base in zip(label_arrays_list[1:], num_points[1:-1]):
+            offsets.append(la.offsets[:-1] + base)
+        offsets.append([num_points[-1]])
+        return cls(
+            np.concatenate([la.points for la in label_arrays_list]),
+            np.concatenate(offsets).astype(np.int64),
+            np.concatenate([la.shape_types for la in label_arrays_list]),
+            np.concatenate(category_ids).astype(np.int32),
+            vocabulary,
+            [extra for la in label_arrays_list for extra in la.extras],
+            np.concatenate([la.int_coords for la in label_arrays_list]),
+        )
+
+    def translate(self, x, y):
+        # 与逐点运算相同：整数坐标平移整数后仍为整数
+        return self.with_points(
+            self.points + np.array([x, y], dtype=np.float64),
+            self.int_coords & [_is_int(x), _is_int(y)],
+        )
+
+    def scale(self, fx, fy):
+        return self.with_points(
+            self.points * np.array([fx, fy], dtype=np.float64),
+            self.int_coords & [_is_int(fx), _is_int(fy)],
+        )
+
+    def transform(self, M, normalize_rectangles=True):
+        """
+        对所有点施加仿射变换
+        Args:
+            M: 2 x 3或3 x 3的仿射矩阵
+            normalize_rectangles: 是否将rectangle条目的两点整理为左上与右下（旋转后两点的相对位置会变化）
+
+        Returns:
+
+        """
+        M = np.asarray(M, dtype=np.float64)
+        points = self.points @ M[:2, :2].T + M[:2, 2]
+        # 整数矩阵（如旋转90度的倍数与整数平移）作用于两个坐标均为整数的点，结果仍为整数
+        int_points = self.int_coords.all(axis=1, keepdims=True) & _is_int_matrix(M)
+        ret = self.with_points(points, int_points)
+        if normalize_rectangles:
+            ret._normalize_rectangles()
+        return ret
+
+    def _normalize_rectangles(self):
+        idxes = np.flatnonzero(self.get_rectangle_mask())
+        if not len(idxes):
+            return
+        p0 = self.offsets[idxes]
+        pt_idxes = np.stack([p0, p0 + 1], axis=1)
+        pts = self.points[pt_idxes]
+        int_coords = self.int_coords[pt_idxes]
+        rows, cols = np.arange(len(p0))[:, None], np.arange(2)
+        self.points[p0] = pts.min(axis=1)
+        self.points[p0 + 1] = pts.max(axis=1)
+        # 整数标记随所取的坐标值一起交换
+        self.int_coords[p0] = int_coords[rows, pts.argmin(axis=1), cols]
+        self.int_coords[p0 + 1] = int_coords[rows, pts.argmax(axis=1), cols]
+
+    def get_rectangle_mask(self):
+        """
+        返回rectangle类型且包含两个点的条目的bool数组
+        """
+        return (self.shape_types == RECTANGLE) & (np.diff(self.offsets) >= 2)
+
+    def get_rectangle_points(self, idxes=None):
+        """
+        返回rectangle条目的前两个点，K x 4的数组（x1, y1, x2, y2，为标注中的原始顺序）
+        """
+        if idxes is None:
+            idxes = np.flatnonzero(self.get_rectangle_mask())
+        p0 = self.offsets[idxes]
+        return np.concatenate([self.points[p0], self.points[p0 + 1]], axis=1)
+
+    def get_bounding_boxes(self):
+        """
+        返回各条目所有点的外接矩形，N x 4的数组（x_min, y_min, x_max, y_max），不含点的条目为nan
+        """
+        boxes = np.full((len(self), 4), np.nan, dtype=np.float64)
+        non_empty = np.diff(self.offsets) > 0
+        if len(self.points) and non_empty.any():
+            starts = self.offsets[:-1][non_empty]
+            boxes[non_empty, :2] = np.minimum.reduceat(self.points, starts, axis=0)
+            boxes[non_empty, 2:] = np.maximum.reduceat(self.points, starts, axis=0)
+        return boxes
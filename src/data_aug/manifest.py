@@ -0,0 +1,251 @@
+# -*- coding:utf-8 -*-
+# @FileName :manifest.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 19:20
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pyutils
+from loguru import logger
+
+from . import json_io
+from .image_io import read_img_shape
+
+__all__ = [
+    "MANIFEST_NAME",
+    "LabelmeManifest",
+    "build_manifest",
+    "get_manifest",
+]
+
+MANIFEST_NAME = ".data_aug_manifest.npz"
+
+_COLUMNS = [
+    "label_paths",
+    "img_paths",
+    "label_mtimes",
+    "img_mtimes",
+    "heights",
+    "widths",
+    "num_shapes",
+    "label_names",
+    "name_ids",
+    "name_offsets",
+    "boxes",
+    "box_name_ids",
+    "box_offsets",
+]
+
+
+def _stat_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _parse_label_file(label_path):
+    """
+    解析单个标注文件，返回manifest中一行的内容（python对象形式）
+    """
+    label = json_io.load_json(label_path)
+    img_path = str(Path(label_path).parent / label["imagePath"])
+    height, width = label.get("imageHeight"), label.get("imageWidth")
+    if not height or not width:
+        img_shape = read_img_shape(img_path)
+        height, width = img_shape[:2] if img_shape is not None else (-1, -1)
+    names = []
+    boxes = []
+    box_names = []
+    for label_item in label["shapes"]:
+        names.append(label_item["label"])
+        if label_item["shape_type"] == "rectangle":
+            (x1, y1), (x2, y2) = label_item["points"][:2]
+            boxes.append([min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)])
+            box_names.append(label_item["label"])
+    return dict(
+        label_path=str(label_path),
+        img_path=img_path,
+        label_mtime=_stat_mtime(label_path),
+        img_mtime=_stat_mtime(img_path),
+        height=height,
+        width=width,
+        names=names,
+        boxes=boxes,
+        box_names=box_names,
+    )
+
+
+# labelme文件夹的清单，一次遍历后以列存储的形式记录每个标注文件的图像路径，尺寸，修改时间，标注数量，标注名称与矩形框，
+# 保存为npz文件，之后按修改时间增量更新，避免每次任务都重新遍历文件夹并解析所有json。
+class LabelmeManifest:
+    def __init__(self, **columns):
+        for name in _COLUMNS:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.label_paths)
+
+    @classmethod
+    def from_rows(cls, rows):
+        label_names = sorted({name for row in rows for name in row["names"]})
+        name_to_id = {name: idx for idx, name in enumerate(label_names)}
+        num_names = [len(row["names"]) for row in rows]
+        num_boxes = [len(row["boxes"]) for row in rows]
+        boxes = [box for row in rows for box in row["boxes"]]
+        return cls(
+            label_paths=np.array([row["label_path"] for row in rows], dtype=np.str_),
+            img_paths=np.array([row["img_path"] for row in rows], dtype=np.str_),
+            label_mtimes=np.array([row["label_mtime"] for row in rows], dtype=np.int64),
+            img_mtimes=np.array([row["img_mtime"] for row in rows], dtype=np.int64),
+            heights=np.array([row["height"] for row in rows], dtype=np.int32),
+            widths=np.array([row["width"] for row in rows], dtype=np.int32),
+            num_shapes=np.array(num_names, dtype=np.int32),
+            label_names=np.array(label_names, dtype=np.str_),
+            name_ids=np.array(
+                [name_to_id[name] for row in rows for name in row["names"]],
+                dtype=np.int32,
+            ),
+            name_offsets=np.concatenate([[0], np.cumsum(num_names)]).astype(np.int64),
+            boxes=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+            box_name_ids=np.array(
+                [name_to_id[name] for row in rows for name in row["box_names"]],
+                dtype=np.int32,
+            ),
+            box_offsets=np.concatenate([[0], np.cumsum(num_boxes)]).astype(np.int64),
+        )
+
+    def get_row(self, idx):
+        name_slice = slice(self.name_offsets[idx], self.name_offsets[idx + 1])
+        box_slice = slice(self.box_offsets[idx], self.box_offsets[idx + 1])
+        return dict(
+            label_path=str(self.label_paths[idx]),
+            img_path=str(self.img_paths[idx]),
+            label_mtime=int(self.label_mtimes[idx]),
+            img_mtime=int(self.img_mtimes[idx]),
+            height=int(self.heights[idx]),
+            width=int(self.widths[idx]),
+            names=self.label_names[self.name_ids[name_slice]].tolist(),
+            boxes=self.boxes[box_slice].tolist(),
+            box_names=self.label_names[self.box_name_ids[box_slice]].tolist(),
+        )
+
+    def get_boxes(self, idx):
+        """
+        返回第idx个标注文件中rectangle标注的xyxy矩形框（float32，N x 4）
+        """
+        return self.boxes[self.box_offsets[idx] : self.box_offsets[idx + 1]]
+
+    @classmethod
+    def load(cls, manifest_path):
+        with np.load(str(manifest_path), allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in _COLUMNS})
+
+    def save(self, manifest_path):
+        manifest_path = Path(manifest_path)
+        tmp_path = manifest_path.with_name(manifest_path.name + f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **{name: getattr(self, name) for name in _COLUMNS})
+        os.replace(tmp_path, manifest_path)
+
+    def filter_with_size(
+        self,
+        min_size=[0, 0],
+        max_size=[float("inf"), float("inf")],
+        min_mode="and",
+        max_mode="and",
+    ):
+        """
+        与DataPackage.filter_with_size的判断规则相同，返回满足尺寸范围的行号数组
+        """
+        h, w = self.heights, self.widths
+        if min_mode == "and":
+            fit_min = (h >= min_size[1]) & (w >= min_size[0])
+        else:
+            fit_min = (h >= min_size[1]) | (w >= min_size[0])
+        if max_mode == "and":
+            fit_max = (h < max_size[1]) & (w < max_size[0])
+        else:
+            fit_max = (h < max_size[1]) | (w < max_size[0])
+        return np.flatnonzero(fit_min & fit_max)
+
+
+def build_manifest(dir_path, manifest_path=None):
+    """
+    遍历文件夹中的标注文件，生成或增量更新清单并保存：标注文件与图像的修改时间均未变化的行直接沿用，
+    其余重新解析，已删除的标注文件对应的行被移除。
+    Args:
+        dir_path: labelme文件夹
+        manifest_path: 清单保存路径，默认为文件夹下的MANIFEST_NAME
+
+    Returns:
+        LabelmeManifest对象
+    """
+    dir_path = Path(dir_path).absolute()
+    if manifest_path is None:
+        manifest_path = dir_path / MANIFEST_NAME
+    old_rows = {}
+    if Path(manifest_path).exists():
+        try:
+            old = LabelmeManifest.load(manifest_path)
+            old_rows = {
+                str(label_path): idx for idx, label_path in enumerate(old.label_paths)
+            }
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"{manifest_path} is broken, rebuild it")
+    rows = []
+    num_parsed = 0
+    for label_path in pyutils.glob_dir(str(dir_path), include_patterns=["*.json"]):
+        label_path = str(label_path)
+        idx = old_rows.get(label_path)
+        if idx is not None and old.label_mtimes[idx] == _stat_mtime(label_path):
+            row = old.get_row(idx)
+            if row["img_mtime"] == _stat_mtime(row["img_path"]):
+                rows.append(row)
+                continue
+        rows.append(_parse_label_file(label_path))
+        num_parsed += 1
+    manifest = LabelmeManifest.from_rows(rows)
+    if num_parsed or len(rows) != len(old_rows):
+        manifest.save(manifest_path)
+    return manifest
+
+
+def _is_stale(manifest, dir_path):
+    """
+    检查清单是否过期：文件夹中的标注文件列表与清单不一致，或任一标注文件与图像的修改时间发生变化（只stat，不解析json）
+    """
+    label_paths = [
+        str(label_path)
+        for label_path in pyutils.glob_dir(str(dir_path), include_patterns=["*.json"])
+    ]
+    if len(label_paths) != len(manifest) or set(label_paths) != set(
+        manifest.label_paths.tolist()
+    ):
+        return True
+    label_mtimes = [_stat_mtime(path) for path in manifest.label_paths.tolist()]
+    if not np.array_equal(label_mtimes, manifest.label_mtimes):
+        return True
+    img_mtimes = [_stat_mtime(path) for path in manifest.img_paths.tolist()]
+    return not np.array_equal(img_mtimes, manifest.img_mtimes)
+
+
+def get_manifest(dir_path, update=False):
+    """
+    获取文件夹的清单：清单已存在且未过期（标注文件列表与各文件的修改时间均未变化）时直接载入，
+    update为True，清单不存在或已过期时调用build_manifest生成或增量更新。
+    """
+    dir_path = Path(dir_path).absolute()
+    manifest_path = dir_path / MANIFEST_NAME
+    if not update and manifest_path.exists():
+        try:
+            manifest = LabelmeManifest.load(manifest_path)
+        except (OSError, ValueError, KeyError):
+            pass
+        else:
+            if not _is_stale(manifest, dir_path):
+                return manifest
+            logger.debug(f"{manifest_path} is stale, update it")
+    return build_manifest(dir_path, manifest_path)
@@ -0,0 +1,175 @@
+# -*- coding:utf-8 -*-
+# @FileName :placement.py
+# @Author   :Deyu He
+# @Time     :2026/10/19 01:00
+
+import random
+
+import numpy as np
+
+__all__ = [
+    "PLACEMENTS",
+    "get_free_position_mask",
+    "sample_free_position",
+    "MaxRectsPacker",
+]
+
+# paste_by_iter支持的粘贴位置选取方式：
+# random为随机生成位置并以check_overlap拒绝重合的位置，最多尝试num_max_try次；
+# occupancy为在全部不重合的位置中一次均匀采样，没有可用位置时跳过；
+# pack为先收集全部源对象，再以MaxRectsPacker密集排布，放不下的跳过
+PLACEMENTS = ["random", "occupancy", "pack"]
+
+
+def get_free_position_mask(canvas_shape, boxes, width, height, margin=0):
+    """
+    计算尺寸为width x height的对象在画布上所有不与已有框重合的左上角位置，判断方式与DataPackage.check_overlap一致
+    （对象向四周扩展margin后与任一框的交集面积大于0即为重合）。
+    每个框所阻挡的左上角位置为该框按对象尺寸与margin膨胀后的整数矩形，以二维差分累加（积分图）一次得到全部位置的阻挡计数。
+    Args:
+        canvas_shape: 画布的shape
+        boxes: N x 4的已有框数组（x_min, y_min, x_max, y_max）
+        width: 对象宽度
+        height: 对象高度
+        margin: 判断重合时的余量
+
+    Returns:
+        (H - height) x (W - width)的bool数组，第ty行第tx列表示左上角(tx, ty)是否可用，
+        与random.randint(0, W - width - 1)的取值范围一致
+    """
+    num_y = canvas_shape[0] - height
+    num_x = canvas_shape[1] - width
+    if num_x <= 0 or num_y <= 0:
+        return np.zeros((max(num_y, 0), max(num_x, 0)), dtype=bool)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    # 面积为0的框与任何区域的交集面积都为0，不阻挡
+    boxes = boxes[(boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])]
+    # tx - margin < x_max 且 tx + width + margin > x_min，即 x_min - width - margin < tx < x_max + margin
+    x0 = np.clip(np.floor(boxes[:, 0] - width - margin) + 1, 0, num_x).astype(np.int64)
+    x1 = np.clip(np.ceil(boxes[:, 2] + margin), 0, num_x).astype(np.int64)
+    y0 = np.clip(np.floor(boxes[:, 1] - height - margin) + 1, 0, num_y).astype(np.int64)
+    y1 = np.clip(np.ceil(boxes[:, 3] + margin), 0, num_y).astype(np.int64)
+    valid = (x0 < x1) & (y0 < y1)
+    x0, x1, y0, y1 = x0[valid], x1[valid], y0[valid], y1[valid]
+    diff = np.zeros((num_y + 1, num_x + 1), dtype=np.int32)
+    np.add.at(diff, (y0, x0), 1)
+    np.add.at(diff, (y0, x1), -1)
+    np.add.at(diff, (y1, x0), -1)
+    np.add.at(diff, (y1, x1), 1)
+    blocked = diff.cumsum(axis=0).cumsum(axis=1)[:num_y, :num_x]
+    return blocked == 0
+
+
+def sample_free_position(canvas_shape, boxes, width, height, margin=0):
+    """
+    在全部不与已有框重合的左上角位置中均匀采样一个（使用random模块，随random.seed复现）
+    Args:
+        canvas_shape: 画布的shape
+        boxes: N x 4的已有框数组（x_min, y_min, x_max, y_max）
+        width: 对象宽度
+        height: 对象高度
+        margin: 判断重合时的余量
+
+    Returns:
+        左上角坐标(tl_x, tl_y)，没有可用位置时返回None
+    """
+    free = np.flatnonzero(
+        get_free_position_mask(canvas_shape, boxes, width, height, margin)
+    )
+    if not len(free):
+        return None
+    idx = int(free[random.randrange(len(free))])
+    num_x = canvas_shape[1] - width
+    return idx % num_x, idx // num_x
+
+
+def _split_free_rect(free_rect, used):
+    """
+    从空闲矩形(x, y, w, h)中去掉已占用区域used(x0, y0, x1, y1)，返回剩余的（可相互重叠的）最大空闲矩形
+    """
+    fx, fy, fw, fh = free_rect
+    ux0, uy0, ux1, uy1 = used
+    if ux0 >= fx + fw or ux1 <= fx or uy0 >= fy + fh or uy1 <= fy:
+        return [free_rect]
+    ret = []
+    if ux0 > fx:
+        ret.append((fx, fy, ux0 - fx, fh))
+    if ux1 < fx + fw:
+        ret.append((ux1, fy, fx + fw - ux1, fh))
+    if uy0 > fy:
+        ret.append((fx, fy, fw, uy0 - fy))
+    if uy1 < fy + fh:
+        ret.append((fx, uy1, fw, fy + fh - uy1))
+    return ret
+
+
+def _contains(a, b):
+    return (
+        a[0] <= b[0]
+        and a[1] <= b[1]
+        and a[0] + a[2] >= b[0] + b[2]
+        and a[1] + a[3] >= b[1] + b[3]
+    )
+
+
+# MaxRects矩形排布：维护画布中全部（可相互重叠的）最大空闲矩形，每次以最短边剩余最小（best short side fit）
+# 的原则选取放置位置，再以已占用区域切分空闲矩形。画布上已有的标注可先通过occupy登记为占用区域。
+class MaxRectsPacker:
+    def __init__(self, width, height):
+        """
+        Args:
+            width: 画布宽度
+            height: 画布高度
+        """
+        self.width = int(width)
+        self.height = int(height)
+        self.free_rects = []
+        if self.width > 0 and self.height > 0:
+            self.free_rects.append((0, 0, self.width, self.height))
+
+    def occupy(self, x0, y0, x1, y1):
+        """
+        将区域[x0, x1) x [y0, y1)登记为已占用
+        """
+        if x1 <= x0 or y1 <= y0:
+            return
+        free_rects = []
+        for free_rect in self.free_rects:
+            free_rects += _split_free_rect(free_rect, (x0, y0, x1, y1))
+        # 去掉被其他空闲矩形包含的空闲矩形（完全相同时保留第一个）
+        self.free_rects = [
+            a
+            for i, a in enumerate(free_rects)
+            if not any(
+                _contains(b, a) and (b != a or j < i)
+                for j, b in enumerate(free_rects)
+                if j != i
+            )
+        ]
+
+    def insert(self, width, height, allow_rotate=False):
+        """
+        放置一个width x height的矩形
+        Args:
+            width: 矩形宽度
+            height: 矩形高度
+            allow_rotate: 是否允许旋转90度（宽高互换）放置
+
+        Returns:
+            (x, y, w, h, rotated)，w与h为实际放置的宽高；没有足够空间时返回None
+        """
+        candidates = [(width, height, False)]
+        if allow_rotate and width != height:
+            candidates.append((height, width, True))
+        best = None
+        for fx, fy, fw, fh in self.free_rects:
+            for w, h, rotated in candidates:
+                if w <= fw and h <= fh:
+                    score = (min(fw - w, fh - h), max(fw - w, fh - h))
+                    if best is None or score < best[0]:
+                        best = (score, fx, fy, w, h, rotated)
+        if best is None:
+            return None
+        _, x, y, w, h, rotated = best
+        self.occupy(x, y, x + w, y + h)
+        return x, y, w, h, rotated
@@ -0,0 +1,176 @@
+# -*- coding:utf-8 -*-
+# @FileName :shard.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 14:20
+
+import mmap
+import struct
+from functools import partial
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from . import json_io
+from .data_package import DataPackage
+
+__all__ = [
+    "DataPackageShardWriter",
+    "DataPackageShardReader",
+    "gen_data_package_list_from_shard",
+]
+
+# 分片文件布局：
+# | magic(8) | 各对象像素数据依次拼接 | 索引(int64, N x 2, 偏移与长度) | 标注表(紧凑json) | 尾部(32) |
+# 尾部为 <索引偏移, 对象数量, 标注表偏移, magic>，读取时先读尾部，再按索引随机访问任意对象。
+_MAGIC = b"DAPSHRD1"
+_TRAILER = struct.Struct("<QQQ8s")
+
+
+# 将大量DataPackage对象（通常为裁剪得到的前景）打包写入单个分片文件
+class DataPackageShardWriter:
+    def __init__(self, shard_path, encoding=".png"):
+        """
+        Args:
+            shard_path: 分片文件路径
+            encoding: 像素数据的编码方式，为cv2.imencode支持的后缀（如".png"，".bmp"），或"raw"表示不编码直接保存像素
+        """
+        self.shard_path = str(Path(shard_path).absolute())
+        self.encoding = encoding
+        Path(self.shard_path).parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.shard_path, "wb")
+        self._f.write(_MAGIC)
+        self._index = []
+        self._table = []
+
+    def __len__(self):
+        return len(self._index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, dp):
+        """
+        写入一个DataPackage对象，返回其在分片中的序号
+        """
+        assert isinstance(dp, DataPackage)
+        img = np.ascontiguousarray(dp.get_readonly_img())
+        if self.encoding == "raw":
+            payload = img.tobytes()
+        else:
+            success, buf = cv2.imencode(self.encoding, img)
+            assert success, f"failed to encode {dp.img_path} as {self.encoding}"
+            payload = buf.tobytes()
+        offset = self._f.tell()
+        self._f.write(payload)
+        self._index.append((offset, len(payload)))
+        label = dp.export_label()
+        label["imageData"] = None
+        self._table.append(
+            dict(
+                name=Path(dp.img_path).name if dp.img_path is not None else None,
+                shape=list(img.shape),
+                dtype=str(img.dtype),
+                cat_idx=dp.cat_idx,
+                label=label,
+            )
+        )
+        return len(self._index) - 1
+
+    def close(self):
+        if self._f is None:
+            return
+        index_offset = self._f.tell()
+        self._f.write(np.asarray(self._index, dtype="<i8").reshape(-1, 2).tobytes())
+        table_offset = self._f.tell()
+        self._f.write(json_io.dumps(dict(encoding=self.encoding, items=self._table)))
+        self._f.write(
+            _TRAILER.pack(index_offset, len(self._index), table_offset, _MAGIC)
+        )
+        self._f.close()
+        self._f = None
+
+
+# 通过内存映射随机访问分片文件中的任意对象，无需遍历文件夹
+class DataPackageShardReader:
+    def __init__(self, shard_path):
+        self.shard_path = str(Path(shard_path).absolute())
+        # 分片中对象的虚拟路径：与分片同名（去掉后缀）的文件夹下的原文件名
+        self.virtual_dir = Path(self.shard_path).with_suffix("")
+        with open(self.shard_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index_offset, num_items, table_offset, magic = _TRAILER.unpack(
+            self._mm[-_TRAILER.size :]
+        )
+        if magic != _MAGIC or self._mm[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{self.shard_path} is not a data package shard")
+        self._index = np.frombuffer(
+            self._mm, dtype="<i8", count=num_items * 2, offset=index_offset
+        ).reshape(-1, 2)
+        table = json_io.loads(self._mm[table_offset : len(self._mm) - _TRAILER.size])
+        self.encoding = table["encoding"]
+        self._table = table["items"]
+
+    def __len__(self):
+        return len(self._table)
+
+    def __getitem__(self, idx):
+        return self.get(idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self.get(idx)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def read_img(self, idx):
+        """
+        解码并返回第idx个对象的像素
+        """
+        offset, length = self._index[idx]
+        item = self._table[idx]
+        buf = np.frombuffer(self._mm, dtype=np.uint8, count=length, offset=offset)
+        if self.encoding == "raw":
+            return buf.view(item["dtype"]).reshape(item["shape"]).copy()
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+    def get(self, idx, lazy=False):
+        """
+        返回第idx个对象对应的DataPackage对象
+        Args:
+            idx: 对象序号
+            lazy: 是否延迟解码像素，默认为False
+
+        Returns:
+
+        """
+        item = self._table[idx]
+        img_path = (
+            str(self.virtual_dir / item["name"]) if item["name"] is not None else None
+        )
+        img = None if lazy else self.read_img(idx)
+        dp = DataPackage(img_path, img, None, item["label"], item["cat_idx"])
+        if lazy:
+            dp.bind_img_loader(partial(self.read_img, idx), item["shape"])
+        return dp
+
+    def close(self):
+        if self._mm is not None:
+            self._index = None
+            self._mm.close()
+            self._mm = None
+
+
+def gen_data_package_list_from_shard(shard_path, lazy=True):
+    """
+    读取分片文件，返回其中全部对象的DataPackage列表，默认延迟解码，可直接用于循环迭代器与图像缓存
+    """
+    reader = DataPackageShardReader(shard_path)
+    return [reader.get(idx, lazy=lazy) for idx in range(len(reader))]
@@ -0,0 +1,263 @@
+# -*- coding:utf-8 -*-
+# @FileName :sink.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 21:10
+
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from functools import partial
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from . import json_io
+from .data_package import DataPackage
+from .image_io import encode_img
+
+__all__ = [
+    "ShardSink",
+    "ShardSinkReader",
+    "gen_data_package_list_from_sink",
+]
+
+_INDEX_SUFFIX = ".index.json"
+_TAR_BLOCK = tarfile.BLOCKSIZE
+
+
+def _get_index_path(shard_path):
+    return Path(str(shard_path) + _INDEX_SUFFIX)
+
+
+# 合成结果的输出端：将样本的图像与标注依次写入tar或zip分片，单个分片达到大小上限后新建下一个分片，
+# 每个分片关闭时写出同名的索引文件（<分片>.index.json），记录各样本的键与成员在分片中的位置。
+# 分片内成员为"<键><图像后缀>"与"<键>.json"，解包后即为普通的labelme文件夹。
+class ShardSink:
+    def __init__(
+        self,
+        dst_dir,
+        format="tar",
+        max_shard_bytes=1 << 30,
+        prefix="shard",
+        codec=None,
+    ):
+        """
+        Args:
+            dst_dir: 分片保存的文件夹
+            format: 分片格式，"tar"或"zip"（不压缩）
+            max_shard_bytes: 单个分片的字节数上限，单个样本超过上限时独占一个分片
+            prefix: 分片文件名前缀，分片依次命名为"<prefix>-000000.tar"等
+            codec: 图像编码方式（见data_aug.image_io.register_codec），为None时按样本img_path的后缀选择
+        """
+        assert format in ("tar", "zip")
+        self.dst_dir = Path(dst_dir).absolute()
+        self.dst_dir.mkdir(parents=True, exist_ok=True)
+        self.format = format
+        self.max_shard_bytes = max_shard_bytes
+        self.prefix = prefix
+        self.codec = codec
+        self.num_written = 0
+        self.shard_paths = []
+        self._keys = set()
+        self._lock = threading.Lock()
+        self._archive = None
+        self._shard_path = None
+        self._shard_bytes = 0
+        self._index = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _open_shard(self):
+        self._shard_path = (
+            self.dst_dir / f"{self.prefix}-{len(self.shard_paths):06d}.{self.format}"
+        )
+        self.shard_paths.append(str(self._shard_path))
+        if self.format == "tar":
+            self._archive = tarfile.open(
+                str(self._shard_path), "w", format=tarfile.GNU_FORMAT
+            )
+        else:
+            self._archive = zipfile.ZipFile(
+                str(self._shard_path), "w", compression=zipfile.ZIP_STORED
+            )
+        self._shard_bytes = 0
+        self._index = []
+
+    def _close_shard(self):
+        if self._archive is None:
+            return
+        self._archive.close()
+        index_path = _get_index_path(self._shard_path)
+        tmp_path = index_path.with_name(index_path.name + f".{os.getpid()}.tmp")
+        json_io.dump_json(dict(format=self.format, items=self._index), tmp_path)
+        os.replace(tmp_path, index_path)
+        self._archive = None
+
+    def _add_member(self, name, data):
+        """
+        写入一个成员，返回其数据在分片中的(偏移, 长度)，zip格式只按名称访问，偏移记为-1
+        """
+        if self.format == "zip":
+            self._archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data)
+            return -1, len(data)
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._archive.addfile(info, io.BytesIO(data))
+        # addfile之后tar的写入位置位于数据（按512字节对齐）之后，据此反推数据偏移
+        padded_size = -(-len(data) // _TAR_BLOCK) * _TAR_BLOCK
+        return self._archive.offset - padded_size, len(data)
+
+    def write(self, dp, key=None, codec=None):
+        """
+        写入一个DataPackage对象，可在AsyncDataPackageSaver的多个写线程中并行调用（编码在锁外执行）
+        Args:
+            dp: DataPackage对象
+            key: 样本的键，默认为img_path的文件名（不含后缀），同一输出端内不可重复
+            codec: 图像编码方式，为None时使用构造时指定的编码方式
+
+        Returns:
+            True
+        """
+        assert isinstance(dp, DataPackage)
+        if key is None:
+            key = Path(dp.img_path).stem
+        img_data, img_codec = encode_img(
+            dp.get_readonly_img(),
+            codec if codec is not None else self.codec,
+            dp.img_path,
+        )
+        img_name = key + img_codec.suffix
+        label = dp.export_label()
+        label["imagePath"] = img_name
+        label["imageData"] = None
+        label_data = json_io.dumps(label, indent=2)
+        with self._lock:
+            if key in self._keys:
+                raise ValueError(f"duplicate sample key {key}")
+            self._keys.add(key)
+            sample_bytes = len(img_data) + len(label_data)
+            if self._archive is None or (
+                self._index and self._shard_bytes + sample_bytes > self.max_shard_bytes
+            ):
+                self._close_shard()
+                self._open_shard()
+            img_offset, img_size = self._add_member(img_name, img_data)
+            label_offset, label_size = self._add_member(key + ".json", label_data)
+            self._index.append(
+                dict(
+                    key=key,
+                    img=[img_name, img_offset, img_size],
+                    label=[key + ".json", label_offset, label_size],
+                    cat_idx=dp.cat_idx,
+                )
+            )
+            self._shard_bytes += sample_bytes
+            self.num_written += 1
+        return True
+
+    def close(self):
+        with self._lock:
+            self._close_shard()
+
+
+# 按索引文件随机访问单个tar或zip分片中的样本，tar分片按偏移直接读取，无需遍历成员
+class ShardSinkReader:
+    def __init__(self, shard_path):
+        self.shard_path = str(Path(shard_path).absolute())
+        # 分片中对象的虚拟路径：与分片同名（去掉后缀）的文件夹下的成员名
+        self.virtual_dir = Path(self.shard_path).with_suffix("")
+        index = json_io.load_json(_get_index_path(self.shard_path))
+        self.format = index["format"]
+        self._items = index["items"]
+        self._lock = threading.Lock()
+        if self.format == "tar":
+            self._f = open(self.shard_path, "rb")
+        else:
+            self._f = zipfile.ZipFile(self.shard_path, "r")
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, idx):
+        return self.get(idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self.get(idx)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def keys(self):
+        return [item["key"] for item in self._items]
+
+    def _read_member(self, member):
+        name, offset, size = member
+        with self._lock:
+            if self.format == "zip":
+                return self._f.read(name)
+            self._f.seek(offset)
+            return self._f.read(size)
+
+    def read_img(self, idx):
+        """
+        解码并返回第idx个样本的图像
+        """
+        img_name = self._items[idx]["img"][0]
+        data = self._read_member(self._items[idx]["img"])
+        if img_name.lower().endswith(".npy"):
+            return np.load(io.BytesIO(data))[:, :, :3]
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def read_label(self, idx):
+        return json_io.loads(self._read_member(self._items[idx]["label"]))
+
+    def get(self, idx, lazy=False):
+        """
+        返回第idx个样本对应的DataPackage对象
+        Args:
+            idx: 样本序号
+            lazy: 是否延迟解码图像，默认为False
+
+        Returns:
+
+        """
+        item = self._items[idx]
+        label = self.read_label(idx)
+        img_path = str(self.virtual_dir / item["img"][0])
+        label_path = str(self.virtual_dir / item["label"][0])
+        img = None if lazy else self.read_img(idx)
+        dp = DataPackage(img_path, img, label_path, label, item["cat_idx"])
+        if lazy:
+            img_shape = [label["imageHeight"], label["imageWidth"], 3]
+            dp.bind_img_loader(partial(self.read_img, idx), img_shape)
+        return dp
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def gen_data_package_list_from_sink(sink_dir, lazy=True):
+    """
+    读取ShardSink输出文件夹中的全部分片（按分片名排序），返回其中全部样本的DataPackage列表，默认延迟解码
+    """
+    dp_list = []
+    for index_path in sorted(Path(sink_dir).absolute().glob("*" + _INDEX_SUFFIX)):
+        reader = ShardSinkReader(str(index_path)[: -len(_INDEX_SUFFIX)])
+        dp_list += [reader.get(idx, lazy=lazy) for idx in range(len(reader))]
+    return dp_list
@@ -0,0 +1,193 @@
+# -*- coding:utf-8 -*-
+# @FileName :spatial_index.py
+# @Author   :Deyu He
+# @Time     :2026/10/19 00:20
+
+import math
+
+import numpy as np
+
+__all__ = [
+    "GridIndex",
+]
+
+
+# 矩形框的均匀网格索引：每个框登记在其覆盖的所有网格中，查询时只对查询区域所覆盖网格中的候选框做精确判断。
+# 支持增量插入（粘贴与合并只追加框，无需重建），查询结果为插入时给定的id，按插入顺序升序返回。
+class GridIndex:
+    def __init__(self, cell_size=64):
+        """
+        Args:
+            cell_size: 网格边长，通常取框边长的1至2倍
+        """
+        self.cell_size = float(cell_size)
+        self._cells = {}
+        self._chunks = []
+        self._boxes = np.zeros((0, 4), dtype=np.float64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._num = 0
+        # 非空网格的坐标范围，用于限制最近邻查询的搜索半径
+        self._cell_range = None
+
+    def __len__(self):
+        return self._num
+
+    @classmethod
+    def build(cls, boxes, ids=None, cell_size=None):
+        """
+        由框数组创建索引
+        Args:
+            boxes: N x 4的数组（x_min, y_min, x_max, y_max）
+            ids: 各框的id，默认为0至N-1
+            cell_size: 网格边长，默认为框的最长边中位数的2倍（不小于16）
+
+        Returns:
+
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if cell_size is None:
+            cell_size = 64
+            if len(boxes):
+                extent = np.maximum(
+                    boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+                )
+                cell_size = max(16.0, 2 * float(np.median(extent)))
+        index = cls(cell_size)
+        index.insert(boxes, ids)
+        return index
+
+    @property
+    def boxes(self):
+        self._flush()
+        return self._boxes
+
+    @property
+    def ids(self):
+        self._flush()
+        return self._ids
+
+    def _flush(self):
+        if self._chunks:
+            self._boxes = np.concatenate([self._boxes] + [b for b, _ in self._chunks])
+            self._ids = np.concatenate([self._ids] + [i for _, i in self._chunks])
+            self._chunks = []
+
+    def _cell_of(self, v):
+        return math.floor(v / self.cell_size)
+
+    def insert(self, boxes, ids=None):
+        """
+        追加若干框
+        Args:
+            boxes: K x 4的数组（x_min, y_min, x_max, y_max）
+            ids: 各框的id，默认接续已有框的数量递增
+
+        Returns:
+
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if not len(boxes):
+            return
+        if ids is None:
+            ids = np.arange(self._num, self._num + len(boxes), dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        assert len(ids) == len(boxes)
+        cell_ranges = np.floor(boxes / self.cell_size).astype(np.int64)
+        for pos, (cx0, cy0, cx1, cy1) in enumerate(cell_ranges.tolist(), self._num):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self._cells.setdefault((cx, cy), []).append(pos)
+        lo = cell_ranges[:, :2].min(axis=0).tolist()
+        hi = cell_ranges[:, 2:].max(axis=0).tolist()
+        if self._cell_range is not None:
+            lo = np.minimum(lo, self._cell_range[0]).tolist()
+            hi = np.maximum(hi, self._cell_range[1]).tolist()
+        self._cell_range = (lo, hi)
+        self._chunks.append((boxes, ids))
+        self._num += len(boxes)
+
+    def _candidates(self, x_min, y_min, x_max, y_max):
+        """
+        返回与查询区域所覆盖网格有关的框的位置（升序）
+        """
+        cx0, cy0 = self._cell_of(x_min), self._cell_of(y_min)
+        cx1, cy1 = self._cell_of(x_max), self._cell_of(y_max)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) >= self._num:
+            # 查询区域覆盖的网格数不少于框的数量时直接全量判断
+            return np.arange(self._num)
+        positions = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                positions += self._cells.get((cx, cy), ())
+        return np.unique(np.array(positions, dtype=np.int64))
+
+    def intersects(self, x_min, y_min, x_max, y_max, strict=True):
+        """
+        返回与查询区域相交的框的id
+        Args:
+            strict: 为True时交集面积须大于0，为False时边界接触也视为相交
+
+        Returns:
+
+        """
+        positions = self._candidates(x_min, y_min, x_max, y_max)
+        boxes = self.boxes[positions]
+        if strict:
+            mask = (np.minimum(boxes[:, 2], x_max) > np.maximum(boxes[:, 0], x_min)) & (
+                np.minimum(boxes[:, 3], y_max) > np.maximum(boxes[:, 1], y_min)
+            )
+        else:
+            mask = (
+                np.minimum(boxes[:, 2], x_max) >= np.maximum(boxes[:, 0], x_min)
+            ) & (np.minimum(boxes[:, 3], y_max) >= np.maximum(boxes[:, 1], y_min))
+        return self.ids[positions[mask]]
+
+    def contained(self, x_min, y_min, x_max, y_max):
+        """
+        返回完整落入查询区域（含边界）的框的id
+        """
+        positions = self._candidates(x_min, y_min, x_max, y_max)
+        boxes = self.boxes[positions]
+        mask = (
+            (boxes[:, 0] >= x_min)
+            & (boxes[:, 1] >= y_min)
+            & (boxes[:, 2] <= x_max)
+            & (boxes[:, 3] <= y_max)
+        )
+        return self.ids[positions[mask]]
+
+    def nearest(self, x, y):
+        """
+        返回距离点(x, y)最近的框的id与距离（点在框内时距离为0），索引为空时返回None
+        """
+        if not self._num:
+            return None
+        cx, cy = self._cell_of(x), self._cell_of(y)
+        (lo_x, lo_y), (hi_x, hi_y) = self._cell_range
+        max_radius = max(cx - lo_x, hi_x - cx, cy - lo_y, hi_y - cy, 0)
+        best_pos, best_dist = -1, math.inf
+        boxes = self.boxes
+        for radius in range(max_radius + 1):
+            # 以(cx, cy)为中心，切比雪夫距离为radius的一圈网格
+            positions = []
+            for gx in range(cx - radius, cx + radius + 1):
+                for gy in (cy - radius, cy + radius) if radius else (cy,):
+                    positions += self._cells.get((gx, gy), ())
+            for gy in range(cy - radius + 1, cy + radius):
+                for gx in (cx - radius, cx + radius) if radius else ():
+                    positions += self._cells.get((gx, gy), ())
+            if positions:
+                positions = np.unique(np.array(positions, dtype=np.int64))
+                candidates = boxes[positions]
+                dx = np.maximum(candidates[:, 0] - x, x - candidates[:, 2]).clip(0)
+                dy = np.maximum(candidates[:, 1] - y, y - candidates[:, 3]).clip(0)
+                dist = np.hypot(dx, dy)
+                k = int(np.argmin(dist))
+                if dist[k] < best_dist or (
+                    dist[k] == best_dist and positions[k] < best_pos
+                ):
+                    best_pos, best_dist = int(positions[k]), float(dist[k])
+            # 尚未访问的网格中的框与查询点的距离不小于radius * cell_size
+            if best_pos >= 0 and best_dist <= radius * self.cell_size:
+                break
+        return int(self.ids[best_pos]), best_dist
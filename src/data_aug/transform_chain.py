@@ -0,0 +1,249 @@
+# -*- coding:utf-8 -*-
+# @FileName :transform_chain.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 23:40
+
+import random
+
+import cv2
+import numpy as np
+import pyutils
+
+__all__ = [
+    "get_rotate_matrix_by_multi_90",
+    "TransformChain",
+]
+
+
+def _translate_matrix(x, y):
+    return np.array([[1, 0, x], [0, 1, y], [0, 0, 1]], dtype=np.float64)
+
+
+def _scale_matrix(fx, fy):
+    return np.array([[fx, 0, 0], [0, fy, 0], [0, 0, 1]], dtype=np.float64)
+
+
+def get_rotate_matrix_by_multi_90(img_shape, rotate_degree):
+    """
+    返回将shape为img_shape的图像上的坐标旋转90，180或270度（逆时针为正）并平移到旋转后图像中的3x3仿射矩阵，
+    坐标以像素左上角为原点
+    """
+    h, w = img_shape[:2]
+    if rotate_degree == 90:
+        return np.array([[0, 1, 0], [-1, 0, w], [0, 0, 1]], dtype=np.float64)
+    elif rotate_degree in (270, -90):
+        return np.array([[0, -1, h], [1, 0, 0], [0, 0, 1]], dtype=np.float64)
+    return np.array([[-1, 0, w], [0, -1, h], [0, 0, 1]], dtype=np.float64)
+
+
+# 几何变换链：依次记录旋转，缩放，补边与裁剪等操作，合成为一个3x3仿射矩阵与输出画布尺寸，不产生中间图像。
+# 各操作的尺寸与标注语义与DataPackage的同名方法一致，最终由DataPackage.apply_transform_chain
+# 以一次cv2.warpAffine（仅含整数平移时为一次切片复制）生成图像，标注条目一次变换完成。
+# 矩阵作用于标注坐标（以像素左上角为原点），warpAffine使用以像素中心为原点的矩阵 T(-0.5) @ M @ T(0.5)。
+class TransformChain:
+    def __init__(self, img_shape, img_path=None):
+        """
+        Args:
+            img_shape: 源图像的shape
+            img_path: 源图像路径，各操作按DataPackage同名方法的方式在文件名后追加后缀
+        """
+        self.src_shape = tuple(img_shape)
+        self.M = np.eye(3, dtype=np.float64)
+        self.width = int(img_shape[1])
+        self.height = int(img_shape[0])
+        self.img_path = img_path
+        # 裁剪区域（当前坐标系下的x_min, y_min, x_max, y_max，含边界），有裁剪时最终只保留完整落入其中的rectangle标注
+        self.keep_region = None
+
+    @property
+    def img_shape(self):
+        return (self.height, self.width) + self.src_shape[2:]
+
+    @property
+    def is_identity(self):
+        return np.array_equal(self.M, np.eye(3)) and self.img_shape == self.src_shape
+
+    def _append_file_name(self, suffix):
+        if self.img_path is not None:
+            self.img_path = pyutils.append_file_name(self.img_path, suffix)
+
+    def _then(self, M, width, height):
+        self.M = M @ self.M
+        self.width = int(width)
+        self.height = int(height)
+        if self.keep_region is not None:
+            x0, y0, x1, y1 = self.keep_region
+            corners = np.array([[x0, y0, 1], [x1, y1, 1]], dtype=np.float64) @ M.T
+            self.keep_region = (
+                *corners[:, :2].min(axis=0).tolist(),
+                *corners[:, :2].max(axis=0).tolist(),
+            )
+        return self
+
+    def rotate_by_multi_90(self, rotate_degree):
+        assert rotate_degree in [0, 90, 180, 270, -90]
+        if rotate_degree == 0:
+            return self
+        if rotate_degree == -90:
+            rotate_degree = 270
+        M = get_rotate_matrix_by_multi_90(self.img_shape, rotate_degree)
+        self._append_file_name(f"_rotate-{rotate_degree}")
+        if rotate_degree == 180:
+            return self._then(M, self.width, self.height)
+        return self._then(M, self.height, self.width)
+
+    def resize_by_factor(self, fx, fy):
+        # 输出尺寸与cv2.resize(fx=, fy=)一致
+        width = max(1, int(np.rint(self.width * fx)))
+        height = max(1, int(np.rint(self.height * fy)))
+        self._append_file_name(f"_resize-{width}-{height}")
+        return self._then(_scale_matrix(fx, fy), width, height)
+
+    def resize(self, dst_size):
+        fx = dst_size[0] / self.width
+        fy = dst_size[1] / self.height
+        return self.resize_by_factor(fx, fy)
+
+    def pad_with_tblr(self, pad_tblr):
+        t, b, l, r = pad_tblr
+        self._append_file_name("_tblr-" + "-".join(str(round(v)) for v in [t, b, l, r]))
+        return self._then(
+            _translate_matrix(l, t), self.width + l + r, self.height + t + b
+        )
+
+    def pad_with_dst_size(self, dst_size, center=True):
+        dst_width, dst_height = dst_size
+        assert dst_height >= self.height
+        assert dst_width >= self.width
+        if not center:
+            raise NotImplementedError
+        t = (dst_height - self.height) // 2
+        b = dst_height - self.height - t
+        _l = (dst_width - self.width) // 2
+        r = dst_width - self.width - _l
+        return self.pad_with_tblr([t, b, _l, r])
+
+    def pad_to_square(self):
+        if self.width == self.height:
+            return self
+        dst_edge = max(self.width, self.height)
+        return self.pad_with_dst_size([dst_edge, dst_edge])
+
+    def crop(self, tl_x, tl_y, br_x, br_y):
+        """
+        裁剪右下点（含）为br_x, br_y的矩形区域，与DataPackage.crop相同，区域先截断到画布内
+        """
+        tl_x = max(0, tl_x)
+        tl_y = max(0, tl_y)
+        br_x = min(self.width, br_x)
+        br_y = min(self.height, br_y)
+        self._append_file_name(
+            "_" + "-".join(str(round(v)) for v in [tl_x, tl_y, br_x, br_y])
+        )
+        if self.keep_region is None:
+            self.keep_region = (tl_x, tl_y, br_x, br_y)
+        else:
+            x0, y0, x1, y1 = self.keep_region
+            self.keep_region = (
+                max(x0, tl_x),
+                max(y0, tl_y),
+                min(x1, br_x),
+                min(y1, br_y),
+            )
+        return self._then(
+            _translate_matrix(-tl_x, -tl_y), br_x - tl_x + 1, br_y - tl_y + 1
+        )
+
+    def random_crop(self, dst_size):
+        """
+        与DataPackage.random_crop相同，dst_size为(高, 宽)
+        """
+        if self.height == dst_size[0] and self.width == dst_size[1]:
+            return self
+        assert self.height > dst_size[0] and self.width > dst_size[1]
+        tl_x = random.randint(0, self.width - dst_size[1] - 1)
+        tl_y = random.randint(0, self.height - dst_size[0] - 1)
+        return self.crop(tl_x, tl_y, tl_x + dst_size[1] - 1, tl_y + dst_size[0] - 1)
+
+    def warp_img(self, img, interpolation=1, border_value=0):
+        """
+        一次生成变换后的图像
+        Args:
+            img: 源图像
+            interpolation: 插值方式，默认为1（linear）
+            border_value: 补边区域（画布中源图像未覆盖的区域）的像素值（各通道相同）
+
+        Returns:
+
+        """
+        M = self.M
+        if np.array_equal(M[:2, :2], np.eye(2)) and np.array_equal(
+            M[:2, 2], np.round(M[:2, 2])
+        ):
+            # 仅有整数平移（补边与裁剪）：一次切片复制
+            tx, ty = int(M[0, 2]), int(M[1, 2])
+            dst = np.full(
+                (self.height, self.width) + img.shape[2:], border_value, img.dtype
+            )
+            src_x0, src_y0 = max(0, -tx), max(0, -ty)
+            src_x1 = min(img.shape[1], self.width - tx)
+            src_y1 = min(img.shape[0], self.height - ty)
+            if src_x1 > src_x0 and src_y1 > src_y0:
+                dst[src_y0 + ty : src_y1 + ty, src_x0 + tx : src_x1 + tx] = img[
+                    src_y0:src_y1, src_x0:src_x1
+                ]
+            return dst
+        if (
+            M[0, 1] == 0
+            and M[1, 0] == 0
+            and not M[:2, 2].any()
+            and M[0, 0] > 0
+            and M[1, 1] > 0
+        ):
+            # 仅有缩放：与DataPackage.resize_by_factor的调用相同（不指定dsize，cv2.resize按fx，fy缩放，
+            # 同时指定dsize时fx，fy被忽略，缩放系数变为round(w * fx) / w，与按fx缩放的标注不再对齐）
+            dst = cv2.resize(
+                img, None, fx=M[0, 0], fy=M[1, 1], interpolation=interpolation
+            )
+            if dst.shape[:2] == (self.height, self.width):
+                return dst
+        # 几何部分的边界以复制边缘像素处理（与cv2.resize一致），避免放大时边缘像素混入补边的像素值
+        M_pix = _translate_matrix(-0.5, -0.5) @ M @ _translate_matrix(0.5, 0.5)
+        dst = cv2.warpAffine(
+            img,
+            M_pix[:2],
+            (self.width, self.height),
+            flags=interpolation,
+            borderMode=cv2.BORDER_REPLICATE,
+        )
+        if dst.ndim < img.ndim:
+            dst = dst.reshape(dst.shape + img.shape[dst.ndim :])
+        # 源图像变换后的区域之外（补边步骤产生的区域）填充border_value
+        h, w = img.shape[:2]
+        corners = np.array([[0, 0, 1], [w, h, 1]], dtype=np.float64) @ M.T
+        x0, y0 = np.rint(corners[:, :2].min(axis=0)).astype(int).clip(0)
+        x1, y1 = np.rint(corners[:, :2].max(axis=0)).astype(int).clip(0)
+        dst[:y0] = border_value
+        dst[y1:] = border_value
+        dst[:, :x0] = border_value
+        dst[:, x1:] = border_value
+        return dst
+
+    def transform_label_arrays(self, label_arrays):
+        """
+        一次变换全部标注条目，有裁剪时与DataPackage.crop相同，只保留完整落入裁剪区域的rectangle标注（坐标取整）
+        """
+        label_arrays = label_arrays.transform(self.M)
+        if self.keep_region is None:
+            return label_arrays
+        x0, y0, x1, y1 = self.keep_region
+        idxes = np.flatnonzero(label_arrays.get_rectangle_mask())
+        pts = np.round(label_arrays.get_rectangle_points(idxes))
+        inside = (
+            (pts[:, [0, 2]] >= x0 - 1e-3).all(axis=1)
+            & (pts[:, [0, 2]] <= x1 + 1e-3).all(axis=1)
+            & (pts[:, [1, 3]] >= y0 - 1e-3).all(axis=1)
+            & (pts[:, [1, 3]] <= y1 + 1e-3).all(axis=1)
+        )
+        label_arrays = label_arrays.take(idxes[inside])
+        return label_arrays.with_points(np.round(label_arrays.points), True)
@@ -0,0 +1,116 @@
+# -*- coding:utf-8 -*-
+# @FileName :writer.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 17:05
+
+import datetime
+import itertools
+import os
+import queue
+import threading
+
+__all__ = [
+    "AsyncDataPackageSaver",
+    "gen_sample_ids",
+]
+
+
+def gen_sample_ids(prefix=None):
+    """
+    生成不重复的样本id，形如"<prefix>-00000001"，prefix默认由启动时间与进程号组成，
+    同一进程内依次递增，不依赖于保存时刻的系统时间，无需等待时间戳变化。
+    """
+    if prefix is None:
+        prefix = datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+    for idx in itertools.count():
+        yield f"{prefix}-{idx:08d}"
+
+
+# 后台保存DataPackage对象的线程池：有界队列加若干写线程，图像编码与标注写入在写线程中执行，
+# 队列满时submit阻塞，写线程中的异常会在下一次submit，flush或close时抛给调用方。
+class AsyncDataPackageSaver:
+    def __init__(self, num_workers=4, max_queue_size=64, save_func=None):
+        """
+        Args:
+            num_workers: 写线程数
+            max_queue_size: 等待保存的对象数量上限
+            save_func: 保存单个对象的函数，默认为DataPackage.save，返回False时视为保存失败
+        """
+        assert num_workers >= 1
+        self._save_func = save_func
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._errors = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.num_saved = 0
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(num_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 调用方已经出错时只负责收尾，不覆盖原有异常
+            try:
+                self.close()
+            except Exception:
+                pass
+
+    def _work(self):
+        while True:
+            dp = self._queue.get()
+            try:
+                if dp is None:
+                    return
+                if self._save_func is not None:
+                    success = self._save_func(dp)
+                else:
+                    success = dp.save()
+                if success is False:
+                    raise RuntimeError(f"failed to save {dp.img_path}, {dp.label_path}")
+                with self._lock:
+                    self.num_saved += 1
+            except Exception as e:
+                with self._lock:
+                    self._errors.append(e)
+            finally:
+                self._queue.task_done()
+
+    def _raise_if_failed(self):
+        with self._lock:
+            if not self._errors:
+                return
+            error = self._errors[0]
+            self._errors = []
+        raise RuntimeError("background saving failed") from error
+
+    def submit(self, dp):
+        """
+        提交待保存的对象，提交后调用方不应再修改该对象
+        """
+        assert not self._closed
+        self._raise_if_failed()
+        self._queue.put(dp)
+
+    def flush(self):
+        """
+        等待已提交的对象全部保存完毕
+        """
+        self._queue.join()
+        self._raise_if_failed()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._raise_if_failed()
@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_cache.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 11:40
+
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage, gen_data_package_list_from_img_file_for_folder
+from data_aug.cache import ImageLRUCache, make_cached_cyclic_iterator, set_npy_cache_dir
+
+
+class TestImageLRUCache(TestCase):
+    def test_cached_cyclic_iterator(self):
+        dp_list = gen_data_package_list_from_img_file_for_folder(
+            r"./test_data", ["*.bmp"], lazy=True
+        )
+        self.assertEqual(len(dp_list), 2)
+        # 预算只够缓存一张图像，两张图像交替访问时每次都会淘汰
+        cache = ImageLRUCache(max_bytes=1)
+        dp_iter = make_cached_cyclic_iterator(dp_list, cache)
+        for _ in range(4):
+            dp = next(dp_iter)
+            self.assertTrue(dp.img_loaded)
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(cache.evictions, 3)
+        self.assertEqual(len(cache), 1)
+        self.assertFalse(any(dp.img_loaded for dp in dp_list))
+
+        cache = ImageLRUCache(max_bytes=1 << 30)
+        dp_iter = make_cached_cyclic_iterator(dp_list, cache)
+        for _ in range(4):
+            next(dp_iter)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+
+class TestNpyImageCache(TestCase):
+    def test_create_with_npy_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            npy_cache = set_npy_cache_dir(tmp_dir)
+            try:
+                dp1 = DataPackage.create_from_img_path(
+                    r"./test_data/C0402_15um_black.bmp"
+                )
+                dp2 = DataPackage.create_from_label_path(
+                    r"./test_data/C0402_15um_black.json"
+                )
+                self.assertEqual(npy_cache.stats(), dict(hits=1, misses=1))
+                self.assertIsInstance(dp2.img, np.memmap)
+                self.assertTrue((dp1.img == dp2.img).all())
+                del dp2
+            finally:
+                set_npy_cache_dir(None)
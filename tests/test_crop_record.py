@@ -0,0 +1,91 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_crop_record.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 20:05
+
+import os
+import shutil
+import tempfile
+from functools import partial
+from pathlib import Path
+from unittest import TestCase
+
+from data_aug import crop_rectangle_items_for_folder
+from data_aug.crop_record import (
+    CROP_RECORD_NAME,
+    CropRecord,
+    get_crop_source_key,
+    get_filter_id,
+)
+
+
+def filter_with_name(label_item, name):
+    return label_item["label"] == name
+
+
+class TestCropRecord(TestCase):
+    def test_filter_id(self):
+        self.assertEqual(get_filter_id(None), "None")
+        self.assertEqual(
+            get_filter_id(filter_with_name), f"{__name__}.filter_with_name"
+        )
+        self.assertNotEqual(
+            get_filter_id(partial(filter_with_name, name="a")),
+            get_filter_id(partial(filter_with_name, name="b")),
+        )
+        # 键由显式的filter_id决定，与筛选函数本身无关
+        key_args = (
+            r"./test_data/C0402_15um_black.json",
+            r"./test_data/C0402_15um_black.bmp",
+        )
+        self.assertNotEqual(
+            get_crop_source_key(*key_args, filter_id="v1"),
+            get_crop_source_key(*key_args, filter_id="v2"),
+        )
+
+    def test_incremental_crop(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_dir = Path(tmp_dir) / "src"
+            dst_dir = Path(tmp_dir) / "dst"
+            src_dir.mkdir()
+            for name in ["C0402_15um_black.json", "C0402_15um_black.bmp"]:
+                shutil.copy(Path(r"./test_data") / name, src_dir)
+            crop_rectangle_items_for_folder(src_dir, dst_dir, incremental=True)
+            record = CropRecord(dst_dir / CROP_RECORD_NAME)
+            self.assertEqual(len(record.sources), 1)
+            outputs = list(record.sources.values())[0]["outputs"]
+            self.assertEqual(len(outputs), 48)
+
+            # 未变化时跳过，不重新写入
+            mtimes = [os.stat(path).st_mtime_ns for path in outputs]
+            crop_rectangle_items_for_folder(src_dir, dst_dir, incremental=True)
+            self.assertEqual(mtimes, [os.stat(path).st_mtime_ns for path in outputs])
+
+            # 筛选函数变化时重新裁剪并删除不再产生的结果
+            crop_rectangle_items_for_folder(
+                src_dir,
+                dst_dir,
+                filter_func=partial(filter_with_name, name="none"),
+                incremental=True,
+            )
+            self.assertFalse(any(os.path.exists(path) for path in outputs))
+
+            # 筛选函数不变但显式标识变化时同样重新裁剪
+            crop_rectangle_items_for_folder(src_dir, dst_dir, incremental=True)
+            record = CropRecord(dst_dir / CROP_RECORD_NAME)
+            label_path, entry = list(record.sources.items())[0]
+            key = get_crop_source_key(label_path, src_dir / "C0402_15um_black.bmp")
+            self.assertEqual(entry["key"], key)
+            crop_rectangle_items_for_folder(
+                src_dir, dst_dir, incremental=True, filter_id="v2"
+            )
+            record = CropRecord(dst_dir / CROP_RECORD_NAME)
+            self.assertNotEqual(record.sources[label_path]["key"], key)
+            self.assertTrue(all(os.path.exists(path) for path in entry["outputs"]))
+
+            # 源标注文件删除后清理其记录
+            crop_rectangle_items_for_folder(src_dir, dst_dir, incremental=True)
+            os.remove(src_dir / "C0402_15um_black.json")
+            crop_rectangle_items_for_folder(src_dir, dst_dir, incremental=True)
+            self.assertEqual(CropRecord(dst_dir / CROP_RECORD_NAME).sources, {})
+            self.assertEqual(os.listdir(dst_dir), [CROP_RECORD_NAME])
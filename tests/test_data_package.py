@@ -3,10 +3,19 @@
 # @Author   :Deyu He
 # @Time     :2022/11/29 17:18
 
+import tempfile
 from pathlib import Path
 from unittest import TestCase
 
-from data_aug import DataPackage
+import numpy as np
+
+from data_aug import (
+    DataPackage,
+    filter_with_size_for_folder,
+    gen_data_package_list_from_img_file_for_folder,
+    gen_data_package_list_from_label_file_for_folder,
+    iter_filter_with_size_for_folder,
+)
 
 
 class TestDataPackage(TestCase):
@@ -62,3 +71,140 @@ class TestDataPackage(TestCase):
         dst_dir = r"./test_output/crop/"
         Path(dst_dir).mkdir(parents=True, exist_ok=True)
         dp.crop_rectangle_items(dst_dir, exclude_labels=["C0402_15um_black"])
+
+    def test_create_lazy(self):
+        dp = DataPackage.create_from_label_path(
+            r"./test_data/C0402_15um_black.json", lazy=True
+        )
+        self.assertFalse(dp.img_loaded)
+        self.assertEqual(dp.img_shape[:2], (2000, 2400))
+        self.assertTrue(dp.filter_with_size(min_size=[100, 100]))
+        self.assertFalse(dp.img_loaded)
+        self.assertEqual(dp.img.shape[:2], (2000, 2400))
+        self.assertTrue(dp.img_loaded)
+
+        dp = DataPackage.create_from_img_path(
+            r"./test_data/C0603_15um_black.bmp", lazy=True
+        )
+        self.assertFalse(dp.img_loaded)
+        self.assertEqual(dp.img_shape, dp.img.shape)
+
+    def test_gen_data_package_list_with_workers(self):
+        dir_list = [r"./test_data", r"./test_data/modify_label_name"]
+        serial = gen_data_package_list_from_label_file_for_folder(dir_list, lazy=True)
+        parallel = gen_data_package_list_from_label_file_for_folder(
+            dir_list, lazy=True, workers=4
+        )
+        self.assertEqual(
+            [dp.img_path for dp in serial], [dp.img_path for dp in parallel]
+        )
+
+        parallel = gen_data_package_list_from_img_file_for_folder(
+            dir_list, ["*.bmp"], workers=4
+        )
+        self.assertTrue(all(dp.img_loaded for dp in parallel))
+
+    def test_iter_crop_rectangle_items(self):
+        dp = DataPackage.create_from_label_path(r"./test_data/C0402_15um_black.json")
+        dp_iter = dp.iter_crop_rectangle_items()
+        self.assertEqual(len(list(dp_iter)), len(dp.crop_rectangle_items()))
+
+        dp_list = list(
+            iter_filter_with_size_for_folder(r"./test_data", min_size=[3000, 0])
+        )
+        self.assertEqual(len(dp_list), 0)
+
+    def test_filter_with_size_for_folder(self):
+        dp_list = filter_with_size_for_folder(r"./test_data", min_size=[3000, 0])
+        self.assertEqual(len(dp_list), 0)
+        dp_list = filter_with_size_for_folder(r"./test_data", min_size=[100, 100])
+        self.assertEqual(len(dp_list), 1)
+        self.assertTrue(dp_list[0].img_loaded)
+        dp_list = filter_with_size_for_folder(
+            r"./test_data", min_size=[100, 100], lazy=True
+        )
+        self.assertFalse(dp_list[0].img_loaded)
+
+    def test_crop_lazy_bmp_region(self):
+        dp = DataPackage.create_from_label_path(r"./test_data/C0402_15um_black.json")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # 测试数据实际为jpeg编码，另存为未压缩的bmp
+            dp.update_img_path(str(Path(tmp_dir) / "C0402_15um_black.bmp"))
+            dp.save()
+            lazy_dp = DataPackage.create_from_label_path(dp.label_path, lazy=True)
+            for cropped, lazy_cropped in zip(
+                dp.crop_rectangle_items(margin_tblr=[5, 5, 5, 5]),
+                lazy_dp.crop_rectangle_items(margin_tblr=[5, 5, 5, 5]),
+            ):
+                self.assertTrue((cropped.img == lazy_cropped.img).all())
+                self.assertEqual(cropped.label, lazy_cropped.label)
+            self.assertFalse(lazy_dp.img_loaded)
+
+    def test_create_with_max_side(self):
+        dp = DataPackage.create_from_label_path(r"./test_data/C0402_15um_black.json")
+        for lazy in [False, True]:
+            reduced_dp = DataPackage.create_from_label_path(
+                r"./test_data/C0402_15um_black.json", lazy=lazy, max_side=500
+            )
+            self.assertEqual(reduced_dp.img_loaded, not lazy)
+            self.assertEqual(reduced_dp.img_shape, (500, 600, 3))
+            self.assertEqual(reduced_dp.img.shape, (500, 600, 3))
+            self.assertAlmostEqual(
+                reduced_dp.label_items[0]["points"][1][0],
+                dp.label_items[0]["points"][1][0] / 4,
+                places=3,
+            )
+        reduced_dp = DataPackage.create_from_img_path(
+            r"./test_data/C0603_15um_black.bmp", max_side=2000
+        )
+        self.assertEqual(reduced_dp.img.shape, (2000, 2400, 3))
+
+    def test_copy_on_write(self):
+        dp = DataPackage.gen_default_data_package("a.bmp", [20, 30, 3], 0)
+        copied = dp.copy()
+        self.assertTrue(
+            np.shares_memory(dp.get_readonly_img(), copied.get_readonly_img())
+        )
+        self.assertFalse(copied.get_readonly_img().flags.writeable)
+        pasted = copied.paste_by(
+            DataPackage.gen_default_data_package("b.bmp", [5, 5, 3], 255), 1, 1
+        )
+        self.assertEqual(int(pasted.img.max()), 255)
+        self.assertEqual(int(dp.img.max()), 0)
+        self.assertEqual(int(copied.img.max()), 0)
+        # 复制后仍可直接原地写入执行对象与复制结果的图像，互不影响
+        cropped = dp.crop(0, 0, 9, 9)
+        copied = dp.copy()
+        dp.img[...] = 7
+        self.assertEqual(int(copied.get_readonly_img().max()), 0)
+        self.assertEqual(int(cropped.get_readonly_img().max()), 0)
+        copied.img[...] = 9
+        cropped.img[...] = 9
+        self.assertEqual(int(dp.img.max()), 7)
+        with self.assertRaises(AttributeError):
+            dp.foo = 1
+
+    def test_mosaic(self):
+        tiles = []
+        for idx in range(4):
+            tile = DataPackage.gen_default_data_package(f"{idx}.bmp", [50, 50, 3], idx)
+            tile.label_items.append(
+                dict(
+                    label=f"C{idx}",
+                    points=[[1, 2], [11, 12]],
+                    group_id=None,
+                    shape_type="rectangle",
+                    flags={},
+                )
+            )
+            tiles.append(tile)
+        ret = DataPackage.mosaic_mxn(tiles, [100, 100], img_val=200)
+        self.assertEqual(ret.img.shape, (100, 100, 3))
+        # 列优先：第2个对象位于左下角
+        self.assertEqual(int(ret.img[75, 25, 0]), 1)
+        self.assertEqual(ret.label_items[1]["points"], [[1, 52], [11, 62]])
+        self.assertEqual(
+            [item["label"] for item in ret.label_items], ["C0", "C1", "C2", "C3"]
+        )
+        ret = DataPackage.mosaic_1p5(tiles[:3], [150, 150], loc=0)
+        self.assertEqual(ret.label_items[2]["points"], [[101, 52], [111, 62]])
@@ -0,0 +1,96 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_dedup.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 21:50
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from data_aug import gen_data_package_list_from_img_file_for_folder
+from data_aug.dedup import DEDUP_INDEX_NAME, DedupIndex, hamming_distance
+
+
+class TestDedup(TestCase):
+    def test_multi_index_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        hashes = rng.integers(0, 2**63, 200, dtype=np.uint64)
+        # 构造若干近似重复：翻转1~3位
+        for idx in range(0, 60, 3):
+            flips = rng.choice(64, rng.integers(1, 4), replace=False)
+            hashes[idx + 1] = hashes[idx] ^ np.uint64(sum(1 << int(b) for b in flips))
+        index = DedupIndex([str(idx) for idx in range(len(hashes))], hashes)
+        i, j = np.triu_indices(len(hashes), 1)
+        distances = hamming_distance(hashes[i], hashes[j])
+        for max_distance in range(4):
+            expected = np.stack([i, j], axis=1)[distances <= max_distance]
+            self.assertTrue(
+                np.array_equal(index.find_duplicate_pairs(max_distance), expected)
+            )
+
+    def test_groups_match_brute_force(self):
+        rng = np.random.default_rng(1)
+        base = rng.integers(0, 2**63, 30, dtype=np.uint64)
+        # 每个基准哈希附近构造一串逐位翻转的哈希（相邻的距离为1，首尾距离可超过阈值）
+        hashes = []
+        for h in base:
+            for bit in rng.choice(64, rng.integers(1, 6), replace=False):
+                h = h ^ np.uint64(1 << int(bit))
+                hashes.append(h)
+        hashes = np.array(hashes + hashes[:10], dtype=np.uint64)
+        rng.shuffle(hashes)
+        index = DedupIndex([str(idx) for idx in range(len(hashes))], hashes)
+        i, j = np.triu_indices(len(hashes), 1)
+        distances = hamming_distance(hashes[i], hashes[j])
+        for max_distance in range(4):
+            # 暴力两两比较后以传递闭包求组标签
+            labels = np.arange(len(hashes))
+            for a, b in zip(i[distances <= max_distance], j[distances <= max_distance]):
+                labels[labels == labels[b]] = labels[a]
+            expected = np.array([np.flatnonzero(labels == v).min() for v in labels])
+            self.assertTrue(
+                np.array_equal(index._get_group_labels(max_distance), expected)
+            )
+
+    def test_large_duplicate_burst(self):
+        # 大量完全相同与近似相同的哈希不展开为图像对
+        base = np.uint64(0x0123456789ABCDEF)
+        hashes = np.full(30000, base, dtype=np.uint64)
+        hashes[::2] ^= np.uint64(1) << (np.arange(15000) % 64).astype(np.uint64)
+        index = DedupIndex([str(idx) for idx in range(len(hashes))], hashes)
+        mask = index.duplicate_mask(0)
+        self.assertEqual(int(mask.sum()), len(hashes) - 65)
+        mask = index.duplicate_mask(3)
+        self.assertEqual(int(mask.sum()), len(hashes) - 1)
+        self.assertEqual(len(index.find_duplicate_groups(1)), 1)
+
+    def test_skip_duplicates(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_path = Path(r"./test_data/C0402_15um_black.bmp")
+            shutil.copy(src_path, Path(tmp_dir) / "a.bmp")
+            shutil.copy(src_path, Path(tmp_dir) / "b.bmp")
+            shutil.copy(
+                Path(r"./test_data/C0603_15um_black.bmp"), Path(tmp_dir) / "c.bmp"
+            )
+            img = np.full((100, 100, 3), 0, dtype=np.uint8)
+            img[:, 50:] = 255
+            cv2.imwrite(os.path.join(tmp_dir, "d.bmp"), img)
+
+            dp_list = gen_data_package_list_from_img_file_for_folder(
+                tmp_dir, ["*.bmp"], lazy=True, dedup_distance=0
+            )
+            names = sorted(Path(dp.img_path).name for dp in dp_list)
+            self.assertEqual(len(names), 3)
+            self.assertNotIn("b.bmp", names)
+            self.assertTrue((Path(tmp_dir) / DEDUP_INDEX_NAME).exists())
+
+            # 第二次从缓存中读取哈希
+            index = DedupIndex.build(
+                [Path(tmp_dir) / name for name in ["a.bmp", "b.bmp", "d.bmp"]]
+            )
+            self.assertEqual(index.find_duplicate_groups(), [[0, 1]])
@@ -0,0 +1,78 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_fg_bank.py
+# @Author   :Deyu He
+# @Time     :2026/10/19 01:40
+
+import random
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage
+from data_aug.fg_bank import ForegroundBank
+
+
+class TestForegroundBank(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        img = rng.integers(0, 256, (40, 80, 3), dtype=np.uint8)
+        label = DataPackage.gen_default_label("fg.bmp", img.shape[:2])
+        label["shapes"] = [
+            dict(
+                label="R0402",
+                points=[[0, 0], [80, 40]],
+                group_id=None,
+                shape_type="rectangle",
+                flags={},
+            )
+        ]
+        self.fg = DataPackage("fg.bmp", img, None, label)
+
+    def test_entries(self):
+        bank = ForegroundBank.build([self.fg], [20, 40])
+        self.assertEqual(len(bank), 1)
+        img, la = bank.get(0, 90, 1)
+        self.assertEqual(img.shape, (40, 20, 3))
+        self.assertFalse(img.flags.writeable)
+        self.assertTrue(np.shares_memory(img, bank.buffer))
+        self.assertEqual(la.get_item(0)["points"], [[0, 0], [20, 40]])
+        # 无残余缩放时直接返回库中的图像
+        img, _ = bank.draw(0, 0, 0.5, 0.5)
+        self.assertTrue(np.shares_memory(img, bank.buffer))
+        img, la = bank.draw(0, 180, 0.3, 0.35)
+        self.assertEqual(img.shape, (14, 24, 3))
+        self.assertTrue(np.allclose(la.get_bounding_boxes()[0], [0, 0, 24, 14]))
+
+    def test_build_keeps_lazy(self):
+        dp = DataPackage.create_from_label_path(
+            r"./test_data/C0402_15um_black.json", lazy=True
+        )
+        label = dp.label
+        bank = ForegroundBank.build([dp], [64, 128], workers=2)
+        self.assertFalse(dp.img_loaded)
+        # 字典模式的对象保持字典模式，此前取得的标注字典不变
+        self.assertIs(dp.label, label)
+        self.assertIsNotNone(label["shapes"])
+        self.assertEqual(bank.src_max_sides.tolist(), [2400])
+        img, la = bank.get(0, 0, 1)
+        self.assertEqual(img.shape, (107, 128, 3))
+        self.assertEqual(len(la), len(dp.label_arrays))
+
+    def test_paste_by_iter(self):
+        random.seed(0)
+        bank = ForegroundBank.build([self.fg], [16, 24, 32])
+        bg = DataPackage.gen_default_data_package("bg.bmp", [200, 200, 3])
+        ret = bg.paste_by_iter(
+            iter([self.fg] * 10),
+            10,
+            min_size=16,
+            max_size=32,
+            placement="occupancy",
+            fg_bank=bank,
+        )
+        self.assertEqual(len(ret.label_items), 10)
+        self.assertTrue(
+            (
+                ret.spatial_index.boxes[:, 2:] - ret.spatial_index.boxes[:, :2] <= 34
+            ).all()
+        )
@@ -0,0 +1,62 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_image_io.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 20:40
+
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage
+from data_aug.image_io import (
+    get_codec,
+    imread_bgr,
+    imwrite,
+    read_img_shape,
+    register_codec,
+    set_default_codec,
+)
+
+
+class TestImageCodec(TestCase):
+    def test_get_codec(self):
+        self.assertEqual(get_codec(img_path="a.PNG").name, "png")
+        self.assertEqual(get_codec("png-fast").suffix, ".png")
+        self.assertIsNone(get_codec())
+        codec = register_codec("png-test", ".png", [])
+        self.assertIs(get_codec("png-test"), codec)
+
+    def test_write_and_read(self):
+        img = np.random.randint(0, 256, (40, 60, 3), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for codec, suffix in [
+                ("png-fast", ".png"),
+                ("bmp", ".bmp"),
+                ("npy", ".npy"),
+            ]:
+                img_path = os.path.join(tmp_dir, "img" + suffix)
+                imwrite(img_path, img, codec=codec)
+                self.assertEqual(read_img_shape(img_path), (40, 60, 3))
+                self.assertTrue(np.array_equal(imread_bgr(img_path), img))
+
+    def test_save_with_codec(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            img_path = str(Path(tmp_dir) / "img.bmp")
+            dp = DataPackage.gen_default_data_package(img_path, [30, 20, 3], 128)
+            dp.update_img_path(img_path)
+            dp.save(codec="png-fast")
+            self.assertTrue((Path(tmp_dir) / "img.png").exists())
+            self.assertTrue((Path(tmp_dir) / "img.json").exists())
+            self.assertEqual(dp.label["imagePath"], "img.png")
+
+            set_default_codec("npy")
+            try:
+                dp.save()
+            finally:
+                set_default_codec(None)
+            self.assertTrue((Path(tmp_dir) / "img.npy").exists())
+            reloaded = DataPackage.create_from_label_path(dp.label_path)
+            self.assertEqual(reloaded.img.shape, (30, 20, 3))
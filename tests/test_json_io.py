@@ -0,0 +1,42 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_json_io.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 16:45
+
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import json_io
+
+
+class TestJsonIO(TestCase):
+    def test_backends_output_equal_values(self):
+        label = json_io.load_json(r"./test_data/C0402_15um_black.json")
+        label["flags"] = {
+            "中文": np.float32(0.5),
+            "n": np.int64(3),
+            "floats": [1e-05, 1e16, 1.5e-07, 2345.67, 786.6702819956615],
+        }
+        expected = json.loads(json.dumps(label, default=json_io._to_builtin))
+        backend = json_io.get_json_backend()
+        try:
+            for name in json_io.available_json_backends():
+                json_io.set_json_backend(name)
+                for indent in (None, 2):
+                    data = json_io.dumps(label, indent=indent)
+                    # 各后端输出的字节可能不同，但标准库解析后的值须一致
+                    self.assertEqual(json.loads(data.decode("utf-8")), expected)
+                    self.assertEqual(json_io.loads(data), expected)
+        finally:
+            json_io.set_json_backend(backend)
+
+    def test_dump_and_load(self):
+        label = json_io.load_json(r"./test_data/C0402_15um_black.json")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = Path(tmp_dir) / "label.json"
+            json_io.dump_json(label, json_path)
+            self.assertEqual(json_io.load_json(json_path), label)
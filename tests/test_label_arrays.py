@@ -0,0 +1,158 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_label_arrays.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 22:30
+
+import json
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage
+from data_aug.label_arrays import LabelArrays
+
+SHAPES = [
+    dict(
+        label="R0402",
+        points=[[10, 20], [30, 40]],
+        group_id=None,
+        shape_type="rectangle",
+        flags={},
+    ),
+    dict(
+        label="C0603",
+        points=[[1, 2], [3, 4], [5, 6]],
+        group_id=1,
+        shape_type="polygon",
+        flags={"a": True},
+    ),
+    dict(
+        label="R0402",
+        points=[[50.5, 60.25]],
+        group_id=None,
+        shape_type="point",
+        flags={},
+    ),
+]
+
+
+class TestLabelArrays(TestCase):
+    def test_round_trip(self):
+        la = LabelArrays.from_shapes(SHAPES)
+        self.assertEqual(len(la), 3)
+        self.assertEqual(la.vocabulary, ["R0402", "C0603"])
+        self.assertEqual(la.offsets.tolist(), [0, 2, 5, 6])
+        self.assertEqual(la.to_shapes(), SHAPES)
+        self.assertEqual(list(la.get_item(1)), list(SHAPES[1]))
+
+    def test_round_trip_exact(self):
+        shapes = [
+            dict(label="a", points=[[2345.67, 786.6702819956615], [10, 20]]),
+            dict(label="b", points=[[1, 2], [3, 4]]),
+        ]
+        for item in shapes:
+            item.update(group_id=None, shape_type="polygon", flags={})
+        la = LabelArrays.from_shapes(shapes)
+        # 坐标不做舍入，整数坐标仍写回为整数
+        self.assertEqual(json.dumps(la.to_shapes()), json.dumps(shapes))
+        self.assertEqual(
+            la.scale(0.37, 0.61).get_item(0)["points"],
+            [[2345.67 * 0.37, 786.6702819956615 * 0.61], [10 * 0.37, 20 * 0.61]],
+        )
+        self.assertEqual(
+            json.dumps(la.translate(1, 2).get_item(1)["points"]), "[[2, 4], [4, 6]]"
+        )
+        self.assertEqual(
+            json.dumps(la.translate(1.0, 2).get_item(1)["points"]),
+            "[[2.0, 4], [4.0, 6]]",
+        )
+        # 与逐条目的字典运算写出的json相同
+        for rotate_degree in [90, 180, 270]:
+            M = DataPackage.get_rotate_matrix_by_multi_90([100, 120], rotate_degree)
+            expected = [
+                DataPackage.rotate_label_item(item, [100, 120], rotate_degree)
+                for item in shapes
+            ]
+            self.assertEqual(
+                json.dumps(la.transform(M).to_shapes()), json.dumps(expected)
+            )
+
+    def test_take_and_concatenate(self):
+        la = LabelArrays.from_shapes(SHAPES)
+        self.assertEqual(la.take([2, 0]).to_shapes(), [SHAPES[2], SHAPES[0]])
+        other = LabelArrays.from_shapes(SHAPES[1:2])
+        merged = LabelArrays.concatenate([la, other])
+        self.assertEqual(merged.to_shapes(), SHAPES + SHAPES[1:2])
+
+    def test_transform(self):
+        la = LabelArrays.from_shapes(SHAPES)
+        # 逆时针旋转90度，原图宽为100
+        rotated = la.transform([[0, 1, 0], [-1, 0, 100]])
+        self.assertEqual(rotated.get_item(0)["points"], [[20, 70], [40, 90]])
+        self.assertEqual(la.translate(1, 2).get_item(2)["points"], [[51.5, 62.25]])
+        self.assertTrue(
+            np.allclose(la.get_bounding_boxes()[1], [1, 2, 5, 6]),
+        )
+
+
+class TestDataPackageLabelArrays(TestCase):
+    def test_crop_matches_label_items(self):
+        dp = DataPackage.create_from_label_path(r"./test_data/C0402_15um_black.json")
+        tl_x, tl_y, br_x, br_y = 900, 1500, 1700, 1800
+        expected = []
+        for item in dp.export_label()["shapes"]:
+            if item["shape_type"] != "rectangle":
+                continue
+            (x1, y1), (x2, y2) = [[round(v) for v in pt] for pt in item["points"]]
+            if tl_x <= min(x1, x2) and max(x1, x2) <= br_x:
+                if tl_y <= min(y1, y2) and max(y1, y2) <= br_y:
+                    expected.append([[x1 - tl_x, y1 - tl_y], [x2 - tl_x, y2 - tl_y]])
+        cropped = dp.crop(tl_x, tl_y, br_x, br_y)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([item["points"] for item in cropped.label_items], expected)
+
+    def test_check_overlap_and_mode(self):
+        dp = DataPackage.gen_default_data_package("a.bmp", [100, 100, 3])
+        dp.label_items.append(SHAPES[0])
+        self.assertTrue(dp.check_overlap(25, 35, 10, 10))
+        self.assertFalse(dp.check_overlap(31, 0, 10, 100))
+        # 数组模式与字典模式之间的转换
+        self.assertIsNone(dp.label["shapes"][0].get("description"))
+        dp.merge(dp.copy())
+        self.assertEqual(len(dp.label_arrays), 2)
+        self.assertEqual(dp.label_items, [SHAPES[0], SHAPES[0]])
+
+    def test_copies_do_not_share_items(self):
+        dp = DataPackage.gen_default_data_package("a.bmp", [100, 120, 3])
+        dp.label_items.extend(SHAPES)
+        dp.use_label_arrays()
+        for other in [dp.copy(), dp.resize_by_factor(0.5, 0.5), dp.crop(0, 0, 50, 50)]:
+            other.label["shapes"][0]["flags"]["hit"] = True
+            self.assertEqual(dp.export_label()["shapes"][0]["flags"], {})
+        # 只读取标注条目的操作不修改此前取得的label字典
+        dp = DataPackage.gen_default_data_package("a.bmp", [100, 120, 3])
+        label = dp.label
+        label["shapes"].append(SHAPES[0])
+        dp.check_overlap(0, 0, 10, 10)
+        self.assertEqual(label["shapes"], [SHAPES[0]])
+        self.assertEqual(dp.export_label()["shapes"], [SHAPES[0]])
+
+    def test_bulk_transforms_match_label_items(self):
+        dp = DataPackage.gen_default_data_package("a.bmp", [100, 120, 3])
+        dp.label_items.extend(SHAPES)
+        for rotate_degree in [90, 180, 270]:
+            expected = [
+                DataPackage.rotate_label_item(item, dp.img.shape, rotate_degree)
+                for item in SHAPES
+            ]
+            rotated = dp.rotate_by_multi_90(rotate_degree)
+            self.assertEqual(rotated.label_items, expected)
+        resized = dp.resize_by_factor(0.5, 2)
+        expected = [DataPackage.resize_label_item(item, 0.5, 2) for item in SHAPES]
+        self.assertEqual(resized.label_items, expected)
+        padded = dp.pad_with_tblr([1, 2, 3, 4])
+        expected = [DataPackage.translate_label_item(item, 3, 1) for item in SHAPES]
+        self.assertEqual(padded.label_items, expected)
+        self.assertEqual(padded.label["imageWidth"], 127)
+        # 执行对象的标注保持不变
+        self.assertEqual(dp.label_items, SHAPES)
@@ -0,0 +1,72 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_manifest.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 20:05
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from data_aug import filter_with_size_for_folder, json_io
+from data_aug.manifest import MANIFEST_NAME, build_manifest, get_manifest
+
+
+class TestManifest(TestCase):
+    def test_build_and_update(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ["C0402_15um_black.json", "C0402_15um_black.bmp"]:
+                shutil.copy(Path(r"./test_data") / name, tmp_dir)
+            manifest = build_manifest(tmp_dir)
+            self.assertTrue((Path(tmp_dir) / MANIFEST_NAME).exists())
+            self.assertEqual(len(manifest), 1)
+            self.assertEqual((manifest.heights[0], manifest.widths[0]), (2000, 2400))
+            self.assertEqual(manifest.num_shapes[0], 24)
+            self.assertEqual(manifest.get_boxes(0).shape, (24, 4))
+            self.assertEqual(
+                manifest.get_row(0)["names"][0], "C0402_15um_black_with_pad"
+            )
+
+            # 未变化时沿用旧的行，删除标注文件后对应的行被移除
+            manifest = get_manifest(tmp_dir, update=True)
+            self.assertEqual(len(manifest), 1)
+            self.assertEqual(
+                len(filter_with_size_for_folder(tmp_dir, use_manifest=True)), 1
+            )
+            self.assertEqual(
+                len(
+                    filter_with_size_for_folder(
+                        tmp_dir, min_size=[3000, 0], use_manifest=True
+                    )
+                ),
+                0,
+            )
+            os.remove(Path(tmp_dir) / "C0402_15um_black.json")
+            self.assertEqual(len(build_manifest(tmp_dir)), 0)
+
+    def test_get_manifest_stale(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ["C0402_15um_black.json", "C0402_15um_black.bmp"]:
+                shutil.copy(Path(r"./test_data") / name, tmp_dir)
+            self.assertEqual(get_manifest(tmp_dir).num_shapes[0], 24)
+
+            # 新增标注文件后不再沿用旧清单
+            shutil.copy(
+                Path(tmp_dir) / "C0402_15um_black.json", Path(tmp_dir) / "copy.json"
+            )
+            self.assertEqual(len(get_manifest(tmp_dir)), 2)
+
+            # 修改标注文件后重新解析该文件
+            json_path = Path(tmp_dir) / "copy.json"
+            label = json_io.load_json(json_path)
+            label["shapes"] = label["shapes"][:3]
+            json_io.dump_json(label, json_path)
+            mtime = os.stat(json_path).st_mtime_ns + 10**9
+            os.utime(json_path, ns=(mtime, mtime))
+            manifest = get_manifest(tmp_dir)
+            self.assertEqual(sorted(manifest.num_shapes.tolist()), [3, 24])
+
+            # 删除标注文件后对应的行被移除
+            os.remove(json_path)
+            self.assertEqual(len(get_manifest(tmp_dir)), 1)
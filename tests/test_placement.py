@@ -0,0 +1,119 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_placement.py
+# @Author   :Deyu He
+# @Time     :2026/10/19 01:00
+
+import random
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage
+from data_aug.placement import get_free_position_mask, sample_free_position
+
+
+class TestPlacement(TestCase):
+    def test_free_mask_matches_check_overlap(self):
+        dp = DataPackage.gen_default_data_package("a.bmp", [60, 70, 3])
+        for pts in [[[10.5, 12], [25, 30.2]], [[40, 5], [52.7, 20]]]:
+            dp.label_items.append(
+                dict(
+                    label="R0402",
+                    points=pts,
+                    group_id=None,
+                    shape_type="rectangle",
+                    flags={},
+                )
+            )
+        width, height, margin = 9, 7, 2
+        mask = get_free_position_mask(
+            dp.img.shape, dp.spatial_index.boxes, width, height, margin
+        )
+        self.assertEqual(mask.shape, (60 - height, 70 - width))
+        for ty in range(mask.shape[0]):
+            for tx in range(mask.shape[1]):
+                overlap = dp.check_overlap(
+                    tx - margin, ty - margin, width + 2 * margin, height + 2 * margin
+                )
+                self.assertEqual(mask[ty, tx], not overlap)
+
+    def test_sample_and_paste(self):
+        random.seed(0)
+        self.assertIsNone(sample_free_position([20, 20, 3], [[0, 0, 20, 20]], 5, 5))
+        bg = DataPackage.gen_default_data_package("bg.bmp", [200, 200, 3])
+        fg = DataPackage.gen_default_data_package("fg.bmp", [30, 30, 3], img_val=255)
+        fg.label_items.append(
+            dict(
+                label="R0402",
+                points=[[0, 0], [30, 30]],
+                group_id=None,
+                shape_type="rectangle",
+                flags={},
+            )
+        )
+        ret = bg.paste_by_iter(
+            iter([fg] * 40), 40, min_size=20, max_size=30, placement="occupancy"
+        )
+        boxes = ret.spatial_index.boxes
+        self.assertGreater(len(boxes), 10)
+        # 粘贴结果两两不重合
+        for i in range(len(boxes)):
+            others = np.delete(boxes, i, axis=0)
+            overlap = (
+                np.minimum(others[:, 2], boxes[i, 2])
+                > np.maximum(others[:, 0], boxes[i, 0])
+            ) & (
+                np.minimum(others[:, 3], boxes[i, 3])
+                > np.maximum(others[:, 1], boxes[i, 1])
+            )
+            self.assertFalse(overlap.any())
+
+    def test_pack(self):
+        random.seed(0)
+        bg = DataPackage.gen_default_data_package("bg.bmp", [200, 200, 3])
+        bg.label_items.append(
+            dict(
+                label="C0603",
+                points=[[50, 50], [90, 90]],
+                group_id=None,
+                shape_type="rectangle",
+                flags={},
+            )
+        )
+        fg = DataPackage.gen_default_data_package("fg.bmp", [20, 40, 3], img_val=255)
+        fg.label_items.append(
+            dict(
+                label="R0402",
+                points=[[0, 0], [40, 20]],
+                group_id=None,
+                shape_type="rectangle",
+                flags={},
+            )
+        )
+        ret = bg.paste_by_iter(
+            iter([fg] * 60),
+            60,
+            min_size=30,
+            max_size=40,
+            overlap_margin=2,
+            placement="pack",
+            pack_jitter=2,
+            pack_rotate=True,
+        )
+        boxes = ret.spatial_index.boxes
+        self.assertGreater(len(boxes), 25)
+        for i in range(len(boxes)):
+            others = np.delete(boxes, i, axis=0)
+            self.assertFalse(
+                (
+                    (
+                        np.minimum(others[:, 2], boxes[i, 2] + 2)
+                        > np.maximum(others[:, 0], boxes[i, 0] - 2)
+                    )
+                    & (
+                        np.minimum(others[:, 3], boxes[i, 3] + 2)
+                        > np.maximum(others[:, 1], boxes[i, 1] - 2)
+                    )
+                ).any()
+            )
+        self.assertTrue((boxes[:, 2:] <= 199).all())
@@ -0,0 +1,48 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_shard.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 15:02
+
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from data_aug import DataPackage, crop_rectangle_items_for_folder
+from data_aug.shard import (
+    DataPackageShardReader,
+    DataPackageShardWriter,
+    gen_data_package_list_from_shard,
+)
+
+
+class TestShard(TestCase):
+    def test_write_and_read(self):
+        dp = DataPackage.create_from_label_path(r"./test_data/C0402_15um_black.json")
+        cropped_dp_list = dp.crop_rectangle_items(margin_tblr=[5, 5, 5, 5])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for encoding in [".png", "raw"]:
+                shard_path = Path(tmp_dir) / f"fg{encoding}.dpshard"
+                with DataPackageShardWriter(shard_path, encoding=encoding) as writer:
+                    for cropped_dp in cropped_dp_list:
+                        writer.write(cropped_dp)
+                with DataPackageShardReader(shard_path) as reader:
+                    self.assertEqual(len(reader), len(cropped_dp_list))
+                    for idx in [0, len(reader) - 1]:
+                        self.assertTrue(
+                            (reader[idx].img == cropped_dp_list[idx].img).all()
+                        )
+                        self.assertEqual(
+                            reader[idx].label_items, cropped_dp_list[idx].label_items
+                        )
+
+    def test_crop_rectangle_items_for_folder_to_shard(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shard_path = Path(tmp_dir) / "fg.dpshard"
+            crop_rectangle_items_for_folder(
+                r"./test_data", tmp_dir, shard_path=shard_path
+            )
+            dp_list = gen_data_package_list_from_shard(shard_path)
+            self.assertEqual(len(dp_list), 24)
+            self.assertFalse(dp_list[3].img_loaded)
+            self.assertEqual(dp_list[3].img.shape, dp_list[3].img_shape)
+            self.assertEqual(list(Path(tmp_dir).glob("*.json")), [])
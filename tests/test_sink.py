@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_sink.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 21:10
+
+import tarfile
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage
+from data_aug.sink import ShardSink, ShardSinkReader, gen_data_package_list_from_sink
+
+
+class TestShardSink(TestCase):
+    def _write_and_read(self, format):
+        dp = DataPackage.create_from_label_path(r"./test_data/C0402_15um_black.json")
+        crops = dp.crop_rectangle_items()[:6]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with ShardSink(
+                tmp_dir, format=format, max_shard_bytes=1, codec="png-fast"
+            ) as sink:
+                for idx, crop in enumerate(crops):
+                    sink.write(crop, key=f"sample-{idx:08d}")
+            # 上限为1字节时每个样本独占一个分片
+            self.assertEqual(len(sink.shard_paths), 6)
+            dp_list = gen_data_package_list_from_sink(tmp_dir)
+            self.assertEqual(len(dp_list), 6)
+            for crop, read_dp in zip(crops, dp_list):
+                self.assertFalse(read_dp.img_loaded)
+                self.assertTrue(np.array_equal(read_dp.img, crop.img))
+                self.assertEqual(read_dp.label["shapes"], crop.label["shapes"])
+            self.assertEqual(Path(dp_list[0].img_path).name, "sample-00000000.png")
+            with ShardSinkReader(sink.shard_paths[1]) as reader:
+                self.assertEqual(reader.keys, ["sample-00000001"])
+            if format == "tar":
+                with tarfile.open(sink.shard_paths[0]) as tar:
+                    self.assertEqual(
+                        tar.getnames(), ["sample-00000000.png", "sample-00000000.json"]
+                    )
+
+    def test_tar(self):
+        self._write_and_read("tar")
+
+    def test_zip(self):
+        self._write_and_read("zip")
+
+    def test_duplicate_key(self):
+        dp = DataPackage.gen_default_data_package("a.bmp", [8, 8, 3])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with ShardSink(tmp_dir) as sink:
+                sink.write(dp)
+                with self.assertRaises(ValueError):
+                    sink.write(dp)
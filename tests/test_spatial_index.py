@@ -0,0 +1,71 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_spatial_index.py
+# @Author   :Deyu He
+# @Time     :2026/10/19 00:20
+
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage
+from data_aug.spatial_index import GridIndex
+
+
+def _random_boxes(rng, num):
+    xy = rng.uniform(0, 1000, (num, 2))
+    wh = rng.uniform(1, 60, (num, 2))
+    return np.concatenate([xy, xy + wh], axis=1)
+
+
+class TestGridIndex(TestCase):
+    def test_queries_match_brute_force(self):
+        rng = np.random.default_rng(0)
+        boxes = _random_boxes(rng, 300)
+        index = GridIndex.build(boxes[:200])
+        index.insert(boxes[200:])
+        for x0, y0 in rng.uniform(-50, 1000, (50, 2)):
+            x1, y1 = x0 + 120, y0 + 80
+            inter = (np.minimum(boxes[:, 2], x1) > np.maximum(boxes[:, 0], x0)) & (
+                np.minimum(boxes[:, 3], y1) > np.maximum(boxes[:, 1], y0)
+            )
+            inside = (boxes[:, :2] >= [x0, y0]).all(1) & (boxes[:, 2:] <= [x1, y1]).all(
+                1
+            )
+            self.assertEqual(
+                index.intersects(x0, y0, x1, y1).tolist(),
+                np.flatnonzero(inter).tolist(),
+            )
+            self.assertEqual(
+                index.contained(x0, y0, x1, y1).tolist(),
+                np.flatnonzero(inside).tolist(),
+            )
+            dx = np.maximum(boxes[:, 0] - x0, x0 - boxes[:, 2]).clip(0)
+            dy = np.maximum(boxes[:, 1] - y0, y0 - boxes[:, 3]).clip(0)
+            idx, dist = index.nearest(x0, y0)
+            self.assertAlmostEqual(dist, np.hypot(dx, dy).min())
+
+    def test_data_package_index_is_incremental(self):
+        dp = DataPackage.gen_default_data_package("a.bmp", [200, 200, 3])
+        src = DataPackage.gen_default_data_package("b.bmp", [20, 20, 3])
+        src.label_items.append(
+            dict(
+                label="R0402",
+                points=[[2, 2], [18, 18]],
+                group_id=None,
+                shape_type="rectangle",
+                flags={},
+            )
+        )
+        self.assertFalse(dp.check_overlap(0, 0, 200, 200))
+        index = dp.spatial_index
+        dp.paste_by(src, 50, 50, in_place=True)
+        dp.paste_by(src, 100, 100, in_place=True)
+        self.assertIs(dp.spatial_index, index)
+        self.assertEqual(len(index), 2)
+        self.assertTrue(dp.check_overlap(60, 60, 5, 5))
+        self.assertFalse(dp.check_overlap(80, 80, 10, 10))
+        self.assertEqual(len(dp.crop(95, 95, 130, 130).label_items), 1)
+        # 切换为字典模式后索引失效
+        dp.label_items.pop()
+        self.assertIsNot(dp.spatial_index, index)
+        self.assertFalse(dp.check_overlap(110, 110, 5, 5))
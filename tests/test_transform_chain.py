@@ -0,0 +1,81 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_transform_chain.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 23:40
+
+from unittest import TestCase
+
+import numpy as np
+
+from data_aug import DataPackage
+
+
+class TestTransformChain(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        img = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+        label = DataPackage.gen_default_label("a.bmp", img.shape[:2])
+        label["shapes"] = [
+            dict(
+                label="R0402",
+                points=[[10, 20], [30, 40]],
+                group_id=None,
+                shape_type="rectangle",
+                flags={},
+            )
+        ]
+        self.dp = DataPackage("a.bmp", img, None, label)
+
+    def test_rotate_matches_eager(self):
+        for rotate_degree in [90, 180, 270]:
+            expected = self.dp.rotate_by_multi_90(rotate_degree)
+            chain = self.dp.transform_chain().rotate_by_multi_90(rotate_degree)
+            ret = self.dp.apply_transform_chain(chain)
+            self.assertTrue(np.array_equal(ret.img, expected.img))
+            self.assertEqual(ret.label_items, expected.label_items)
+            self.assertEqual(ret.img_path, expected.img_path)
+
+    def test_pad_and_crop_matches_eager(self):
+        expected = self.dp.pad_with_tblr([3, 4, 5, 6]).crop(7, 8, 50, 60)
+        chain = self.dp.transform_chain().pad_with_tblr([3, 4, 5, 6])
+        ret = self.dp.apply_transform_chain(chain.crop(7, 8, 50, 60))
+        self.assertTrue(np.array_equal(ret.img, expected.img))
+        self.assertEqual(ret.label_items, expected.label_items)
+
+    def test_rotate_and_resize(self):
+        chain = self.dp.transform_chain().rotate_by_multi_90(90)
+        chain.resize_by_factor(0.5, 0.5)
+        ret = self.dp.apply_transform_chain(chain)
+        expected = self.dp.rotate_by_multi_90(90).resize_by_factor(0.5, 0.5)
+        self.assertEqual(ret.img.shape, expected.img.shape)
+        self.assertEqual(ret.label_items, expected.label_items)
+        # 源对象不变
+        self.assertEqual(self.dp.img.shape, (60, 80, 3))
+
+    def test_upscale_matches_eager(self):
+        # 平滑的渐变图像，边缘像素值较大，补边像素混入时差异明显
+        y, x = np.mgrid[0:60, 0:80]
+        img = np.stack([150 + x, 150 + y, np.full_like(x, 200)], axis=2)
+        dp = DataPackage("a.bmp", img.astype(np.uint8), None, self.dp.export_label())
+        for factor in [2.5, 1.7, 0.5, 0.137, 0.77, 1.33]:
+            chain = dp.transform_chain().resize_by_factor(factor, factor)
+            ret = dp.apply_transform_chain(chain)
+            expected = dp.resize_by_factor(factor, factor)
+            self.assertTrue(np.array_equal(ret.img, expected.img))
+            self.assertEqual(ret.label_items, expected.label_items)
+
+            chain = dp.transform_chain().rotate_by_multi_90(90)
+            chain.resize_by_factor(factor, factor).pad_with_tblr([3, 4, 5, 6])
+            ret = dp.apply_transform_chain(chain)
+            expected = (
+                dp.rotate_by_multi_90(90)
+                .resize_by_factor(factor, factor)
+                .pad_with_tblr([3, 4, 5, 6])
+            )
+            self.assertEqual(ret.img.shape, expected.img.shape)
+            diff = np.abs(ret.img.astype(int) - expected.img.astype(int))
+            self.assertLessEqual(int(diff.max()), 1)
+            # 合成矩阵与逐步运算的浮点舍入顺序不同，标注坐标只要求近似相等
+            self.assertTrue(
+                np.allclose(ret.label_arrays.points, expected.label_arrays.points)
+            )
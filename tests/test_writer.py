@@ -0,0 +1,37 @@
+# -*- coding:utf-8 -*-
+# @FileName :test_writer.py
+# @Author   :Deyu He
+# @Time     :2026/10/18 17:40
+
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from data_aug import DataPackage
+from data_aug.writer import AsyncDataPackageSaver, gen_sample_ids
+
+
+class TestAsyncDataPackageSaver(TestCase):
+    def test_save(self):
+        sample_ids = gen_sample_ids(prefix="test")
+        self.assertEqual(next(sample_ids), "test-00000000")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with AsyncDataPackageSaver(num_workers=2, max_queue_size=2) as saver:
+                for _ in range(6):
+                    dp = DataPackage.gen_default_data_package(
+                        str(Path(tmp_dir) / (next(sample_ids) + ".png")), [32, 32, 3]
+                    )
+                    saver.submit(dp)
+            self.assertEqual(saver.num_saved, 6)
+            self.assertEqual(len(list(Path(tmp_dir).glob("*.png"))), 6)
+            self.assertEqual(len(list(Path(tmp_dir).glob("*.json"))), 6)
+
+    def test_error_propagation(self):
+        def save_func(dp):
+            raise IOError("disk full")
+
+        saver = AsyncDataPackageSaver(num_workers=1, save_func=save_func)
+        saver.submit(DataPackage.gen_default_data_package(None, [8, 8, 3]))
+        with self.assertRaises(RuntimeError):
+            saver.flush()
+        saver.close()